@@ -1,19 +1,163 @@
-from flask import Flask, render_template, request, session, jsonify, redirect, url_for, flash
+from flask import Flask, render_template, request, session, jsonify, redirect, url_for, flash, Response, stream_with_context, has_app_context, abort, make_response, g
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
+from utils.activity_log import (POST_CREATED, POST_LIKED, PROGRESS_IMPORTED, QUIZ_SUBMITTED, TOPIC_VIEWED,
+                                ActivityLog, Projection, activity_event, fold_progress, fold_rankings,
+                                fold_topic_attempts, fold_totals)
 from utils.ai_helper import get_ai_response, get_youtube_links, get_daily_tip, generate_quiz, get_action_plan
+from utils.topic_classifier import classify_topic, normalize_topic
+from utils.badges import DEFAULT_RULES_PATH as DEFAULT_BADGE_RULES, BadgeEngine, badge_count, load_badge_rules
+from utils.cache import TTLLRUCache
+from utils.content_store import get_content_store, use_content_pack
+from utils.db_profile import configure_database, install_sqlite_pragmas
+from utils.fanout import GeneratorFanOut, GeneratorTask
+from utils.feed_broker import FeedBroker, FeedFull, create_transport
+from utils.fragment_cache import FragmentCacheExtension
+from utils.instrumentation import CONTENT_TYPE as METRICS_CONTENT_TYPE, Instrumentation, record_span
+from utils.leaderboard import WINDOWS as LEADERBOARD_WINDOWS, LeaderboardService, period_key, period_start
+from utils.llm_backend import create_backend
+from utils.migrations import Migration, add_columns, create_indexes, drop_indexes, run_migrations, steps
+from utils.passwords import HasherBusy, PasswordHasher
+from utils.profiler import SamplingProfiler, collapsed as collapsed_stacks, speedscope
+from utils.quiz_store import QuizSessionStore, grade
+from utils.rollup import PeriodicJob, insert_ignore, upsert_increment
+from utils.session_store import ServerSideSessionInterface, create_session_backend
+from utils.sharded_counter import ShardedCounter
+from utils.write_behind import WriteBehindQueue
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import make_transient_to_detached
+from werkzeug.http import is_resource_modified
+import atexit
+import base64
+import click
+import hashlib
 import json
 import os
-from datetime import datetime
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from functools import partial, wraps
 
 app = Flask(__name__)
 app.secret_key = 'edubridge_plus_secret_key_2024'
 
-# Database configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///edubridge.db'
+# Sessions are stored server-side and the cookie only carries the session id:
+# 'sqlite' (instance/sessions.db) or 'filesystem' (a file per session in instance/sessions)
+app.config['SESSION_BACKEND'] = os.environ.get('EDUBRIDGE_SESSION_BACKEND', 'sqlite')
+app.config['SESSION_STORE_PATH'] = os.environ.get('EDUBRIDGE_SESSION_PATH') or os.path.join(
+    app.instance_path, 'sessions.db' if app.config['SESSION_BACKEND'] == 'sqlite' else 'sessions')
+app.session_interface = ServerSideSessionInterface(
+    create_session_backend(app.config['SESSION_BACKEND'], path=app.config['SESSION_STORE_PATH']))
+
+# Database configuration: DATABASE_URL switches to a server database,
+# EDUBRIDGE_DB_PROFILE picks the engine/pragma tuning ('production' or 'default')
+configure_database(app,
+                   os.environ.get('DATABASE_URL', 'sqlite:///edubridge.db'),
+                   os.environ.get('EDUBRIDGE_DB_PROFILE', 'production'))
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db = SQLAlchemy(app)
+with app.app_context():
+    install_sqlite_pragmas(db.engine, app.config['DATABASE_PROFILE'])
+
+# Per-request instrumentation: route timings, SQL statement counts and spans (template renders,
+# learn generators) as Prometheus metrics at /metrics. Requests over the latency budget or running
+# one statement N+ times are logged, and flagged in Server-Timing, X-Query-Count and
+# X-Request-Warnings headers in debug mode or with EDUBRIDGE_INSTRUMENTATION_HEADERS=1
+app.config['INSTRUMENTATION_LATENCY_BUDGET'] = 0.5  # seconds; 0 disables
+app.config['INSTRUMENTATION_N_PLUS_ONE'] = 5  # executions of one statement in a request
+app.config['INSTRUMENTATION_HEADERS'] = os.environ.get('EDUBRIDGE_INSTRUMENTATION_HEADERS', '0') == '1'
+with app.app_context():
+    instrumentation = Instrumentation(app, [db.engine],
+                                      latency_budget=app.config['INSTRUMENTATION_LATENCY_BUDGET'],
+                                      n_plus_one=app.config['INSTRUMENTATION_N_PLUS_ONE'],
+                                      headers=app.config['INSTRUMENTATION_HEADERS'],
+                                      logger=app.logger)
+
+# Sampling profiler: records the stacks of a fraction of requests per route, for flamegraphs.
+# Off unless EDUBRIDGE_PROFILER=1 or switched on by an admin at /admin/profiler; workers share
+# that setting and their samples through PROFILER_DIR, syncing every PROFILER_SYNC_INTERVAL
+app.config['PROFILER_ENABLED'] = os.environ.get('EDUBRIDGE_PROFILER', '0') == '1'
+app.config['PROFILER_SAMPLE_RATE'] = 0.05  # fraction of requests profiled
+app.config['PROFILER_INTERVAL'] = 0.01  # seconds between stack samples
+app.config['PROFILER_DIR'] = os.path.join(app.instance_path, 'profiles')
+app.config['PROFILER_SYNC_INTERVAL'] = 2.0  # seconds
+profiler = SamplingProfiler(interval=app.config['PROFILER_INTERVAL'],
+                            sample_rate=app.config['PROFILER_SAMPLE_RATE'],
+                            enabled=app.config['PROFILER_ENABLED'],
+                            directory=app.config['PROFILER_DIR'],
+                            logger=app.logger)
+
+@app.before_request
+def start_profiling():
+    if profiler.enabled and request.url_rule is not None:
+        profiler.begin(request.url_rule.rule)
+
+@app.teardown_request
+def stop_profiling(exc):
+    profiler.end()
+
+# Optional content pack layered over the built-in topics (JSON, or YAML with PyYAML)
+app.config['CONTENT_PACK'] = os.environ.get('EDUBRIDGE_CONTENT_PACK')
+if app.config['CONTENT_PACK']:
+    use_content_pack(app.config['CONTENT_PACK'])
+
+# Learn page content cache
+app.config['LEARN_CACHE_SIZE'] = 256
+app.config['LEARN_CACHE_TTL'] = 600  # seconds
+learn_cache = TTLLRUCache(maxsize=app.config['LEARN_CACHE_SIZE'], ttl=app.config['LEARN_CACHE_TTL'])
+LEARN_MODES = ('basic', 'deep', 'action')
+
+# A topic counts towards progress once per user per window, so refreshes and repeat links are not recounted
+app.config['LEARN_REPEAT_VIEW_WINDOW'] = 3600  # seconds
+app.config['LEARN_REPEAT_VIEW_CACHE_SIZE'] = 50000
+recent_topic_views = TTLLRUCache(maxsize=app.config['LEARN_REPEAT_VIEW_CACHE_SIZE'],
+                                 ttl=app.config['LEARN_REPEAT_VIEW_WINDOW'])
+
+# Rendered template fragments shared between users: {% cache key, ttl %} blocks in the templates
+app.config['FRAGMENT_CACHE_SIZE'] = 512
+app.jinja_env.add_extension(FragmentCacheExtension)
+app.jinja_env.fragment_cache = TTLLRUCache(maxsize=app.config['FRAGMENT_CACHE_SIZE'])
+
+# Per-user progress snapshots, so page views do not re-read UserProgress
+app.config['PROGRESS_CACHE_SIZE'] = 10000
+app.config['PROGRESS_CACHE_TTL'] = 120  # seconds; bounds staleness across workers
+progress_cache = TTLLRUCache(maxsize=app.config['PROGRESS_CACHE_SIZE'], ttl=app.config['PROGRESS_CACHE_TTL'])
+
+# Signed-in users' account columns, so each request does not re-read its User row
+app.config['IDENTITY_CACHE_SIZE'] = 10000
+app.config['IDENTITY_CACHE_TTL'] = 60  # seconds; bounds how long other workers see a changed or deleted account
+identity_cache = TTLLRUCache(maxsize=app.config['IDENTITY_CACHE_SIZE'], ttl=app.config['IDENTITY_CACHE_TTL'])
+
+# Answer keys of the quizzes shown on /learn; submissions send the quiz id and option indexes only.
+# Keys live in this process, so run several workers with sticky sessions.
+app.config['QUIZ_STORE_SIZE'] = 50000
+app.config['QUIZ_STORE_TTL'] = 3600  # seconds to answer a quiz
+quiz_store = QuizSessionStore(maxsize=app.config['QUIZ_STORE_SIZE'], ttl=app.config['QUIZ_STORE_TTL'])
+
+# Explanation backend: 'template' (static, rendered inline), 'fake' (simulated
+# model latency, streamed) or 'openai' (OpenAI-compatible model server, streamed)
+app.config['LLM_BACKEND'] = os.environ.get('EDUBRIDGE_LLM_BACKEND', 'template')
+app.config['LLM_OPTIONS'] = json.loads(os.environ.get('EDUBRIDGE_LLM_OPTIONS', '{}'))
+llm_backend = create_backend(app.config['LLM_BACKEND'], **app.config['LLM_OPTIONS'])
+
+# Learn page generators run in parallel, each with its own deadline (seconds)
+app.config['LEARN_GENERATOR_WORKERS'] = 16
+app.config['LEARN_GENERATOR_TIMEOUT'] = 2.0
+app.config['LEARN_AI_TIMEOUT'] = 15.0
+app.config['LEARN_GENERATOR_MAX_IN_FLIGHT'] = 4  # calls per generator; beyond it (a stuck backend) fall back at once
+generator_fanout = GeneratorFanOut(max_workers=app.config['LEARN_GENERATOR_WORKERS'],
+                                   max_in_flight=app.config['LEARN_GENERATOR_MAX_IN_FLIGHT'], logger=app.logger)
+
+# Password hashing: werkzeug method and cost for new hashes (older hashes are replaced at the next
+# login). Hashing runs on PASSWORD_HASH_WORKERS threads (0: in the request thread); logins beyond
+# PASSWORD_HASH_MAX_PENDING waiting are turned away with a 503 instead of queueing
+app.config['PASSWORD_HASH_METHOD'] = os.environ.get('EDUBRIDGE_PASSWORD_HASH', 'scrypt:32768:8:1')
+app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('EDUBRIDGE_PASSWORD_HASH_WORKERS',
+                                                         max(1, (os.cpu_count() or 2) // 2)))
+app.config['PASSWORD_HASH_MAX_PENDING'] = 64
+password_hasher = PasswordHasher(app.config['PASSWORD_HASH_METHOD'],
+                                 workers=app.config['PASSWORD_HASH_WORKERS'],
+                                 max_pending=app.config['PASSWORD_HASH_MAX_PENDING'])
+atexit.register(password_hasher.shutdown)
 
 # Flask-Login setup
 login_manager = LoginManager()
@@ -22,6 +166,20 @@ login_manager.login_view = 'login'
 login_manager.login_message = 'Please log in to access this page.'
 login_manager.login_message_category = 'info'
 
+# Usernames allowed into the /admin endpoints (comma-separated in EDUBRIDGE_ADMIN_USERS)
+app.config['ADMIN_USERS'] = {name.strip() for name in os.environ.get('EDUBRIDGE_ADMIN_USERS', '').split(',')
+                             if name.strip()}
+
+def admin_required(view):
+    """Like login_required, and the user must also be listed in ADMIN_USERS"""
+    @wraps(view)
+    @login_required
+    def wrapped(*args, **kwargs):
+        if current_user.username not in app.config['ADMIN_USERS']:
+            abort(403)
+        return view(*args, **kwargs)
+    return wrapped
+
 # Database Models
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -31,10 +189,10 @@ class User(UserMixin, db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
 
 class UserProgress(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -45,9 +203,14 @@ class UserProgress(db.Model):
     sdg_6_topics = db.Column(db.Integer, default=0)
     sdg_13_topics = db.Column(db.Integer, default=0)
     total_score = db.Column(db.Integer, default=0)
-    badges = db.Column(db.Text, default='[]')  # JSON string
+    quiz_streak = db.Column(db.Integer, default=0)  # quizzes passed in a row
+    badges = db.Column(db.Text, default='[]')  # legacy JSON list; earned badges are in user_badge
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_user_progress_total_score', 'total_score'),  # leaderboard ORDER BY ... LIMIT
+    )
 
 class CommunityPost(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -55,6 +218,11 @@ class CommunityPost(db.Model):
     action = db.Column(db.Text, nullable=False)
     likes = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_community_post_feed', 'created_at', 'id'),  # newest-first feeds and keyset cursors
+        db.Index('ix_community_post_username_likes', 'username', 'likes'),  # covers top contributors
+    )
 
 class QuizAttempt(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -64,27 +232,505 @@ class QuizAttempt(db.Model):
     total_questions = db.Column(db.Integer, nullable=False)
     percentage = db.Column(db.Float, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_quiz_attempt_session_created', 'session_id', 'created_at'),  # a user's attempts
+        db.Index('ix_quiz_attempt_topic_percentage', 'topic', 'percentage'),  # covers topic stats
+    )
+
+class AppliedWriteBatch(db.Model):
+    """Write-behind batches already committed, so journal replay applies each batch once"""
+    id = db.Column(db.String(32), primary_key=True)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class AnalyticsTotal(db.Model):
+    """Platform-wide counters for /analytics, bumped in the same transaction as the writes they count"""
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class TopicStat(db.Model):
+    """Per-topic quiz attempt count and running percentage sum for /analytics"""
+    topic = db.Column(db.String(200), primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    percentage_sum = db.Column(db.Float, nullable=False, default=0.0)
+    
+    __table_args__ = (
+        db.Index('ix_topic_stat_attempts', 'attempts'),
+    )
+    
+    @property
+    def avg_score(self):
+        return self.percentage_sum / self.attempts if self.attempts else 0.0
+
+class LeaderboardEntry(db.Model):
+    """Ranking table: a member's score and event count on a board for one period ('all', week or month)"""
+    board = db.Column(db.String(20), primary_key=True)  # 'learners' (quiz score) or 'contributors' (likes)
+    period = db.Column(db.String(10), primary_key=True)
+    member = db.Column(db.String(100), primary_key=True)
+    score = db.Column(db.Integer, nullable=False, default=0)
+    events = db.Column(db.Integer, nullable=False, default=0)  # quizzes taken or posts made
+
+class UserBadge(db.Model):
+    """A badge earned by a progress row, by badge rule id"""
+    session_id = db.Column(db.String(100), primary_key=True)
+    badge = db.Column(db.String(50), primary_key=True)
+    earned_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class ActivityEvent(db.Model):
+    """Append-only log of learning activity; progress, quiz attempts, analytics and leaderboards are projections of it"""
+    id = db.Column(db.Integer, primary_key=True)  # log position
+    kind = db.Column(db.String(30), nullable=False)
+    actor = db.Column(db.String(100))  # progress key, or username for posts
+    subject = db.Column(db.String(200))  # topic or post id
+    data = db.Column(db.Text, nullable=False, default='{}')  # JSON
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_activity_event_actor', 'actor', 'id'),  # a user's history
+        db.Index('ix_activity_event_kind_created', 'kind', 'created_at'),  # reports over a period
+    )
+
+# Analytics rollup: AnalyticsTotal names and the UserProgress columns summed into them
+ANALYTICS_TOTALS = ('users', 'posts', 'quiz_attempts', 'likes', 'sdg_4', 'sdg_6', 'sdg_13')
+SDG_TOTALS = {'sdg_4_topics': 'sdg_4', 'sdg_6_topics': 'sdg_6', 'sdg_13_topics': 'sdg_13'}
+
+def count_analytics(**deltas):
+    """Add to platform totals in the current transaction"""
+    for name, delta in deltas.items():
+        if delta:
+            upsert_increment(db.session, AnalyticsTotal.__table__, {'name': name}, {'value': delta},
+                             {'updated_at': datetime.utcnow()})
+
+def count_topic_attempts(per_topic):
+    """Add {topic: (attempts, percentage sum)} to the per-topic rollup in the current transaction"""
+    for topic, (count, percentage_sum) in per_topic.items():
+        upsert_increment(db.session, TopicStat.__table__, {'topic': topic},
+                         {'attempts': count, 'percentage_sum': percentage_sum})
+
+def rebuild_analytics(connection):
+    """Recompute the analytics rollup from the raw tables"""
+    # Delete first: on SQLite this takes the write lock, so no increment lands between read and rewrite
+    connection.execute(db.delete(TopicStat))
+    connection.execute(db.delete(AnalyticsTotal))
+    connection.execute(db.insert(TopicStat).from_select(
+        ['topic', 'attempts', 'percentage_sum'],
+        db.select(QuizAttempt.topic, db.func.count(QuizAttempt.id), db.func.sum(QuizAttempt.percentage))
+        .group_by(QuizAttempt.topic)
+    ))
+    users, sdg_4, sdg_6, sdg_13 = connection.execute(db.select(
+        db.func.count(UserProgress.id), db.func.sum(UserProgress.sdg_4_topics),
+        db.func.sum(UserProgress.sdg_6_topics), db.func.sum(UserProgress.sdg_13_topics)
+    )).one()
+    posts, likes = connection.execute(db.select(db.func.count(CommunityPost.id),
+                                                db.func.sum(CommunityPost.likes))).one()
+    quiz_attempts = connection.execute(db.select(db.func.count(QuizAttempt.id))).scalar()
+    totals = {'users': users, 'posts': posts, 'quiz_attempts': quiz_attempts, 'likes': likes,
+              'sdg_4': sdg_4, 'sdg_6': sdg_6, 'sdg_13': sdg_13}
+    now = datetime.utcnow()
+    connection.execute(db.insert(AnalyticsTotal), [{'name': name, 'value': totals[name] or 0, 'updated_at': now}
+                                                   for name in ANALYTICS_TOTALS])
+
+def reconcile_analytics():
+    """Periodic job: replace the rollup with a fresh rebuild, correcting any drift"""
+    with app.app_context(), db.engine.begin() as connection:
+        rebuild_analytics(connection)
+
+def record_leaderboard(board, member, score=0, events=0, when=None):
+    """Add to a member's all-time, weekly and monthly totals in the current transaction.
+    Returns the change to hand to leaderboards.record() once the transaction commits."""
+    when = when or datetime.utcnow()
+    for window in LEADERBOARD_WINDOWS:
+        upsert_increment(db.session, LeaderboardEntry.__table__,
+                         {'board': board, 'period': period_key(window, when), 'member': member},
+                         {'score': score, 'events': events})
+    return board, member, score, events, when
+
+def rebuild_leaderboards(connection):
+    """Recompute the ranking table from the raw tables for all-time and the current week and month"""
+    # Likes carry no timestamp, so windowed contributor boards start from post counts alone
+    now = datetime.utcnow()
+    connection.execute(db.delete(LeaderboardEntry))
+    columns = ['board', 'period', 'member', 'score', 'events']
+    connection.execute(db.insert(LeaderboardEntry).from_select(columns, db.select(
+        db.literal('learners'), db.literal('all'), UserProgress.session_id,
+        db.func.coalesce(UserProgress.total_score, 0), db.func.coalesce(UserProgress.quizzes_completed, 0)
+    )))
+    connection.execute(db.insert(LeaderboardEntry).from_select(columns, db.select(
+        db.literal('contributors'), db.literal('all'), CommunityPost.username,
+        db.func.coalesce(db.func.sum(CommunityPost.likes), 0), db.func.count(CommunityPost.id)
+    ).group_by(CommunityPost.username)))
+    for window in ('week', 'month'):
+        start, period = period_start(window, now), period_key(window, now)
+        connection.execute(db.insert(LeaderboardEntry).from_select(columns, db.select(
+            db.literal('learners'), db.literal(period), QuizAttempt.session_id,
+            db.func.sum(QuizAttempt.score), db.func.count(QuizAttempt.id)
+        ).where(QuizAttempt.created_at >= start).group_by(QuizAttempt.session_id)))
+        connection.execute(db.insert(LeaderboardEntry).from_select(columns, db.select(
+            db.literal('contributors'), db.literal(period), CommunityPost.username,
+            db.literal(0), db.func.count(CommunityPost.id)
+        ).where(CommunityPost.created_at >= start).group_by(CommunityPost.username)))
+
+def load_leaderboard(board, period):
+    """(member, score, events) rows of one board period, for LeaderboardService"""
+    with nullcontext() if has_app_context() else app.app_context():
+        return db.session.execute(
+            db.select(LeaderboardEntry.member, LeaderboardEntry.score, LeaderboardEntry.events)
+            .filter_by(board=board, period=period)
+        ).all()
+
+leaderboards = LeaderboardService(load_leaderboard)
+
+def analytics_totals():
+    totals = dict.fromkeys(ANALYTICS_TOTALS, 0)
+    totals.update((row.name, row.value) for row in AnalyticsTotal.query)
+    return totals
+
+def backfill_user_badges(connection):
+    """Copy badges from the legacy JSON column into user_badge"""
+    now = datetime.utcnow()
+    rows = [{'session_id': session_id, 'badge': badge, 'earned_at': updated_at or now}
+            for session_id, badges, updated_at in connection.execute(
+                db.select(UserProgress.session_id, UserProgress.badges, UserProgress.updated_at))
+            for badge in sorted(set(json.loads(badges or '[]')))]
+    if rows:
+        connection.execute(db.insert(UserBadge), rows)
+
+# Progress counters derived from the activity log
+PROGRESS_COUNTERS = ('topics_learned', 'quizzes_completed', 'sdg_4_topics', 'sdg_6_topics',
+                     'sdg_13_topics', 'total_score', 'quiz_streak')
+
+def stored_event(event):
+    """Database row for a queued activity event"""
+    return dict(event, data=json.dumps(event['data'], separators=(',', ':')),
+                created_at=datetime.fromisoformat(event['created_at']))
+
+def update_progress_row(session_id, deltas, values, now):
+    """Add deltas to and set values on a UserProgress row in the current transaction"""
+    changes = {getattr(UserProgress, field): db.func.coalesce(getattr(UserProgress, field), 0) + delta
+               for field, delta in deltas.items()}
+    changes.update({getattr(UserProgress, field): value for field, value in values.items()})
+    changes[UserProgress.updated_at] = now
+    UserProgress.query.filter_by(session_id=session_id).update(changes, synchronize_session=False)
+
+def project_progress(events):
+    now = datetime.utcnow()
+    for session_id, change in fold_progress(events).items():
+        update_progress_row(session_id, change.deltas, change.values, now)
+
+def reset_progress():
+    db.session.execute(db.update(UserProgress).values(dict.fromkeys(PROGRESS_COUNTERS, 0)))
+
+def project_quiz_attempts(events):
+    attempts = [{'session_id': event['actor'], 'topic': event['subject'], 'score': event['data']['score'],
+                 'total_questions': event['data']['total'], 'percentage': event['data']['percentage'],
+                 'created_at': datetime.fromisoformat(event['created_at'])}
+                for event in events if event['kind'] == QUIZ_SUBMITTED]
+    if attempts:
+        db.session.execute(db.insert(QuizAttempt), attempts)
+
+def reset_quiz_attempts():
+    db.session.execute(db.delete(QuizAttempt))
+
+def project_analytics(events):
+    count_analytics(**{SDG_TOTALS.get(name, name): count
+                       for name, count in fold_totals(events, imported=SDG_TOTALS).items()})
+    count_topic_attempts(fold_topic_attempts(events))
+
+def reset_analytics():
+    # Users are counted as progress rows are created, not from the log
+    db.session.execute(db.delete(TopicStat))
+    db.session.execute(db.delete(AnalyticsTotal).where(AnalyticsTotal.name != 'users'))
+
+def project_leaderboards(events):
+    return [partial(leaderboards.record, *record_leaderboard(board, member, score, count, when))
+            for board, member, score, count, when in fold_rankings(events)]
+
+def reset_leaderboards():
+    db.session.execute(db.delete(LeaderboardEntry))
+
+activity_log = ActivityLog([
+    Projection('progress', project_progress, reset_progress),
+    Projection('quiz_attempts', project_quiz_attempts, reset_quiz_attempts),
+    Projection('analytics', project_analytics, reset_analytics),
+    Projection('leaderboards', project_leaderboards, reset_leaderboards),
+])
+
+def append_activity(events):
+    """Append events to the log and fold them into every projection, in the current transaction.
+    Returns the callables to run once it commits."""
+    if not events:
+        return []
+    db.session.execute(db.insert(ActivityEvent), [stored_event(event) for event in events])
+    return activity_log.project(events)
+
+def read_activity_page(after_id, limit):
+    """Stored events after a log position, oldest first, for replay"""
+    rows = db.session.execute(db.select(ActivityEvent.__table__).where(ActivityEvent.id > after_id)
+                              .order_by(ActivityEvent.id).limit(limit))
+    return [{'id': row.id, 'kind': row.kind, 'actor': row.actor, 'subject': row.subject,
+             'data': json.loads(row.data), 'created_at': row.created_at.isoformat()} for row in rows]
+
+def replay_activity(*names):
+    """Rebuild projections (all by default) from the activity log in one transaction; returns the events replayed"""
+    with nullcontext() if has_app_context() else app.app_context():
+        # Resetting first takes the SQLite write lock, so no new event lands mid-replay
+        replayed = activity_log.replay(read_activity_page, names)
+        db.session.commit()
+    progress_cache.clear()
+    leaderboards.refresh()
+    return replayed
+
+@app.cli.command('replay-activity')
+@click.argument('projections', nargs=-1)
+def replay_activity_command(projections):
+    """Rebuild projections (progress, quiz_attempts, analytics, leaderboards; all by default) from the activity log"""
+    try:
+        replayed = replay_activity(*projections)
+    except ValueError as error:
+        raise click.BadParameter(str(error), param_hint='PROJECTIONS')
+    click.echo(f"Replayed {replayed} events into {', '.join(projections or activity_log.projections)}")
+
+def import_activity_history(connection):
+    """Seed the activity log with the posts, likes, quiz attempts and progress recorded before it existed"""
+    events = []
+    for post in connection.execute(db.select(CommunityPost.id, CommunityPost.username, CommunityPost.likes,
+                                             CommunityPost.created_at)):
+        events.append(activity_event(POST_CREATED, post.username, post.id, post.created_at))
+        if post.likes:
+            # When the likes came in is unknown; they count from the post's creation
+            events.append(activity_event(POST_LIKED, None, post.id, post.created_at,
+                                         author=post.username, count=post.likes))
+    for attempt in connection.execute(db.select(QuizAttempt.__table__)):
+        events.append(activity_event(QUIZ_SUBMITTED, attempt.session_id, attempt.topic, attempt.created_at,
+                                     score=attempt.score, total=attempt.total_questions,
+                                     percentage=attempt.percentage,
+                                     passed=attempt.percentage >= app.config['QUIZ_STREAK_PERCENTAGE']))
+    events.sort(key=lambda event: event['created_at'])
+    # Topic views were only counted, so progress is carried over as a snapshot that replays end on
+    events.extend(activity_event(PROGRESS_IMPORTED, row.session_id,
+                                 **{field: getattr(row, field) or 0 for field in PROGRESS_COUNTERS})
+                  for row in connection.execute(db.select(UserProgress.__table__)))
+    if events:
+        connection.execute(db.insert(ActivityEvent), [stored_event(event) for event in events])
+
+# Schema changes for databases created by earlier versions, applied at startup
+MIGRATIONS = [
+    Migration(1, 'Indexes for leaderboard, analytics and community queries',
+              create_indexes(UserProgress.__table__, CommunityPost.__table__, QuizAttempt.__table__)),
+    Migration(2, 'Backfill the analytics rollup', rebuild_analytics),
+    Migration(3, 'Backfill the leaderboard ranking table', rebuild_leaderboards),
+    Migration(4, 'Keyset feed index and analytics change times', steps(
+        add_columns(AnalyticsTotal.__table__, 'updated_at'),
+        create_indexes(CommunityPost.__table__),
+        drop_indexes('ix_community_post_created_at'),
+    )),
+    Migration(5, 'Quiz streaks and the user_badge table', steps(
+        add_columns(UserProgress.__table__, 'quiz_streak'),
+        backfill_user_badges,
+    )),
+    Migration(6, 'Seed the activity log', import_activity_history),
+]
+
+def flush_write_batch(batch):
+    """Append a batch of activity events, projecting them, and earned badges in one transaction"""
+    # Synchronous writes reuse the request's session instead of checking out a second connection
+    with nullcontext() if has_app_context() else app.app_context():
+        db.session.add(AppliedWriteBatch(id=batch.id))
+        try:
+            db.session.flush()
+        except IntegrityError:
+            # Already applied before a crash or by another worker replaying the journal
+            db.session.rollback()
+            return
+        
+        # Progress increments queued directly (journals written before the activity log)
+        now = datetime.utcnow()
+        for session_id in set(batch.deltas) | set(batch.values):
+            update_progress_row(session_id, batch.deltas.get(session_id, {}), batch.values.get(session_id, {}), now)
+        count_analytics(**{total: sum(deltas.get(field, 0) for deltas in batch.deltas.values())
+                           for field, total in SDG_TOTALS.items()})
+        
+        after_commit = append_activity(batch.rows.get('activity_event'))
+        
+        badges = batch.rows.get('user_badge')
+        if badges:
+            # A badge can be awarded twice when a request races a flush; the first award stands
+            insert_ignore(db.session, UserBadge.__table__, [
+                dict(row, earned_at=datetime.fromisoformat(row['earned_at'])) for row in badges
+            ])
+        
+        after_commit += [partial(leaderboards.record, *record_leaderboard(
+                             'learners', session_id, deltas.get('total_score', 0),
+                             deltas.get('quizzes_completed', 0), now))
+                         for session_id, deltas in batch.deltas.items()
+                         if deltas.get('total_score') or deltas.get('quizzes_completed')]
+        db.session.commit()
+        for callback in after_commit:
+            callback()
+
+def prune_applied_batches():
+    """Periodic job: forget applied batch ids whose journal files are gone, so the table stays small.
+    Ids applied before the oldest batch file still on disk can never be replayed again."""
+    cutoff = datetime.utcnow() - timedelta(seconds=app.config['WRITE_BEHIND_APPLIED_RETENTION'])
+    oldest = write_behind.oldest_batch_time()
+    if oldest is not None:
+        cutoff = min(cutoff, datetime.utcfromtimestamp(oldest))
+    with app.app_context():
+        pruned = db.session.execute(db.delete(AppliedWriteBatch).where(AppliedWriteBatch.applied_at < cutoff)).rowcount
+        db.session.commit()
+    return pruned
+
+def increment_likes(post_id, delta):
+    """Atomically add to a post's likes in the current transaction; returns (likes, username) or None"""
+    statement = (db.update(CommunityPost).filter_by(id=post_id)
+                 .values(likes=db.func.coalesce(CommunityPost.likes, 0) + delta))
+    if db.engine.dialect.update_returning:
+        return db.session.execute(statement.returning(CommunityPost.likes, CommunityPost.username)).first()
+    # No RETURNING (MySQL): the UPDATE holds the row lock until commit, so this read sees our increment
+    if db.session.execute(statement).rowcount == 0:
+        return None
+    return db.session.execute(
+        db.select(CommunityPost.likes, CommunityPost.username).filter_by(id=post_id)).first()
+
+def flush_likes(deltas):
+    """Write buffered likes: one UPDATE and one post_liked event per post, in one transaction"""
+    with app.app_context():
+        totals, events = {}, []
+        for post_id, delta in deltas.items():
+            row = increment_likes(post_id, delta)
+            if row is None:
+                continue  # deleted since it was liked
+            totals[post_id] = row.likes
+            events.append(activity_event(POST_LIKED, None, post_id, author=row.username, count=delta))
+        after_commit = append_activity(events)
+        db.session.commit()
+        for callback in after_commit:
+            callback()
+        return totals
+
+# Likes are written atomically per request. EDUBRIDGE_LIKE_BUFFER=1 instead counts them in
+# memory and writes the sums every LIKE_BUFFER_INTERVAL seconds, for viral posts; buffered
+# likes are lost if the process dies before a flush.
+app.config['LIKE_BUFFER_ENABLED'] = os.environ.get('EDUBRIDGE_LIKE_BUFFER', '0') == '1'
+app.config['LIKE_BUFFER_INTERVAL'] = 1.0  # seconds
+app.config['LIKE_BUFFER_SHARDS'] = 16
+like_buffer = ShardedCounter(flush_likes, shards=app.config['LIKE_BUFFER_SHARDS']) \
+    if app.config['LIKE_BUFFER_ENABLED'] else None
+
+# New posts and like counts are pushed to /api/posts/stream subscribers in batches cut every
+# FEED_BROKER_WINDOW seconds. With several workers, set EDUBRIDGE_FEED_BROKER_URL=redis://...
+# so events reach the subscribers connected to the other workers.
+app.config['FEED_BROKER_URL'] = os.environ.get('EDUBRIDGE_FEED_BROKER_URL', '')
+app.config['FEED_BROKER_WINDOW'] = 0.25  # seconds
+app.config['FEED_MAX_SUBSCRIBERS'] = 5000
+app.config['FEED_KEEPALIVE'] = 15.0  # seconds
+feed_broker = FeedBroker(create_transport(app.config['FEED_BROKER_URL']),
+                         window=app.config['FEED_BROKER_WINDOW'],
+                         max_subscribers=app.config['FEED_MAX_SUBSCRIBERS'],
+                         logger=app.logger).start()
+atexit.register(feed_broker.close)
+
+# Progress and quiz attempt writes are coalesced and flushed in batches.
+# Set EDUBRIDGE_WRITE_BEHIND=0 to write synchronously on every request.
+app.config['WRITE_BEHIND_ENABLED'] = os.environ.get('EDUBRIDGE_WRITE_BEHIND', '1') != '0'
+app.config['WRITE_BEHIND_INTERVAL'] = 1.0  # seconds
+app.config['WRITE_BEHIND_MAX_PENDING'] = 500
+app.config['WRITE_BEHIND_JOURNAL_DIR'] = os.path.join(app.instance_path, 'journal')
+app.config['WRITE_BEHIND_FSYNC'] = False
+write_behind = WriteBehindQueue(
+    flush_write_batch,
+    interval=app.config['WRITE_BEHIND_INTERVAL'],
+    max_pending=app.config['WRITE_BEHIND_MAX_PENDING'],
+    journal_dir=app.config['WRITE_BEHIND_JOURNAL_DIR'] if app.config['WRITE_BEHIND_ENABLED'] else None,
+    fsync=app.config['WRITE_BEHIND_FSYNC'],
+    synchronous=not app.config['WRITE_BEHIND_ENABLED'],
+)
+atexit.register(write_behind.close)
+
+def user_identity(user):
+    """Plain-dict copy of a User row's columns"""
+    return {'id': user.id, 'username': user.username, 'email': user.email,
+            'password_hash': user.password_hash, 'created_at': user.created_at}
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    """The signed-in user, rebuilt from the identity cache as a detached User; read it, don't change it"""
+    user_id = int(user_id)
+    identity = identity_cache.get(user_id)
+    if identity is None:
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        identity = user_identity(user)
+        identity_cache.set(user_id, identity)
+    user = User(**identity)
+    make_transient_to_detached(user)
+    return user
 
-# Initialize user progress if not exists
-def init_user_progress():
+@db.event.listens_for(db.session, 'after_flush')
+def collect_changed_users(session, flush_context):
+    """Note the users a flush changed or deleted; they leave the identity cache once the transaction commits"""
+    changed = {user.id for user in session.dirty | session.deleted if isinstance(user, User)}
+    if changed:
+        session.info.setdefault('changed_users', set()).update(changed)
+
+@db.event.listens_for(db.session, 'after_commit')
+def forget_identities(session):
+    """Re-read changed or deleted accounts on their next request (in other workers, within IDENTITY_CACHE_TTL).
+    Not before the commit: a request in between would cache the row as it was."""
+    for user_id in session.info.pop('changed_users', ()):
+        identity_cache.pop(user_id)
+
+@db.event.listens_for(db.session, 'after_rollback')
+def drop_changed_users(session):
+    session.info.pop('changed_users', None)
+
+# Badges are declared in content/badges.json; EDUBRIDGE_BADGE_RULES points at another rules file
+app.config['BADGE_RULES'] = os.environ.get('EDUBRIDGE_BADGE_RULES') or DEFAULT_BADGE_RULES
+app.config['QUIZ_STREAK_PERCENTAGE'] = 80  # quizzes scoring at least this extend the streak
+badge_engine = BadgeEngine(load_badge_rules(app.config['BADGE_RULES']))
+app.add_template_filter(badge_count)
+
+def progress_snapshot(user_progress, badges=0):
+    """Plain-dict copy of a UserProgress row; badges is the bitset of earned badges"""
+    return {
+        'topics_learned': user_progress.topics_learned,
+        'quizzes_completed': user_progress.quizzes_completed,
+        'sdg_4_topics': user_progress.sdg_4_topics,
+        'sdg_6_topics': user_progress.sdg_6_topics,
+        'sdg_13_topics': user_progress.sdg_13_topics,
+        'badges': badges,
+        'total_score': user_progress.total_score,
+        'quiz_streak': user_progress.quiz_streak or 0
+    }
+
+def copy_progress(progress):
+    """Copy a progress dict so the cached snapshot is never changed through a request's copy"""
+    return dict(progress)
+
+def get_progress_key(create=False):
+    """Key of the current user's UserProgress row"""
     if current_user.is_authenticated:
         # Use user ID for authenticated users
-        session_id = f"user_{current_user.id}"
-    else:
-        # Use session ID for anonymous users
-        session_id = session.get('session_id')
-        if not session_id:
-            session_id = f"session_{datetime.utcnow().timestamp()}"
-            session['session_id'] = session_id
-    
-    # Check if user progress exists in database
-    user_progress = UserProgress.query.filter_by(session_id=session_id).first()
+        return f"user_{current_user.id}"
+    # Use session ID for anonymous users
+    session_id = session.get('session_id')
+    if not session_id and create:
+        session_id = f"session_{datetime.utcnow().timestamp()}"
+        session['session_id'] = session_id
+    return session_id
+
+def load_progress_snapshot(session_id, create=False):
+    """Read progress from the database, including activity and badges still waiting to be flushed"""
+    user_progress, (events, awards) = write_behind.read_through(
+        session_id, lambda: UserProgress.query.filter_by(session_id=session_id).first(),
+        lambda key: (write_behind.pending_rows('activity_event', actor=key),
+                     write_behind.pending_rows('user_badge', session_id=key)))
     
     if not user_progress:
+        if not create:
+            return None
         # Create new user progress record
         user_progress = UserProgress(
             session_id=session_id,
@@ -94,63 +740,159 @@ def init_user_progress():
             sdg_6_topics=0,
             sdg_13_topics=0,
             total_score=0,
+            quiz_streak=0,
             badges='[]'
         )
         db.session.add(user_progress)
-        db.session.commit()
-    
-    # Update session with database data
-    session['progress'] = {
-        'topics_learned': user_progress.topics_learned,
-        'quizzes_completed': user_progress.quizzes_completed,
-        'sdg_4_topics': user_progress.sdg_4_topics,
-        'sdg_6_topics': user_progress.sdg_6_topics,
-        'sdg_13_topics': user_progress.sdg_13_topics,
-        'badges': json.loads(user_progress.badges),
-        'total_score': user_progress.total_score
-    }
+        count_analytics(users=1)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # A concurrent request for the same user created the row first; use theirs
+            db.session.rollback()
+            return load_progress_snapshot(session_id)
     
-    return user_progress
+    badges = badge_engine.to_bits(db.session.execute(
+        db.select(UserBadge.badge).filter_by(session_id=session_id)).scalars())
+    badges |= badge_engine.to_bits(award['badge'] for award in awards)
+    snapshot = progress_snapshot(user_progress, badges)
+    for change in fold_progress(events).values():
+        change.apply_to(snapshot)
+    progress_cache.set(session_id, snapshot)
+    return snapshot
 
-def update_user_progress():
-    """Update user progress in database"""
-    if current_user.is_authenticated:
-        session_id = f"user_{current_user.id}"
-    else:
-        session_id = session.get('session_id')
-        if not session_id:
-            return
+# Initialize user progress if not exists
+def init_user_progress():
+    session_id = get_progress_key(create=True)
+    snapshot = progress_cache.get(session_id) or load_progress_snapshot(session_id, create=True)
     
-    user_progress = UserProgress.query.filter_by(session_id=session_id).first()
-    if user_progress:
-        user_progress.topics_learned = session['progress']['topics_learned']
-        user_progress.quizzes_completed = session['progress']['quizzes_completed']
-        user_progress.sdg_4_topics = session['progress']['sdg_4_topics']
-        user_progress.sdg_6_topics = session['progress']['sdg_6_topics']
-        user_progress.sdg_13_topics = session['progress']['sdg_13_topics']
-        user_progress.total_score = session['progress']['total_score']
-        user_progress.badges = json.dumps(session['progress']['badges'])
-        user_progress.updated_at = datetime.utcnow()
-        db.session.commit()
+    # Request-local copy; the progress cache and database stay the only stored state
+    g.progress = copy_progress(snapshot)
+    return g.progress
 
-def check_badge_achievements():
-    """Check and award badges based on progress"""
-    badges = session['progress']['badges']
-    topics_learned = session['progress']['topics_learned']
-    
-    # Eco Starter badge
-    if topics_learned >= 3 and 'eco_starter' not in badges:
-        badges.append('eco_starter')
-    
-    # Water Warrior badge
-    if topics_learned >= 5 and 'water_warrior' not in badges:
-        badges.append('water_warrior')
+def record_activity(kind, subject=None, **data):
+    """Queue an activity event by the current user and apply it to their request-local progress"""
+    event = activity_event(kind, get_progress_key(), subject, **data)
+    write_behind.add_row('activity_event', event)
+    for change in fold_progress([event]).values():
+        change.apply_to(g.progress)
+
+def update_user_progress():
+    """Queue the badges earned since the last read or write and cache the new progress"""
+    session_id = get_progress_key()
+    if not session_id:
+        return
     
-    # Climate Champion badge
-    if topics_learned >= 10 and 'climate_champion' not in badges:
-        badges.append('climate_champion')
+    progress = g.progress
+    snapshot = progress_cache.get(session_id) or load_progress_snapshot(session_id)
+    if snapshot is None:
+        return
     
-    session['progress']['badges'] = badges
+    # Counters reach the database through the activity log; only badge awards are written here
+    awarded = progress['badges'] & ~snapshot['badges']
+    earned_at = datetime.utcnow().isoformat()
+    for badge in badge_engine.ids(awarded):
+        write_behind.add_row('user_badge', {'session_id': session_id, 'badge': badge, 'earned_at': earned_at})
+    progress_cache.set(session_id, copy_progress(progress))
+
+def check_badge_achievements(*counters):
+    """Award the badges reached by the progress counters that just changed"""
+    g.progress['badges'] = badge_engine.evaluate(g.progress, g.progress['badges'], counters)
+
+def learn_cache_key(topic, mode):
+    """Normalized (topic, mode) pair used to share cached content between requests"""
+    if mode not in LEARN_MODES:
+        mode = 'basic'
+    return normalize_topic(topic), mode
+
+# /learn is a pipeline: classify the request, generate its content (pure, cached per topic and
+# mode), render, then record the view in the user's progress (deferred to the write-behind queue,
+# and skipped for repeat views)
+
+def classify_learn_topic(topic_key):
+    """Classification of a normalized topic, cached with the learn content"""
+    return learn_cache.get_or_set(('classification', topic_key), lambda: classify_topic(topic_key.title()))
+
+def classify_learn_request():
+    """Classify stage: (topic, cache key, classification) for a POST form or GET ?topic= link, or None"""
+    source = request.form if request.method == 'POST' else request.args
+    topic = source.get('topic', '').strip()
+    if not topic:
+        return None
+    key = learn_cache_key(topic, source.get('mode', 'basic'))
+    return topic, key, classify_learn_topic(key[0])
+
+def get_learn_content(key, classification):
+    """Generate stage: the learn page content for a cache key, running the generators concurrently on a miss.
+    Depends only on the key, so it is shared by every user and spelling of the topic."""
+    content = learn_cache.get(key)
+    if content is not None:
+        return dict(content, daily_tip=get_daily_tip())
+
+    # Render from the canonical spelling so every variant of a topic shares one entry
+    display_topic = key[0].title()
+    store = get_content_store()
+    timeout = app.config['LEARN_GENERATOR_TIMEOUT']
+    tasks = {
+        'daily_tip': GeneratorTask(get_daily_tip, lambda: store.eco_tips[0], timeout),
+        'youtube_videos': GeneratorTask(lambda: get_youtube_links(display_topic, classification),
+                                        lambda: store.videos['default'], timeout),
+        'quiz_questions': GeneratorTask(lambda: generate_quiz(display_topic, classification),
+                                        lambda: store.quizzes['default'], timeout),
+        'action_plan': GeneratorTask(lambda: get_action_plan(display_topic, classification),
+                                     lambda: get_action_plan(display_topic, classify_topic('')), timeout),
+    }
+    # Slow backends are streamed separately by /learn/stream
+    if not llm_backend.streaming:
+        tasks['ai_output'] = GeneratorTask(lambda: llm_backend.generate(display_topic, key[1], classification),
+                                           lambda: get_ai_response(display_topic, key[1], classification),
+                                           app.config['LEARN_AI_TIMEOUT'])
+
+    result = generator_fanout.run(tasks, label=f'{key[0]!r}/{key[1]}')
+    for name, ms in result.timings.items():
+        record_span(f'generator:{name}', ms / 1000)
+    content = dict(result.values)
+    daily_tip = content.pop('daily_tip')
+    content.setdefault('ai_output', None)
+    # Fallback content is served but not cached, so the next request retries
+    if not result.fallbacks - {'daily_tip'}:
+        learn_cache.set(key, content)
+    return dict(content, daily_tip=daily_tip)
+
+def get_cached_explanation(key):
+    """Explanation previously streamed for this cache key, if still cached"""
+    return learn_cache.get(('explanation',) + key)
+
+def render_learn_page(topic, key, content):
+    """Render stage: the learn page, with a fresh quiz id for its quiz"""
+    ai_output = content['ai_output'] or get_cached_explanation(key)
+    # The explanation, action plan, quiz and videos are shared while the content is cached;
+    # fallback content is not cached, so neither is its markup
+    fragment = (topic, key[1], bool(ai_output)) if key in learn_cache else None
+    return render_template('learn.html',
+                           topic=topic,
+                           learn_fragment=fragment,
+                           ai_output=ai_output,
+                           explanation_stream_url=None if ai_output else url_for('learn_stream', topic=topic, mode=key[1]),
+                           youtube_videos=content['youtube_videos'],
+                           daily_tip=content['daily_tip'],
+                           quiz_questions=content['quiz_questions'],
+                           quiz_id=quiz_store.register(content['quiz_questions'], topic, get_progress_key(create=True)),
+                           action_plan=content['action_plan'])
+
+def record_topic_view(topic, key, classification):
+    """Record stage: count the view towards progress, the topic's SDG and badges.
+    Returns False, without touching progress, for a repeat view within LEARN_REPEAT_VIEW_WINDOW."""
+    viewer = (get_progress_key(create=True), key[0])
+    if recent_topic_views.get(viewer):
+        return False
+    recent_topic_views.set(viewer, True)
+    init_user_progress()
+    sdg_field = classification.sdg_field
+    record_activity(TOPIC_VIEWED, topic, **({'sdg': sdg_field} if sdg_field else {}))
+    check_badge_achievements('topics_learned', sdg_field)
+    update_user_progress()
+    return True
 
 # Authentication routes
 @app.route('/auth')
@@ -165,9 +907,25 @@ def login():
         username = request.form['username']
         password = request.form['password']
         user = User.query.filter_by(username=username).first()
+        # Hand the connection back while the hash is checked, so waiting logins don't hold the pool
+        db.session.close()
         
-        if user and user.check_password(password):
+        try:
+            valid = user is not None and user.check_password(password)
+            if valid and password_hasher.needs_rehash(user.password_hash):
+                # Stored with older hash parameters; replace it unless the password changed meanwhile
+                db.session.execute(db.update(User).filter_by(id=user.id, password_hash=user.password_hash)
+                                   .values(password_hash=password_hasher.hash(password)))
+                db.session.commit()
+                identity_cache.pop(user.id)  # bulk updates bypass the session's change tracking
+        except HasherBusy:
+            flash('Too many people are signing in right now. Please try again in a moment.', 'error')
+            return render_template('login.html'), 503, {'Retry-After': '1'}
+        
+        if valid:
             login_user(user)
+            # New session id on login, so an id issued before authentication is worthless
+            session.regenerate()
             flash('Login successful!', 'success')
             return redirect(url_for('index'))
         else:
@@ -189,19 +947,23 @@ def register():
             flash('Passwords do not match', 'error')
             return render_template('register.html')
         
-        if User.query.filter_by(username=username).first():
-            flash('Username already exists', 'error')
-            return render_template('register.html')
-        
-        if User.query.filter_by(email=email).first():
-            flash('Email already registered', 'error')
-            return render_template('register.html')
-        
-        # Create new user
+        # Create new user; the unique constraints reject a taken username or email in the same insert
         user = User(username=username, email=email)
-        user.set_password(password)
+        try:
+            user.set_password(password)
+        except HasherBusy:
+            flash('Too many people are signing up right now. Please try again in a moment.', 'error')
+            return render_template('register.html'), 503, {'Retry-After': '1'}
         db.session.add(user)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError as exc:
+            db.session.rollback()
+            if 'email' in str(exc.orig).lower():
+                flash('Email already registered', 'error')
+            else:
+                flash('Username already exists', 'error')
+            return render_template('register.html')
         
         flash('Registration successful! Please log in.', 'success')
         return redirect(url_for('login'))
@@ -212,6 +974,7 @@ def register():
 @login_required
 def logout():
     """User logout"""
+    identity_cache.pop(current_user.id)
     logout_user()
     flash('You have been logged out', 'info')
     return redirect(url_for('auth'))
@@ -233,94 +996,160 @@ def index():
 @login_required
 def learn():
     """Learning center route with AI integration"""
-    init_user_progress()
-    
-    if request.method == 'POST':
-        topic = request.form['topic']
-        mode = request.form.get('mode', 'basic')
-        ai_output = get_ai_response(topic, mode)
-        youtube_videos = get_youtube_links(topic)
-        daily_tip = get_daily_tip()
-        quiz_questions = generate_quiz(topic)
-        action_plan = get_action_plan(topic)
-        
-        # Update progress
-        session['progress']['topics_learned'] += 1
-        
-        # Determine SDG category
-        topic_lower = topic.lower()
-        if any(word in topic_lower for word in ['education', 'learning', 'school']):
-            session['progress']['sdg_4_topics'] += 1
-        elif any(word in topic_lower for word in ['water', 'ocean', 'river', 'pollution']):
-            session['progress']['sdg_6_topics'] += 1
-        elif any(word in topic_lower for word in ['climate', 'carbon', 'energy', 'renewable']):
-            session['progress']['sdg_13_topics'] += 1
-        
-        # Check for badge achievements
-        check_badge_achievements()
-        update_user_progress()
-        
-        return render_template('learn.html', 
-                             topic=topic, 
-                             ai_output=ai_output,
-                             youtube_videos=youtube_videos,
-                             daily_tip=daily_tip,
-                             quiz_questions=quiz_questions,
-                             action_plan=action_plan)
-    elif request.method == 'GET' and request.args.get('topic'):
-        topic = request.args.get('topic')
-        mode = request.args.get('mode', 'basic')
-        ai_output = get_ai_response(topic, mode)
-        youtube_videos = get_youtube_links(topic)
-        daily_tip = get_daily_tip()
-        quiz_questions = generate_quiz(topic)
-        action_plan = get_action_plan(topic)
-        
-        # Update progress
-        session['progress']['topics_learned'] += 1
-        
-        # Determine SDG category
-        topic_lower = topic.lower()
-        if any(word in topic_lower for word in ['education', 'learning', 'school']):
-            session['progress']['sdg_4_topics'] += 1
-        elif any(word in topic_lower for word in ['water', 'ocean', 'river', 'pollution']):
-            session['progress']['sdg_6_topics'] += 1
-        elif any(word in topic_lower for word in ['climate', 'carbon', 'energy', 'renewable']):
-            session['progress']['sdg_13_topics'] += 1
-        
-        # Check for badge achievements
-        check_badge_achievements()
-        update_user_progress()
-        
+    learn_request = classify_learn_request()
+    if learn_request is None:
         return render_template('learn.html', 
-                             topic=topic, 
-                             ai_output=ai_output,
-                             youtube_videos=youtube_videos,
-                             daily_tip=daily_tip,
-                             quiz_questions=quiz_questions,
-                             action_plan=action_plan)
-    return render_template('learn.html', 
-                         topic=None, 
-                         ai_output=None,
-                         youtube_videos=None,
-                         daily_tip=None,
-                         quiz_questions=[],
-                         action_plan=None)
+                             topic=None, 
+                             ai_output=None,
+                             youtube_videos=None,
+                             daily_tip=None,
+                             quiz_questions=[],
+                             action_plan=None)
+    
+    topic, key, classification = learn_request
+    page = render_learn_page(topic, key, get_learn_content(key, classification))
+    record_topic_view(topic, key, classification)
+    return page
+
+@app.route('/learn/stream')
+@login_required
+def learn_stream():
+    """Stream the explanation for a topic to learn.html as server-sent events"""
+    topic_key, mode = learn_cache_key(request.args.get('topic', ''), request.args.get('mode', 'basic'))
+    cache_key = ('explanation', topic_key, mode)
+
+    def events():
+        cached = learn_cache.get(cache_key)
+        if cached:
+            yield f"data: {json.dumps(cached)}\n\n"
+        else:
+            display_topic = topic_key.title()
+            classification = classify_learn_topic(topic_key)
+            chunks = []
+            try:
+                for chunk in llm_backend.stream(display_topic, mode, classification):
+                    chunks.append(chunk)
+                    yield f"data: {json.dumps(chunk)}\n\n"
+            except Exception:
+                # Replace whatever was streamed with the static explanation
+                app.logger.exception('Explanation backend %s failed', llm_backend.name)
+                fallback = get_ai_response(display_topic, mode, classification)
+                yield f"event: fallback\ndata: {json.dumps(fallback)}\n\n"
+                return
+            learn_cache.set(cache_key, ''.join(chunks))
+        yield "event: done\ndata: \n\n"
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/dashboard')
 @login_required
 def dashboard():
     """SDG Dashboard showing user progress and achievements"""
     init_user_progress()
-    return render_template('dashboard.html', progress=session['progress'])
+    return render_template('dashboard.html', progress=g.progress,
+                           badges=badge_engine.cards(g.progress, g.progress['badges']))
+
+# Community feed: keyset pages over (created_at, id) and conditional GET
+app.config['FEED_PAGE_SIZE'] = 20
+app.config['FEED_MAX_PAGE_SIZE'] = 100
+
+def encode_feed_cursor(post):
+    """Opaque cursor for a post's position in the feed"""
+    key = f'{post.created_at.isoformat()}|{post.id}'
+    return base64.urlsafe_b64encode(key.encode()).decode().rstrip('=')
+
+def decode_feed_cursor(cursor):
+    """(created_at, id) of a cursor; raises ValueError if it is malformed"""
+    key = base64.urlsafe_b64decode((cursor + '=' * (-len(cursor) % 4)).encode()).decode()
+    created_at, post_id = key.split('|')
+    return datetime.fromisoformat(created_at), int(post_id)
+
+def feed_page(cursor=None, since=None, limit=None):
+    """Posts newest first (older than cursor), or with since, posts newer than it oldest first.
+    Returns (posts, cursor to continue from or None)."""
+    limit = max(1, min(limit or app.config['FEED_PAGE_SIZE'], app.config['FEED_MAX_PAGE_SIZE']))
+    key = db.tuple_(CommunityPost.created_at, CommunityPost.id)
+    query = CommunityPost.query
+    if since:
+        query = query.filter(key > db.tuple_(*decode_feed_cursor(since)))
+        query = query.order_by(CommunityPost.created_at, CommunityPost.id)
+    else:
+        if cursor:
+            query = query.filter(key < db.tuple_(*decode_feed_cursor(cursor)))
+        query = query.order_by(CommunityPost.created_at.desc(), CommunityPost.id.desc())
+    posts = query.limit(limit + 1).all()
+    more, posts = len(posts) > limit, posts[:limit]
+    if since:
+        # Polling carries on from the newest post seen, even when nothing was new
+        return posts, encode_feed_cursor(posts[-1]) if posts else since
+    return posts, encode_feed_cursor(posts[-1]) if more else None
+
+def feed_validators(*request_key):
+    """ETag and Last-Modified of the feed, from the post and like counters and the newest post
+    (which changes even when a deletion and a new post leave the counters where they were)"""
+    rows = db.session.execute(
+        db.select(AnalyticsTotal.name, AnalyticsTotal.value, AnalyticsTotal.updated_at)
+        .where(AnalyticsTotal.name.in_(('posts', 'likes')))
+    ).all()
+    newest_id, newest_at = db.session.execute(
+        db.select(db.func.max(CommunityPost.id), db.func.max(CommunityPost.created_at))).one()
+    buffered = like_buffer.stats()['pending'] if like_buffer else 0
+    state = repr((sorted((row.name, row.value) for row in rows), newest_id, buffered, request_key))
+    etag = hashlib.sha1(state.encode()).hexdigest()[:24]
+    changed = [row.updated_at for row in rows if row.updated_at]
+    if newest_at:
+        changed.append(newest_at)
+    last_modified = max(changed, default=None)
+    return etag, last_modified
+
+def conditional(response, etag, last_modified):
+    """Attach feed validators; clients must revalidate before reusing a cached copy, and shared
+    caches must not keep it (the page is rendered for the signed-in user)"""
+    response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+def not_modified(etag, last_modified):
+    """A 304 response if the client's copy is current, else None"""
+    if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        return None
+    return conditional(Response(status=304), etag, last_modified)
 
 @app.route('/community')
 @login_required
 def community():
     """Community page for sharing sustainability actions"""
     init_user_progress()
-    posts = CommunityPost.query.order_by(CommunityPost.created_at.desc()).limit(20).all()
-    return render_template('community.html', posts=posts)
+    cursor = request.args.get('cursor')
+    etag, last_modified = feed_validators('community', cursor)
+    cached = not_modified(etag, last_modified)
+    if cached:
+        return cached
+    try:
+        posts, next_cursor = feed_page(cursor=cursor)
+    except ValueError:
+        abort(400)
+    page = render_template('community.html', posts=posts, pending_likes=pending_likes,
+                           cursor=cursor, next_cursor=next_cursor)
+    return conditional(make_response(page), etag, last_modified)
+
+def pending_likes(post_id):
+    """Buffered likes not yet in the database"""
+    return like_buffer.pending(post_id) if like_buffer else 0
+
+def feed_item(post):
+    """JSON form of a post in the feed API"""
+    return {
+        'id': post.id,
+        'username': post.username,
+        'action': post.action,
+        'likes': post.likes + pending_likes(post.id),
+        'created_at': post.created_at.isoformat()
+    }
 
 @app.route('/api/posts', methods=['GET', 'POST'])
 def api_posts():
@@ -333,57 +1162,139 @@ def api_posts():
         if username and action:
             post = CommunityPost(username=username, action=action)
             db.session.add(post)
+            db.session.flush()
+            after_commit = append_activity([activity_event(POST_CREATED, username, post.id, post.created_at)])
             db.session.commit()
+            for callback in after_commit:
+                callback()
+            feed_broker.publish('posts', dict(feed_item(post), cursor=encode_feed_cursor(post)))
             return jsonify({'success': True, 'message': 'Post created successfully!'})
         else:
             return jsonify({'success': False, 'message': 'Username and action are required'}), 400
     
     elif request.method == 'GET':
-        posts = CommunityPost.query.order_by(CommunityPost.created_at.desc()).limit(20).all()
-        return jsonify([{
-            'id': post.id,
-            'username': post.username,
-            'action': post.action,
-            'likes': post.likes,
-            'created_at': post.created_at.isoformat()
-        } for post in posts])
+        # ?cursor= pages back through older posts; ?since= polls for posts newer than a cursor.
+        # The next cursor is in the X-Next-Cursor and Link headers.
+        cursor, since = request.args.get('cursor'), request.args.get('since')
+        limit = request.args.get('limit', app.config['FEED_PAGE_SIZE'], type=int)
+        etag, last_modified = feed_validators('api', cursor, since, limit)
+        cached = not_modified(etag, last_modified)
+        if cached:
+            return cached
+        try:
+            posts, continuation = feed_page(cursor, since, limit)
+        except ValueError:
+            return jsonify({'success': False, 'message': 'Invalid cursor'}), 400
+        
+        response = jsonify([feed_item(post) for post in posts])
+        if continuation:
+            param = 'since' if since else 'cursor'
+            response.headers['X-Next-Cursor'] = continuation
+            response.headers['Link'] = f'<{url_for("api_posts", limit=limit, **{param: continuation})}>; rel="next"'
+        return conditional(response, etag, last_modified)
 
 @app.route('/api/posts/<int:post_id>/like', methods=['POST'])
 def like_post(post_id):
     """Like a community post"""
-    post = CommunityPost.query.get_or_404(post_id)
-    post.likes += 1
+    if like_buffer:
+        likes = like_buffer.add(post_id, lambda: db.session.execute(
+            db.select(CommunityPost.likes).filter_by(id=post_id)).scalar())
+        if likes is None:
+            abort(404)
+        feed_broker.publish('likes', likes, key=post_id)
+        return jsonify({'success': True, 'likes': likes})
+    
+    row = increment_likes(post_id, 1)
+    if row is None:
+        abort(404)
+    after_commit = append_activity([activity_event(POST_LIKED, get_progress_key(), post_id,
+                                                   author=row.username, count=1)])
     db.session.commit()
-    return jsonify({'success': True, 'likes': post.likes})
+    for callback in after_commit:
+        callback()
+    feed_broker.publish('likes', row.likes, key=post_id)
+    return jsonify({'success': True, 'likes': row.likes})
+
+@app.route('/api/posts/stream')
+def stream_posts():
+    """Server-sent events with new posts and like counts, batched as {"posts": [...], "likes": {id: count}}.
+    A "reset" event means updates were missed and the client should refetch /api/posts."""
+    try:
+        subscription = feed_broker.subscribe(request.headers.get('Last-Event-ID'))
+    except FeedFull:
+        return Response('Too many live feed connections', status=503, headers={'Retry-After': '30'})
+    
+    def events():
+        # No app context here, so an open stream holds no database connection
+        with subscription:
+            yield 'retry: 3000\n\n'
+            yield from subscription.messages(app.config['FEED_KEEPALIVE'])
+    
+    response = Response(events(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Also free the slot when the body is never read (HEAD, or a client gone before the first chunk)
+    response.call_on_close(subscription.close)
+    return response
 
 @app.route('/leaderboard')
 @login_required
 def leaderboard():
-    """Leaderboard showing top performers"""
+    """Leaderboard showing top performers, all-time or for the current week or month"""
     init_user_progress()
+    window = request.args.get('window', 'all')
+    if window not in LEADERBOARD_WINDOWS:
+        window = 'all'
+    
+    # Top users by quiz score in the window; their progress details are only
+    # queried when the cached fragment listing them needs rendering
+    learners = leaderboards.top('learners', window, 10)
     
-    # Get top users by total score
-    top_users = db.session.query(
-        UserProgress.session_id,
-        UserProgress.topics_learned,
-        UserProgress.quizzes_completed,
-        UserProgress.total_score,
-        UserProgress.sdg_4_topics,
-        UserProgress.sdg_6_topics,
-        UserProgress.sdg_13_topics
-    ).order_by(UserProgress.total_score.desc()).limit(10).all()
-    
-    # Get most active community members
-    top_contributors = db.session.query(
-        CommunityPost.username,
-        db.func.count(CommunityPost.id).label('post_count'),
-        db.func.sum(CommunityPost.likes).label('total_likes')
-    ).group_by(CommunityPost.username).order_by(db.func.sum(CommunityPost.likes).desc()).limit(10).all()
+    def top_users():
+        rows = {row.session_id: row for row in
+                UserProgress.query.filter(UserProgress.session_id.in_([member for member, _, _ in learners]))}
+        return [dict(progress_snapshot(rows[member]), session_id=member, total_score=score)
+                for member, score, _ in learners if member in rows]
+    
+    # Most liked community members
+    contributors = leaderboards.top('contributors', window, 10)
+    top_contributors = [{'username': member, 'post_count': posts, 'total_likes': likes}
+                        for member, likes, posts in contributors]
+    
+    my_rank = leaderboards.rank('learners', get_progress_key(), window)
     
     return render_template('leaderboard.html', 
                          top_users=top_users, 
                          top_contributors=top_contributors,
-                         progress=session['progress'])
+                         learners_version=(window, tuple(learners)),
+                         contributors_version=(window, tuple(contributors)),
+                         window=window,
+                         my_rank=my_rank,
+                         ranked_learners=leaderboards.size('learners', window),
+                         progress=g.progress)
+
+@app.route('/api/leaderboard')
+@login_required
+def api_leaderboard():
+    """Top of a leaderboard plus the current user's rank"""
+    board = request.args.get('board', 'learners')
+    window = request.args.get('window', 'all')
+    if board not in ('learners', 'contributors') or window not in LEADERBOARD_WINDOWS:
+        return jsonify({'error': 'Unknown board or window'}), 400
+    limit = min(request.args.get('limit', 10, type=int), 100)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    
+    top = leaderboards.top(board, window, limit, offset)
+    member = get_progress_key() if board == 'learners' else current_user.username
+    me = leaderboards.rank(board, member, window)
+    return jsonify({
+        'board': board,
+        'window': window,
+        'period': period_key(window, datetime.utcnow()),
+        'size': leaderboards.size(board, window),
+        'top': [{'rank': offset + i, 'member': name, 'score': score, 'events': events}
+                for i, (name, score, events) in enumerate(top, 1)],
+        'me': {'rank': me[0], 'score': me[1]} if me else None,
+    })
 
 @app.route('/analytics')
 @login_required
@@ -391,71 +1302,98 @@ def analytics():
     """Analytics page showing platform statistics"""
     init_user_progress()
     
-    # Platform statistics
-    total_users = UserProgress.query.count()
-    total_posts = CommunityPost.query.count()
-    total_quiz_attempts = QuizAttempt.query.count()
-    total_likes = db.session.query(db.func.sum(CommunityPost.likes)).scalar() or 0
-    
-    # Topic popularity
-    topic_stats = db.session.query(
-        QuizAttempt.topic,
-        db.func.count(QuizAttempt.id).label('attempts'),
-        db.func.avg(QuizAttempt.percentage).label('avg_score')
-    ).group_by(QuizAttempt.topic).order_by(db.func.count(QuizAttempt.id).desc()).limit(10).all()
-    
-    # SDG distribution
-    sdg_stats = {
-        'sdg_4': UserProgress.query.with_entities(db.func.sum(UserProgress.sdg_4_topics)).scalar() or 0,
-        'sdg_6': UserProgress.query.with_entities(db.func.sum(UserProgress.sdg_6_topics)).scalar() or 0,
-        'sdg_13': UserProgress.query.with_entities(db.func.sum(UserProgress.sdg_13_topics)).scalar() or 0
-    }
+    # Platform statistics and SDG distribution, maintained incrementally
+    totals = analytics_totals()
+    
+    # Topic popularity, queried only when the cached platform fragment needs rendering.
+    # It only changes along with the quiz attempt total, so the totals version the fragment.
+    def topic_stats():
+        return TopicStat.query.order_by(TopicStat.attempts.desc()).limit(10).all()
+    
+    sdg_stats = {name: totals[name] for name in SDG_TOTALS.values()}
     
     return render_template('analytics.html',
-                         total_users=total_users,
-                         total_posts=total_posts,
-                         total_quiz_attempts=total_quiz_attempts,
-                         total_likes=total_likes,
+                         total_users=totals['users'],
+                         total_posts=totals['posts'],
+                         total_quiz_attempts=totals['quiz_attempts'],
+                         total_likes=totals['likes'],
                          topic_stats=topic_stats,
                          sdg_stats=sdg_stats,
-                         progress=session['progress'])
+                         stats_version=tuple(sorted(totals.items())),
+                         progress=g.progress)
+
+@app.route('/api/cache/stats')
+@login_required
+def cache_stats():
+    """Hit/miss/eviction counters for the in-memory caches"""
+    return jsonify({'learn': learn_cache.stats(), 'progress': progress_cache.stats(), 'quiz': quiz_store.stats(),
+                    'fragments': app.jinja_env.fragment_cache.stats(), 'identity': identity_cache.stats()})
+
+@app.route('/metrics')
+def metrics():
+    """Request, SQL and span metrics of this process in the Prometheus text format"""
+    return Response(instrumentation.registry.render(), content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/admin/profiler', methods=['GET', 'POST'])
+@admin_required
+def admin_profiler():
+    """Profiler settings and samples per route; POST {"enabled", "sample_rate", "reset"} changes them for every worker"""
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        enabled, sample_rate = data.get('enabled'), data.get('sample_rate')
+        if enabled is not None and not isinstance(enabled, bool):
+            return jsonify({'success': False, 'message': 'enabled must be true or false'}), 400
+        try:
+            profiler.configure(enabled=enabled, sample_rate=None if sample_rate is None else float(sample_rate),
+                               reset=data.get('reset') is True)
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'message': 'sample_rate must be a number between 0 and 1'}), 400
+    return jsonify(profiler.status())
+
+@app.route('/admin/profiler/profile')
+@admin_required
+def admin_profiler_profile():
+    """Samples merged across workers as a download: ?format=speedscope (default) or collapsed, ?route= for one route"""
+    profile_format, route = request.args.get('format', 'speedscope'), request.args.get('route') or None
+    if profile_format == 'collapsed':
+        body, mimetype, filename = collapsed_stacks(profiler.merged(), route), 'text/plain', 'profile.txt'
+    elif profile_format == 'speedscope':
+        body = json.dumps(speedscope(profiler.merged(), profiler.interval, route))
+        mimetype, filename = 'application/json', 'profile.speedscope.json'
+    else:
+        return jsonify({'success': False, 'message': 'format must be speedscope or collapsed'}), 400
+    return Response(body, mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename=edubridge-{filename}'})
 
 @app.route('/submit_quiz', methods=['POST'])
 def submit_quiz():
     """Handle quiz submission and return score"""
-    data = request.get_json()
-    answers = data.get('answers', [])
-    quiz_questions = data.get('questions', [])
-    topic = data.get('topic', 'Unknown')
-    
-    correct = 0
-    total = len(quiz_questions)
+    init_user_progress()
+    data = request.get_json(silent=True) or {}
+    quiz_id = str(data.get('quiz_id', ''))
+    expired = {'success': False, 'message': 'This quiz has expired. Reload the page to take it again.'}
+    quiz = quiz_store.get(quiz_id)
+    if quiz is None or quiz.owner != get_progress_key():
+        return jsonify(expired), 410
+    answers = data.get('answers')
+    if not isinstance(answers, list) or len(answers) != len(quiz.answers):
+        return jsonify({'success': False, 'message': 'Send one answer index per question'}), 400
+    # Each quiz id is graded once; a resubmission (or a concurrent duplicate) finds the key gone
+    if quiz_store.pop(quiz_id) is None:
+        return jsonify(expired), 410
     
-    for i, question in enumerate(quiz_questions):
-        if i < len(answers) and answers[i] == question['correct']:
-            correct += 1
+    topic = quiz.topic
+    correct = grade(quiz.answers, answers)
+    total = len(quiz.answers)
     
     percentage = round((correct / total) * 100) if total > 0 else 0
     
-    # Update progress
-    session['progress']['quizzes_completed'] += 1
-    session['progress']['total_score'] += correct
-    
-    # Save quiz attempt to database
-    session_id = session.get('session_id')
-    if session_id:
-        quiz_attempt = QuizAttempt(
-            session_id=session_id,
-            topic=topic,
-            score=correct,
-            total_questions=total,
-            percentage=percentage
-        )
-        db.session.add(quiz_attempt)
-        db.session.commit()
+    # Update progress and queue the attempt for the next batched write; a pass extends the streak
+    record_activity(QUIZ_SUBMITTED, topic, score=correct, total=total, percentage=percentage,
+                    passed=percentage >= app.config['QUIZ_STREAK_PERCENTAGE'])
     
     # Check for badge achievements
-    check_badge_achievements()
+    check_badge_achievements('quizzes_completed', 'total_score', 'quiz_streak')
     update_user_progress()
     
     return jsonify({
@@ -467,6 +1405,7 @@ def submit_quiz():
 # Initialize database
 with app.app_context():
     db.create_all()
+    run_migrations(db.engine, MIGRATIONS)
     
     # Add some sample community posts if none exist
     if CommunityPost.query.count() == 0:
@@ -479,7 +1418,59 @@ with app.app_context():
         ]
         for post in sample_posts:
             db.session.add(post)
+        db.session.flush()
+        after_commit = append_activity(
+            [activity_event(POST_CREATED, post.username, post.id, post.created_at) for post in sample_posts] +
+            [activity_event(POST_LIKED, None, post.id, post.created_at, author=post.username, count=post.likes)
+             for post in sample_posts])
         db.session.commit()
+        for callback in after_commit:
+            callback()
+    
+    # Apply writes journaled by a process that stopped before flushing them
+    write_behind.replay_journal()
+
+# Forget applied write-behind batch ids once their journal files are gone; kept at least
+# WRITE_BEHIND_APPLIED_RETENTION seconds as a margin for clock skew between workers. 0 disables
+app.config['WRITE_BEHIND_PRUNE_INTERVAL'] = 3600  # seconds
+app.config['WRITE_BEHIND_APPLIED_RETENTION'] = 3600  # seconds
+if app.config['WRITE_BEHIND_PRUNE_INTERVAL']:
+    batch_pruner = PeriodicJob(prune_applied_batches, app.config['WRITE_BEHIND_PRUNE_INTERVAL'],
+                               name='applied-batch-prune', logger=app.logger).start()
+    atexit.register(batch_pruner.stop)
+
+# Rebuild the analytics rollup from the raw tables every hour; 0 disables
+app.config['ANALYTICS_RECONCILE_INTERVAL'] = 3600  # seconds
+if app.config['ANALYTICS_RECONCILE_INTERVAL']:
+    analytics_reconciler = PeriodicJob(reconcile_analytics, app.config['ANALYTICS_RECONCILE_INTERVAL'],
+                                       name='analytics-reconcile', logger=app.logger).start()
+    atexit.register(analytics_reconciler.stop)
+
+if like_buffer:
+    like_flusher = PeriodicJob(like_buffer.flush, app.config['LIKE_BUFFER_INTERVAL'],
+                               name='like-buffer', logger=app.logger).start()
+    atexit.register(like_buffer.flush)
+    atexit.register(like_flusher.stop)
+
+# Reload leaderboards from the ranking table so each worker picks up the others' writes; 0 disables
+app.config['LEADERBOARD_REFRESH_INTERVAL'] = 300  # seconds
+if app.config['LEADERBOARD_REFRESH_INTERVAL']:
+    leaderboard_refresher = PeriodicJob(leaderboards.refresh, app.config['LEADERBOARD_REFRESH_INTERVAL'],
+                                        name='leaderboard-refresh', logger=app.logger).start()
+    atexit.register(leaderboard_refresher.stop)
+
+# Apply profiler settings changed by other workers and publish this worker's samples
+profiler_sync = PeriodicJob(profiler.sync, app.config['PROFILER_SYNC_INTERVAL'],
+                            name='profiler-sync', logger=app.logger).start()
+atexit.register(profiler.sync)
+atexit.register(profiler_sync.stop)
+
+# Drop expired server-side sessions; 0 disables
+app.config['SESSION_PURGE_INTERVAL'] = 3600  # seconds
+if app.config['SESSION_PURGE_INTERVAL']:
+    session_purger = PeriodicJob(app.session_interface.backend.purge, app.config['SESSION_PURGE_INTERVAL'],
+                                 name='session-purge', logger=app.logger).start()
+    atexit.register(session_purger.stop)
 
 if __name__ == '__main__':
     app.run(debug=True)
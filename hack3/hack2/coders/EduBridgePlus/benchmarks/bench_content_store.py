@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: per-call allocations of the content generators
+
+Compares the current generators, which hand out views of the frozen content
+store, with the previous approach of rebuilding the table literals inside
+every call. The legacy functions are compiled from the same content pack so
+both sides serve identical data.
+
+Usage: python benchmarks/bench_content_store.py [--calls N]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.ai_helper import generate_quiz, get_daily_tip, get_youtube_links  # noqa: E402
+from utils.content_store import DEFAULT_PACK_PATH  # noqa: E402
+from utils.topic_classifier import classify_topic  # noqa: E402
+
+
+def build_legacy_generators():
+    """Recreate the old 'literal in the function body' generators"""
+    with open(DEFAULT_PACK_PATH, encoding='utf-8') as f:
+        pack = json.load(f)
+    namespace = {'random': __import__('random')}
+    source = f"""
+def legacy_youtube_links(classification):
+    video_collections = {pack['videos']!r}
+    return classification.pick(video_collections)
+
+def legacy_quiz(classification):
+    quiz_templates = {pack['quizzes']!r}
+    return classification.pick(quiz_templates)
+
+def legacy_daily_tip():
+    eco_tips = {pack['eco_tips']!r}
+    return random.choice(eco_tips)
+"""
+    exec(compile(source, '<legacy>', 'exec'), namespace)
+    return namespace['legacy_youtube_links'], namespace['legacy_quiz'], namespace['legacy_daily_tip']
+
+
+def measure(label, fn, calls):
+    """Return (peak bytes allocated during one call, microseconds per call)"""
+    fn()  # warm up
+    tracemalloc.start()
+    peaks = []
+    for _ in range(min(calls, 200)):
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        fn()
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    elapsed = time.perf_counter() - start
+    return label, sum(peaks) / len(peaks), elapsed / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--calls', type=int, default=2000)
+    args = parser.parse_args()
+
+    classification = classify_topic('Climate Change')
+    legacy_videos, legacy_quiz, legacy_tip = build_legacy_generators()
+    cases = [
+        (measure('videos (legacy)', lambda: legacy_videos(classification), args.calls),
+         measure('videos (store)', lambda: get_youtube_links('Climate Change', classification), args.calls)),
+        (measure('quiz (legacy)', lambda: legacy_quiz(classification), args.calls),
+         measure('quiz (store)', lambda: generate_quiz('Climate Change', classification), args.calls)),
+        (measure('daily tip (legacy)', legacy_tip, args.calls),
+         measure('daily tip (store)', get_daily_tip, args.calls)),
+    ]
+
+    print(f"{'generator':<22}{'peak bytes/call':>16}{'us/call':>10}")
+    for pair in cases:
+        for label, size, micros in pair:
+            print(f"{label:<22}{size:>16.0f}{micros:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Benchmark: leaderboard, analytics and community queries with and without indexes
+
+Seeds a throwaway SQLite database (1M quiz attempts by default), then times
+the endpoints that order or group by the indexed columns, first with the
+indexes from migration 1 and again after dropping them. Prints the SQLite
+query plan of each hot query alongside.
+
+Usage: python benchmarks/bench_indexes.py [--attempts 1000000] [--users 20000] [--posts 50000]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOPICS = ['Climate Change', 'Water Conservation', 'Renewable Energy', 'Ocean Pollution', 'Recycling',
+          'Quality Education', 'Solar Power', 'Plastic Waste', 'Clean Water', 'Carbon Footprint',
+          'Wind Energy', 'Deforestation', 'Composting', 'Sustainable Cities', 'Biodiversity']
+ENDPOINTS = ['/leaderboard', '/analytics', '/community', '/api/posts']
+QUERIES = {
+    'leaderboard top users': 'SELECT session_id FROM user_progress ORDER BY total_score DESC LIMIT 10',
+    'leaderboard contributors': 'SELECT username, count(id), sum(likes) FROM community_post '
+                                'GROUP BY username ORDER BY sum(likes) DESC LIMIT 10',
+    'analytics topic stats': 'SELECT topic, count(id), avg(percentage) FROM quiz_attempt '
+                             'GROUP BY topic ORDER BY count(id) DESC LIMIT 10',
+    'community feed': 'SELECT id FROM community_post ORDER BY created_at DESC LIMIT 20',
+}
+
+
+def seed(path, attempts, users, posts):
+    rng = random.Random(42)
+    start = datetime(2024, 1, 1)
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.executemany(
+            'INSERT INTO user_progress (session_id, topics_learned, quizzes_completed, sdg_4_topics, sdg_6_topics,'
+            ' sdg_13_topics, total_score, badges, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            ((f'user_{i}', rng.randint(0, 50), rng.randint(0, 50), rng.randint(0, 10), rng.randint(0, 10),
+              rng.randint(0, 10), rng.randint(0, 500), '[]', start, start) for i in range(users)))
+        connection.executemany(
+            'INSERT INTO community_post (username, action, likes, created_at) VALUES (?, ?, ?, ?)',
+            ((f'member{rng.randrange(users // 4 or 1)}', 'Planted a tree', rng.randint(0, 100),
+              start + timedelta(minutes=rng.randrange(500000))) for _ in range(posts)))
+
+        def attempt_rows():
+            for _ in range(attempts):
+                score = rng.randint(0, 3)
+                yield (f'user_{rng.randrange(users)}', rng.choice(TOPICS), score, 3, score / 3 * 100,
+                       start + timedelta(seconds=rng.randrange(30000000)))
+        connection.executemany(
+            'INSERT INTO quiz_attempt (session_id, topic, score, total_questions, percentage, created_at)'
+            ' VALUES (?, ?, ?, ?, ?, ?)', attempt_rows())
+    connection.execute('ANALYZE')
+    connection.close()
+
+
+def query_plans(path):
+    connection = sqlite3.connect(path)
+    plans = {name: ' / '.join(row[-1] for row in connection.execute('EXPLAIN QUERY PLAN ' + sql))
+             for name, sql in QUERIES.items()}
+    connection.close()
+    return plans
+
+
+def time_endpoints(client, repeat):
+    results = {}
+    for path in ENDPOINTS:
+        client.get(path)  # warm the page cache
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = client.get(path)
+            samples.append(time.perf_counter() - start)
+            assert response.status_code == 200, (path, response.status_code)
+        results[path] = statistics.median(samples) * 1000
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--attempts', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--posts', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    os.environ['EDUBRIDGE_WRITE_BEHIND'] = '0'
+    sys.path.insert(0, APP_DIR)
+    os.chdir(APP_DIR)
+    from app import app, db, User, MIGRATIONS, UserProgress, CommunityPost, QuizAttempt, rebuild_analytics
+
+    print(f'Seeding {args.attempts:,} quiz attempts, {args.users:,} users, {args.posts:,} posts...')
+    start = time.perf_counter()
+    seed(path, args.attempts, args.users, args.posts)
+    with app.app_context(), db.engine.begin() as connection:
+        rebuild_analytics(connection)  # rows were inserted behind the rollup's back
+    print(f'  seeded in {time.perf_counter() - start:.1f}s')
+
+    with app.app_context():
+        user = User(username='bench', email='bench@example.com')
+        user.set_password('bench')
+        db.session.add(user)
+        db.session.commit()
+    client = app.test_client()
+    client.post('/login', data={'username': 'bench', 'password': 'bench'})
+
+    indexed_plans = query_plans(path)
+    indexed = time_endpoints(client, args.repeat)
+
+    indexes = [index for table in (UserProgress.__table__, CommunityPost.__table__, QuizAttempt.__table__)
+               for index in table.indexes]
+    with app.app_context():
+        for index in indexes:
+            index.drop(db.engine)
+    plain_plans = query_plans(path)
+    plain = time_endpoints(client, args.repeat)
+    with app.app_context(), db.engine.begin() as connection:
+        MIGRATIONS[0].upgrade(connection)  # the step that upgrades existing databases
+
+    print(f"\n{'endpoint':<16}{'no index ms':>14}{'indexed ms':>14}{'speedup':>10}")
+    for endpoint in ENDPOINTS:
+        print(f'{endpoint:<16}{plain[endpoint]:>14.1f}{indexed[endpoint]:>14.1f}'
+              f'{plain[endpoint] / indexed[endpoint]:>9.1f}x')
+    print('\nQuery plans (without -> with indexes):')
+    for name in QUERIES:
+        print(f'  {name}:\n    {plain_plans[name]}\n    {indexed_plans[name]}')
+
+    with app.app_context():
+        db.engine.dispose()
+    shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark: materialized leaderboards against per-view SQL
+
+Seeds a throwaway SQLite database (100k users, 1M posts by default) and
+compares the queries /leaderboard used to run on every view (ORDER BY
+total_score, GROUP BY username over every post, COUNT for "my rank") with
+the in-memory ranked boards: one-off load, top-10, rank lookups and score
+updates. Finishes with the latency of the /leaderboard page itself.
+
+Usage: python benchmarks/bench_leaderboard.py [--users 100000] [--posts 1000000]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LEGACY_QUERIES = {
+    'top users': 'SELECT session_id, total_score FROM user_progress ORDER BY total_score DESC LIMIT 10',
+    'top contributors': 'SELECT username, count(id), sum(likes) FROM community_post '
+                        'GROUP BY username ORDER BY sum(likes) DESC LIMIT 10',
+    'my rank': 'SELECT count(*) + 1 FROM user_progress WHERE total_score > '
+               '(SELECT total_score FROM user_progress WHERE session_id = ?)',
+}
+
+
+def seed(path, users, posts, attempts):
+    rng = random.Random(7)
+    now = datetime.utcnow()
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.executemany(
+            'INSERT INTO user_progress (session_id, topics_learned, quizzes_completed, sdg_4_topics, sdg_6_topics,'
+            ' sdg_13_topics, total_score, badges, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            ((f'user_{i}', rng.randint(0, 50), rng.randint(0, 50), 0, 0, 0, rng.randint(0, 5000), '[]', now, now)
+             for i in range(users)))
+        connection.executemany(
+            'INSERT INTO community_post (username, action, likes, created_at) VALUES (?, ?, ?, ?)',
+            ((f'member{rng.randrange(users)}', 'Planted a tree', rng.randint(0, 50),
+              now - timedelta(minutes=rng.randrange(525600))) for _ in range(posts)))
+        connection.executemany(
+            'INSERT INTO quiz_attempt (session_id, topic, score, total_questions, percentage, created_at)'
+            ' VALUES (?, ?, ?, ?, ?, ?)',
+            ((f'user_{rng.randrange(users)}', 'Climate Change', 3, 3, 100.0,
+              now - timedelta(minutes=rng.randrange(60 * 24 * 60))) for _ in range(attempts)))
+    connection.close()
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--posts', type=int, default=1000000)
+    parser.add_argument('--attempts', type=int, default=200000)
+    parser.add_argument('--lookups', type=int, default=10000)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    os.environ['EDUBRIDGE_WRITE_BEHIND'] = '0'
+    sys.path.insert(0, APP_DIR)
+    os.chdir(APP_DIR)
+    from app import app, db, User, leaderboards, rebuild_leaderboards
+
+    print(f'Seeding {args.users:,} users, {args.posts:,} posts, {args.attempts:,} quiz attempts...')
+    start = time.perf_counter()
+    seed(path, args.users, args.posts, args.attempts)
+    with app.app_context(), db.engine.begin() as connection:
+        rebuild_leaderboards(connection)
+    print(f'  seeded and ranked in {time.perf_counter() - start:.1f}s')
+
+    members = [f'user_{random.randrange(args.users)}' for _ in range(args.lookups)]
+    raw = sqlite3.connect(path)
+    print('\nPer-view SQL (ms, median of 5):')
+    for name, sql in LEGACY_QUERIES.items():
+        params = (members[0],) if '?' in sql else ()
+        print(f'  {name:<18}{timed(lambda: raw.execute(sql, params).fetchall(), 5) * 1000:>10.2f}')
+    raw.close()
+
+    print('\nMaterialized boards:')
+    leaderboards.clear()
+    for board in ('learners', 'contributors'):
+        for window in ('all', 'month', 'week'):
+            start = time.perf_counter()
+            size = leaderboards.size(board, window)
+            label = f'load {board}/{window}'
+            print(f'  {label:<26}{(time.perf_counter() - start) * 1000:>8.1f} ms  ({size:,} members)')
+    top = timed(lambda: (leaderboards.top('learners', 'all', 10), leaderboards.top('contributors', 'all', 10)), 101)
+    print(f"  {'top-10 (both boards)':<26}{top * 1e6:>8.1f} µs")
+    start = time.perf_counter()
+    for member in members:
+        leaderboards.rank('learners', member)
+    print(f"  {'rank lookup':<26}{(time.perf_counter() - start) / len(members) * 1e6:>8.1f} µs")
+    start = time.perf_counter()
+    for member in members:
+        leaderboards.record('learners', member, score=3, events=1)
+    print(f"  {'record (3 windows)':<26}{(time.perf_counter() - start) / len(members) * 1e6:>8.1f} µs")
+
+    with app.app_context():
+        user = User(username='bench', email='bench@example.com')
+        user.set_password('bench')
+        db.session.add(user)
+        db.session.commit()
+    client = app.test_client()
+    client.post('/login', data={'username': 'bench', 'password': 'bench'})
+    print()
+    for window in ('all', 'week'):
+        page = timed(lambda: client.get(f'/leaderboard?window={window}'), 21)
+        print(f'/leaderboard?window={window}: {page * 1000:.1f} ms median')
+
+    with app.app_context():
+        db.engine.dispose()
+    shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
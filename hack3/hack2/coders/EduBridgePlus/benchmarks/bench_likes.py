@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Load test: many clients liking the same post at once
+
+Runs each mode in a fresh process against a throwaway SQLite database:
+'atomic' writes every like with UPDATE ... RETURNING, 'buffered' counts
+likes in the sharded in-memory buffer and writes the sums once a second.
+Reports throughput and latency, and checks that the stored count equals
+the number of successful likes (no lost updates) and that every client
+saw its own count go up.
+
+Usage: python benchmarks/bench_likes.py [--clients 32] [--likes 100]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))] if ordered else 0.0
+
+
+def run_child(clients, likes_per_client):
+    """Drive the app in-process; runs inside the per-mode subprocess"""
+    sys.path.insert(0, APP_DIR)
+    import logging
+    logging.disable(logging.CRITICAL)
+    from app import app, db, CommunityPost, like_buffer
+
+    with app.app_context():
+        post_id = CommunityPost.query.first().id
+        start_likes = CommunityPost.query.get(post_id).likes
+
+    latencies, errors, monotonic = [], [], [True]
+    lock = threading.Lock()
+    ready = threading.Barrier(clients + 1)
+
+    def client_thread():
+        client = app.test_client()
+        last = 0
+        ready.wait()
+        for _ in range(likes_per_client):
+            start = time.perf_counter()
+            response = client.post(f'/api/posts/{post_id}/like')
+            elapsed = time.perf_counter() - start
+            with lock:
+                if response.status_code == 200:
+                    latencies.append(elapsed)
+                    count = response.get_json()['likes']
+                    if count <= last:
+                        monotonic[0] = False
+                    last = count
+                else:
+                    errors.append(response.status_code)
+
+    threads = [threading.Thread(target=client_thread) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    if like_buffer:
+        like_buffer.flush()
+    with app.app_context():
+        stored = db.session.get(CommunityPost, post_id).likes - start_likes
+
+    print(json.dumps({
+        'likes': len(latencies),
+        'errors': len(errors),
+        'stored': stored,
+        'monotonic': monotonic[0],
+        'rps': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+    }))
+
+
+def run_mode(mode, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                   EDUBRIDGE_LIKE_BUFFER='1' if mode == 'buffered' else '0')
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child',
+             '--clients', str(args.clients), '--likes', str(args.likes)],
+            cwd=APP_DIR, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--likes', type=int, default=100, help='likes per client')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.clients, args.likes)
+        return
+
+    print(f'{args.clients} clients x {args.likes} likes on one post')
+    print(f"{'mode':<10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}{'lost':>6}{'monotonic':>11}")
+    for mode in ('atomic', 'buffered'):
+        result = run_mode(mode, args)
+        print(f"{mode:<10}{result['rps']:>10.1f}{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+              f"{result['errors']:>8}{result['likes'] - result['stored']:>6}{str(result['monotonic']):>11}")
+
+
+if __name__ == '__main__':
+    main()
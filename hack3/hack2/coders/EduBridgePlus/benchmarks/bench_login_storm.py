@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Benchmark: a start-of-class login storm, with password hashing in the request thread or on a bounded pool
+
+Each pool size runs in a fresh process against a throwaway SQLite file with
+--logins seeded students. A few --browsers, already signed in, keep loading
+the dashboard while every student posts /login at once. Reports login
+latency and throughput, logins turned away as busy (503) and the browsers'
+latency during the storm: with hashing in the request thread (pool size 0)
+every login competes with them for the CPU; a pool bounds that to its size.
+
+Usage: python benchmarks/bench_login_storm.py [--logins 48] [--browsers 4] [--pool-sizes 0,1,2] [--method scrypt]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = 'storm-password'
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_child(logins, browsers):
+    """Seed students, sign the browsers in, then storm /login; runs inside the per-pool-size subprocess"""
+    sys.path.insert(0, APP_DIR)
+    import logging
+    logging.disable(logging.CRITICAL)
+    from app import app, db, User, password_hasher
+
+    password_hash = password_hasher.hash(PASSWORD)
+    with app.app_context():
+        db.session.execute(db.insert(User), [
+            {'username': f'student{i}', 'email': f'student{i}@example.com', 'password_hash': password_hash}
+            for i in range(logins + browsers)])
+        db.session.commit()
+
+    browser_clients = []
+    for i in range(browsers):
+        client = app.test_client()
+        client.post('/login', data={'username': f'student{logins + i}', 'password': PASSWORD})
+        client.get('/dashboard')
+        browser_clients.append(client)
+
+    login_latencies, statuses, browse_latencies = [], [], []
+    lock = threading.Lock()
+    ready = threading.Barrier(logins + browsers + 1)
+    storm_over = threading.Event()
+
+    def student(index):
+        client = app.test_client()
+        ready.wait()
+        start = time.perf_counter()
+        status = client.post('/login', data={'username': f'student{index}', 'password': PASSWORD}).status_code
+        elapsed = time.perf_counter() - start
+        with lock:
+            statuses.append(status)
+            if status == 302:
+                login_latencies.append(elapsed)
+
+    def browser(client):
+        ready.wait()
+        while not storm_over.is_set():
+            start = time.perf_counter()
+            client.get('/dashboard')
+            with lock:
+                browse_latencies.append(time.perf_counter() - start)
+
+    students = [threading.Thread(target=student, args=(i,)) for i in range(logins)]
+    watchers = [threading.Thread(target=browser, args=(client,)) for client in browser_clients]
+    for thread in students + watchers:
+        thread.start()
+    ready.wait()
+    started = time.perf_counter()
+    for thread in students:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    storm_over.set()
+    for thread in watchers:
+        thread.join()
+
+    print(json.dumps({
+        'method': password_hasher.method,
+        'seconds': elapsed,
+        'logins_ok': len(login_latencies),
+        'busy': statuses.count(503),
+        'logins_per_s': len(login_latencies) / elapsed if elapsed else 0.0,
+        'login_p50_ms': percentile(login_latencies, 50) * 1000,
+        'login_p99_ms': percentile(login_latencies, 99) * 1000,
+        'browse_requests': len(browse_latencies),
+        'browse_p50_ms': percentile(browse_latencies, 50) * 1000,
+        'browse_p99_ms': percentile(browse_latencies, 99) * 1000,
+    }))
+
+
+def run_pool_size(pool_size, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ,
+                   DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                   EDUBRIDGE_SESSION_PATH=os.path.join(tmp, 'sessions.db'),
+                   EDUBRIDGE_WRITE_BEHIND='0',
+                   EDUBRIDGE_PASSWORD_HASH=args.method,
+                   EDUBRIDGE_PASSWORD_HASH_WORKERS=str(pool_size))
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child',
+             '--logins', str(args.logins), '--browsers', str(args.browsers)],
+            cwd=APP_DIR, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--logins', type=int, default=48, help='students logging in at once')
+    parser.add_argument('--browsers', type=int, default=4, help='signed-in users loading pages meanwhile')
+    parser.add_argument('--pool-sizes', default='0,1,2', help='hashing threads per run; 0 hashes in the request thread')
+    parser.add_argument('--method', default='scrypt:32768:8:1', help='werkzeug hash method and cost')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.logins, args.browsers)
+        return
+
+    print(f'{args.logins} simultaneous logins, {args.browsers} users browsing, {args.method} '
+          f'({os.cpu_count()} CPUs)')
+    print(f"{'pool':<6}{'logins/s':>10}{'login p50':>11}{'login p99':>11}{'busy':>6}"
+          f"{'browse req':>12}{'browse p50':>12}{'browse p99':>12}")
+    for pool_size in args.pool_sizes.split(','):
+        result = run_pool_size(int(pool_size), args)
+        print(f"{pool_size:<6}{result['logins_per_s']:>10.1f}{result['login_p50_ms']:>11.0f}"
+              f"{result['login_p99_ms']:>11.0f}{result['busy']:>6}{result['browse_requests']:>12}"
+              f"{result['browse_p50_ms']:>12.1f}{result['browse_p99_ms']:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Load test: concurrent /submit_quiz posts under each database profile
+
+Each profile runs in a fresh process against a throwaway SQLite file. Every
+simulated student registers, logs in and then submits quizzes as fast as it
+can; the script reports throughput, latency and failed requests (e.g.
+"database is locked"). Writes are synchronous unless --write-behind is given,
+so the numbers reflect the database settings rather than the batching layer.
+
+Usage: python benchmarks/bench_submit_quiz.py [--clients 16] [--requests 50]
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_child(clients, requests_per_client):
+    """Drive the app in-process; runs inside the per-profile subprocess"""
+    sys.path.insert(0, APP_DIR)
+    import logging
+    logging.disable(logging.CRITICAL)
+    from app import app, write_behind
+
+    latencies, failures = [], []
+    lock = threading.Lock()
+    ready = threading.Barrier(clients + 1)
+
+    def student(index):
+        client = app.test_client()
+        name = f'student{index}'
+        client.post('/register', data={'username': name, 'email': f'{name}@example.com',
+                                       'password': 'pw', 'confirm_password': 'pw'})
+        client.post('/login', data={'username': name, 'password': 'pw'})
+        page = client.get('/learn?topic=Climate Change').get_data(as_text=True)
+        quiz_id = json.loads(re.search(r'quiz_id: (".*?"),', page).group(1))
+        ready.wait()
+        for _ in range(requests_per_client):
+            start = time.perf_counter()
+            try:
+                response = client.post('/submit_quiz', json={'quiz_id': quiz_id, 'answers': [1, 2, 0]})
+                error = None if response.status_code == 200 else f'HTTP {response.status_code}'
+            except Exception as exc:  # the test client re-raises unhandled errors
+                error = type(exc).__name__
+            elapsed = time.perf_counter() - start
+            with lock:
+                if error:
+                    failures.append(error)
+                else:
+                    latencies.append(elapsed)
+
+    threads = [threading.Thread(target=student, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    write_behind.flush()
+    elapsed = time.perf_counter() - started
+
+    print(json.dumps({
+        'requests': len(latencies) + len(failures),
+        'failures': len(failures),
+        'seconds': elapsed,
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+    }))
+
+
+def run_profile(profile, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ,
+                   DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                   EDUBRIDGE_DB_PROFILE=profile,
+                   EDUBRIDGE_WRITE_BEHIND='1' if args.write_behind else '0')
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child',
+             '--clients', str(args.clients), '--requests', str(args.requests)],
+            cwd=APP_DIR, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=50, help='quiz submissions per client')
+    parser.add_argument('--profiles', default='default,production')
+    parser.add_argument('--write-behind', action='store_true', help='keep batched writes enabled')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.clients, args.requests)
+        return
+
+    print(f'{args.clients} clients x {args.requests} quiz submissions, '
+          f"write-behind {'on' if args.write_behind else 'off'}")
+    print(f"{'profile':<12}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'failed':>8}")
+    for profile in args.profiles.split(','):
+        result = run_profile(profile, args)
+        print(f"{profile:<12}{result['rps']:>10.1f}{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}"
+              f"{result['p99_ms']:>10.1f}{result['failures']:>8}")
+
+
+if __name__ == '__main__':
+    main()
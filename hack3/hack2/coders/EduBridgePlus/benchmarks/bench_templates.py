@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark: template render time with and without fragment caching
+
+Seeds a throwaway SQLite database, then requests /analytics, /leaderboard
+and /learn repeatedly with the fragment cache disabled and enabled (warm).
+Reports the median time spent rendering each template (between Flask's
+before_render_template and template_rendered signals, so including the
+queries run lazily from inside cached blocks) and the median request time.
+
+Usage: python benchmarks/bench_templates.py [--users 2000] [--requests 200]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PAGES = {
+    'analytics.html': '/analytics',
+    'leaderboard.html': '/leaderboard?window=all',
+    'learn.html': '/learn?topic=Climate Change',
+}
+TOPICS = ['Climate Change', 'Water Conservation', 'Renewable Energy', 'Recycling', 'Quality Education',
+          'Ocean Pollution', 'Sustainable Living', 'Green Technology', 'Carbon Footprint', 'Biodiversity']
+
+
+def seed(path, users, attempts):
+    rng = random.Random(7)
+    now = datetime.utcnow()
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.executemany(
+            'INSERT INTO user_progress (session_id, topics_learned, quizzes_completed, sdg_4_topics, sdg_6_topics,'
+            ' sdg_13_topics, total_score, quiz_streak, badges, created_at, updated_at)'
+            ' VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?)',
+            ((f'user_{i}', rng.randint(0, 50), rng.randint(0, 50), rng.randint(0, 10), rng.randint(0, 10),
+              rng.randint(0, 10), rng.randint(0, 500), '[]', now, now) for i in range(users)))
+        connection.executemany(
+            'INSERT INTO quiz_attempt (session_id, topic, score, total_questions, percentage, created_at)'
+            ' VALUES (?, ?, ?, 3, ?, ?)',
+            ((f'user_{rng.randrange(users)}', rng.choice(TOPICS), score, round(score / 3 * 100),
+              now - timedelta(minutes=rng.randrange(60 * 24 * 60)))
+             for score in (rng.randint(0, 3) for _ in range(attempts))))
+    connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--attempts', type=int, default=20000)
+    parser.add_argument('--requests', type=int, default=200, help='requests per page and mode')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    os.environ['EDUBRIDGE_WRITE_BEHIND'] = '0'
+    os.environ['EDUBRIDGE_SESSION_PATH'] = os.path.join(tmp, 'sessions.db')
+    sys.path.insert(0, APP_DIR)
+    os.chdir(APP_DIR)
+    from flask import before_render_template, template_rendered
+    from app import app, db, User, leaderboards, rebuild_analytics, rebuild_leaderboards
+
+    seed(path, args.users, args.attempts)
+    with app.app_context(), db.engine.begin() as connection:
+        rebuild_analytics(connection)
+        rebuild_leaderboards(connection)
+    with app.app_context():
+        user = User(username='bench', email='bench@example.com')
+        user.set_password('bench')
+        db.session.add(user)
+        db.session.commit()
+    leaderboards.clear()
+    client = app.test_client()
+    client.post('/login', data={'username': 'bench', 'password': 'bench'})
+
+    renders, started = [], {}
+
+    def render_started(sender, template, **extra):
+        started[template.name] = time.perf_counter()
+
+    def render_finished(sender, template, **extra):
+        renders.append(time.perf_counter() - started.pop(template.name))
+
+    before_render_template.connect(render_started, app)
+    template_rendered.connect(render_finished, app)
+
+    fragment_cache = app.jinja_env.fragment_cache
+    print(f'{args.users:,} users, {args.attempts:,} quiz attempts, {args.requests} requests per page\n')
+    print(f"{'template':<18}{'fragments':>10}{'render ms':>11}{'request ms':>12}")
+    for template, url in PAGES.items():
+        for label, store in (('off', None), ('on', fragment_cache)):
+            app.jinja_env.fragment_cache = store
+            client.get(url)  # warm the page's other caches (and its fragments when on)
+            renders.clear()
+            requests = []
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                client.get(url)
+                requests.append(time.perf_counter() - start)
+            print(f'{template:<18}{label:>10}{statistics.median(renders) * 1000:>11.3f}'
+                  f'{statistics.median(requests) * 1000:>12.3f}')
+    print(f'\nfragment cache: {fragment_cache.stats()}')
+
+    with app.app_context():
+        db.engine.dispose()
+    shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Load test: scripted student journeys, in-process or against a local multi-worker server
+
+Seeds a throwaway SQLite database with --users registered learners (with
+progress and --attempts quiz attempts between them) and --posts community
+posts, then runs --clients virtual students at once, each completing
+--iterations journeys in turn from --journeys:
+  newcomer   register, log in, open the home page, learn a topic, take its quiz, log out
+  learner    log in as a seeded learner, learn two topics and take their quizzes,
+             open the dashboard, leaderboard and analytics
+  community  log in as a seeded learner, read the community page, share a post,
+             like posts and page through the feed API
+Requests go through Flask's test client (--workers 0), or over HTTP to
+--workers server processes accepting on one shared socket. The report gives
+p50/p95/p99 latency, requests per second and SQL statements per request for
+each endpoint. --output saves it as JSON, --baseline compares the run with a
+saved report and --compare compares two saved reports without running;
+either exits with status 1 if anything regressed.
+
+Usage: python benchmarks/loadtest.py [--workers 0] [--clients 16] [--iterations 5] [--output results.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from utils.load_report import LoadRecorder, compare_reports  # noqa: E402
+
+TOPICS = ['Climate Change', 'Water Conservation', 'Renewable Energy', 'Recycling', 'Quality Education',
+          'Ocean Pollution', 'Sustainable Living', 'Green Technology', 'Carbon Footprint', 'Biodiversity']
+ACTIONS = ['Switched to a reusable water bottle', 'Started composting at home', 'Cycled to school all week',
+           'Fixed a leaking tap', 'Organised a beach clean-up', 'Planted a tree with my class']
+PASSWORD = 'bench-password'
+# Run settings that must match for two reports to be comparable
+SETTINGS = ('mode', 'clients', 'iterations', 'journeys', 'users', 'attempts', 'posts', 'write_behind')
+QUIZ_ID = re.compile(r'quiz_id: (".*?"),')
+QUESTION_COUNT = re.compile(r'const questionCount = (\d+);')
+
+
+def seed(path, users, attempts, posts, password_hash):
+    """Learners user_1..user_N (username learnerN) with progress, quiz attempts and posts"""
+    rng = random.Random(7)
+    now = datetime.utcnow()
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.executemany(
+            'INSERT INTO user (id, username, email, password_hash, created_at) VALUES (?, ?, ?, ?, ?)',
+            ((i, f'learner{i}', f'learner{i}@example.com', password_hash, now) for i in range(1, users + 1)))
+        connection.executemany(
+            'INSERT INTO user_progress (session_id, topics_learned, quizzes_completed, sdg_4_topics, sdg_6_topics,'
+            ' sdg_13_topics, total_score, quiz_streak, badges, created_at, updated_at)'
+            ' VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?)',
+            ((f'user_{i}', rng.randint(0, 50), rng.randint(0, 50), rng.randint(0, 10), rng.randint(0, 10),
+              rng.randint(0, 10), rng.randint(0, 500), '[]', now, now) for i in range(1, users + 1)))
+        connection.executemany(
+            'INSERT INTO quiz_attempt (session_id, topic, score, total_questions, percentage, created_at)'
+            ' VALUES (?, ?, ?, 3, ?, ?)',
+            ((f'user_{rng.randint(1, users)}', rng.choice(TOPICS), score, round(score / 3 * 100),
+              now - timedelta(minutes=rng.randrange(60 * 24 * 60)))
+             for score in (rng.randint(0, 3) for _ in range(attempts))))
+        connection.executemany(
+            'INSERT INTO community_post (username, action, likes, created_at) VALUES (?, ?, ?, ?)',
+            ((f'learner{rng.randint(1, users)}', rng.choice(ACTIONS), rng.randint(0, 40),
+              now - timedelta(minutes=rng.randrange(60 * 24 * 60))) for _ in range(posts)))
+        post_count = connection.execute('SELECT COUNT(*) FROM community_post').fetchone()[0]
+    connection.close()
+    return post_count
+
+
+class InProcessClient:
+    """Browser session driving the app through Flask's test client"""
+
+    def __init__(self, app, recorder):
+        self.client = app.test_client()
+        self.recorder = recorder
+
+    def request(self, method, path, label=None, **kwargs):
+        """Send a request and record it under label ('METHOD /path' by default); returns (status, text, headers)"""
+        start = time.perf_counter()
+        try:
+            response = self.client.open(path, method=method, **kwargs)
+            status, text, headers = response.status_code, response.get_data(as_text=True), response.headers
+        except Exception:  # an error the app let escape
+            status, text, headers = 599, '', {}
+        self.recorder.record(label or f"{method} {path.split('?')[0]}", time.perf_counter() - start, status,
+                             int(headers['X-Query-Count']) if 'X-Query-Count' in headers else None)
+        return status, text, headers
+
+
+class HTTPClient:
+    """Browser session driving a running server over HTTP"""
+
+    def __init__(self, base_url, recorder):
+        import requests
+        self.session = requests.Session()
+        self.base_url = base_url
+        self.recorder = recorder
+
+    def request(self, method, path, label=None, **kwargs):
+        """Send a request and record it under label ('METHOD /path' by default); returns (status, text, headers)"""
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, allow_redirects=False, timeout=60,
+                                            **kwargs)
+            status, text, headers = response.status_code, response.text, response.headers
+        except Exception:  # connection refused, reset or timed out
+            status, text, headers = 599, '', {}
+        self.recorder.record(label or f"{method} {path.split('?')[0]}", time.perf_counter() - start, status,
+                             int(headers['X-Query-Count']) if 'X-Query-Count' in headers else None)
+        return status, text, headers
+
+
+class Student:
+    """One journey's browser session plus what the journeys need to pick their inputs"""
+
+    def __init__(self, client, rng, name, learners, posts):
+        self.client = client
+        self.rng = rng
+        self.name = name            # unique per journey, for registrations
+        self.learners = learners    # seeded learner count
+        self.posts = posts          # community post count when seeded
+
+    def login_as_learner(self):
+        username = f'learner{self.rng.randint(1, self.learners)}'
+        self.client.request('POST', '/login', data={'username': username, 'password': PASSWORD})
+        return username
+
+    def learn_and_quiz(self):
+        topic = self.rng.choice(TOPICS)
+        _, page, _ = self.client.request('GET', f'/learn?topic={topic}')
+        quiz_id, questions = QUIZ_ID.search(page), QUESTION_COUNT.search(page)
+        if quiz_id and questions:
+            self.client.request('POST', '/submit_quiz', json={
+                'quiz_id': json.loads(quiz_id.group(1)),
+                'answers': [self.rng.randrange(4) for _ in range(int(questions.group(1)))]})
+
+
+def newcomer(student):
+    client, name = student.client, student.name
+    client.request('GET', '/register')
+    client.request('POST', '/register', data={'username': name, 'email': f'{name}@example.com',
+                                              'password': PASSWORD, 'confirm_password': PASSWORD})
+    client.request('POST', '/login', data={'username': name, 'password': PASSWORD})
+    client.request('GET', '/')
+    student.learn_and_quiz()
+    client.request('GET', '/logout')
+
+
+def learner(student):
+    client = student.client
+    student.login_as_learner()
+    student.learn_and_quiz()
+    student.learn_and_quiz()
+    client.request('GET', '/dashboard')
+    client.request('GET', f"/leaderboard?window={student.rng.choice(['all', 'week', 'month'])}")
+    client.request('GET', '/api/leaderboard')
+    client.request('GET', '/analytics')
+
+
+def community(student):
+    client, rng = student.client, student.rng
+    username = student.login_as_learner()
+    client.request('GET', '/community')
+    client.request('POST', '/api/posts', json={'username': username, 'action': rng.choice(ACTIONS)})
+    for _ in range(3):
+        client.request('POST', f'/api/posts/{rng.randint(1, student.posts)}/like',
+                       label='POST /api/posts/<id>/like')
+    _, _, headers = client.request('GET', '/api/posts?limit=20')
+    if headers.get('X-Next-Cursor'):
+        client.request('GET', f"/api/posts?limit=20&cursor={headers['X-Next-Cursor']}")
+
+
+JOURNEYS = {'newcomer': newcomer, 'learner': learner, 'community': community}
+
+
+def run_journeys(make_client, recorder, args, posts):
+    """Warm up with one of each journey unrecorded, then run the clients; returns the measured seconds"""
+    journeys = [JOURNEYS[name] for name in args.journeys.split(',')]
+    recorder.enabled = False
+    for i, journey in enumerate(journeys):
+        journey(Student(make_client(), random.Random(-i), f'warmup{i}', args.users, posts))
+    recorder.enabled = True
+
+    ready = threading.Barrier(args.clients + 1)
+
+    def run_client(index):
+        rng = random.Random(index)
+        ready.wait()
+        for iteration in range(args.iterations):
+            journey = journeys[(index + iteration) % len(journeys)]
+            journey(Student(make_client(), rng, f'student{index}x{iteration}', args.users, posts))
+
+    threads = [threading.Thread(target=run_client, args=(i,)) for i in range(args.clients)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def serve(fd):
+    """Worker process: serve the app on an inherited listening socket until interrupted"""
+    import logging
+    logging.disable(logging.CRITICAL)
+    from werkzeug.serving import make_server
+    from app import app
+
+    server = make_server('127.0.0.1', 0, app, threaded=True, fd=fd)
+    print('ready', flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+
+
+def start_workers(count):
+    """Bind a socket and start count worker processes accepting on it; returns (base url, stop callable)"""
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(1024)
+    fd = listener.fileno()
+    workers = [subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve-fd', str(fd)],
+                                cwd=APP_DIR, pass_fds=(fd,), stdout=subprocess.PIPE, text=True)
+               for _ in range(count)]
+    for worker in workers:
+        for line in worker.stdout:
+            if line.strip() == 'ready':
+                break
+        else:
+            raise RuntimeError('A server worker failed to start')
+
+    def stop():
+        # SIGINT, so each worker's exit handlers flush anything still buffered
+        for worker in workers:
+            worker.send_signal(signal.SIGINT)
+        for worker in workers:
+            try:
+                worker.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                worker.kill()
+        listener.close()
+
+    return f'http://127.0.0.1:{listener.getsockname()[1]}', stop
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=APP_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report):
+    print(f"{'endpoint':<32}{'requests':>9}{'errors':>7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'queries':>9}")
+    for endpoint, stats in list(report['endpoints'].items()) + [('total', report['total'])]:
+        queries = '-' if stats['queries'] is None else f"{stats['queries']:.1f}"
+        print(f"{endpoint:<32}{stats['requests']:>9}{stats['errors']:>7}{stats['rps']:>9.1f}{stats['p50_ms']:>9.1f}"
+              f"{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}{queries:>9}")
+
+
+def print_comparison(baseline, current, threshold):
+    """Print changes beyond the threshold and every regression; returns True if anything regressed"""
+    print(f"\ncompared with {baseline['meta'].get('commit') or 'baseline'} ({threshold:.0%} threshold)")
+    for setting in SETTINGS:
+        if baseline['meta'].get(setting) != current['meta'].get(setting):
+            print(f"warning: {setting} differs ({baseline['meta'].get(setting)} -> {current['meta'].get(setting)})")
+    print(f"{'endpoint':<32}{'metric':>9}{'before':>10}{'after':>10}{'change':>9}")
+    changes = compare_reports(baseline, current, threshold)
+    for change in changes:
+        if change.regressed or change.endpoint == 'total' or (change.change is not None
+                                                                and abs(change.change) > threshold):
+            relative = '-' if change.change is None else f'{change.change:+.0%}'
+            print(f"{change.endpoint:<32}{change.metric:>9}{change.before:>10.1f}{change.after:>10.1f}"
+                  f"{relative:>9}{'  REGRESSED' if change.regressed else ''}")
+    regressions = sum(change.regressed for change in changes)
+    print(f'{regressions} regression(s)')
+    return regressions > 0
+
+
+def load_report(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', type=int, default=0, help='server processes; 0 runs in-process')
+    parser.add_argument('--clients', type=int, default=16, help='concurrent virtual students')
+    parser.add_argument('--iterations', type=int, default=5, help='journeys per client')
+    parser.add_argument('--journeys', default='newcomer,learner,community')
+    parser.add_argument('--users', type=int, default=2000, help='seeded learners')
+    parser.add_argument('--attempts', type=int, default=20000, help='seeded quiz attempts')
+    parser.add_argument('--posts', type=int, default=2000, help='seeded community posts')
+    parser.add_argument('--write-behind', action='store_true', help='keep batched writes enabled')
+    parser.add_argument('--output', help='save the report as JSON')
+    parser.add_argument('--baseline', help='compare the run with a saved report')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'),
+                        help='compare two saved reports without running')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative latency or throughput change counted as a regression')
+    parser.add_argument('--serve-fd', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_fd is not None:
+        serve(args.serve_fd)
+        return
+    if args.compare:
+        sys.exit(1 if print_comparison(load_report(args.compare[0]), load_report(args.compare[1]),
+                                       args.threshold) else 0)
+    unknown = set(args.journeys.split(',')) - set(JOURNEYS)
+    if unknown:
+        parser.error(f"unknown journey(s) {', '.join(sorted(unknown))}; choose from {', '.join(JOURNEYS)}")
+
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    os.environ['EDUBRIDGE_WRITE_BEHIND'] = '1' if args.write_behind else '0'
+    os.environ['EDUBRIDGE_SESSION_PATH'] = os.path.join(tmp, 'sessions.db')
+    # Statement counts come from the app's X-Query-Count header, in-process and from workers alike
+    os.environ['EDUBRIDGE_INSTRUMENTATION_HEADERS'] = '1'
+    os.chdir(APP_DIR)
+    import logging
+    logging.disable(logging.CRITICAL)
+    from werkzeug.security import generate_password_hash
+    from app import app, db, leaderboards, rebuild_analytics, rebuild_leaderboards
+
+    posts = seed(path, args.users, args.attempts, args.posts, generate_password_hash(PASSWORD))
+    with app.app_context(), db.engine.begin() as connection:
+        rebuild_analytics(connection)
+        rebuild_leaderboards(connection)
+    leaderboards.clear()
+
+    recorder = LoadRecorder()
+    mode = f'{args.workers} workers' if args.workers else 'in-process'
+    print(f'{mode}: {args.clients} clients x {args.iterations} journeys ({args.journeys}), '
+          f'{args.users:,} learners, {args.attempts:,} quiz attempts, {posts:,} posts\n')
+    if args.workers:
+        with app.app_context():
+            db.engine.dispose()
+        base_url, stop = start_workers(args.workers)
+        try:
+            seconds = run_journeys(lambda: HTTPClient(base_url, recorder), recorder, args, posts)
+        finally:
+            stop()
+    else:
+        seconds = run_journeys(lambda: InProcessClient(app, recorder), recorder, args, posts)
+
+    report = recorder.report(seconds, commit=git_commit(), mode=mode, workers=args.workers,
+                             clients=args.clients, iterations=args.iterations, journeys=args.journeys,
+                             users=args.users, attempts=args.attempts, posts=posts,
+                             write_behind=args.write_behind, python=platform.python_version(),
+                             finished_at=datetime.utcnow().isoformat(timespec='seconds'))
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f'\nsaved {args.output}')
+
+    with app.app_context():
+        db.engine.dispose()
+    shutil.rmtree(tmp, ignore_errors=True)
+    if args.baseline and print_comparison(load_report(args.baseline), report, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Soak test: many live feed subscribers while posts and likes pour in
+
+Opens --subscribers streams on /api/posts/stream against a throwaway SQLite
+database, then has --writers clients like a handful of posts and share new
+ones through the real endpoints. Checks that every subscriber converges on
+the final like counts and sees every new post, and reports how long that
+took after the last write, how many messages each subscriber received for
+how many events (the coalescing ratio) and how many SQL statements the
+subscribers ran (should be none).
+
+Usage: python benchmarks/soak_feed.py [--subscribers 1000] [--writers 8] [--likes 200]
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))] if ordered else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--subscribers', type=int, default=1000)
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--likes', type=int, default=200, help='likes per writer')
+    parser.add_argument('--posts', type=int, default=5, help='new posts per writer')
+    parser.add_argument('--timeout', type=float, default=60.0, help='seconds to wait for subscribers to converge')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ['EDUBRIDGE_WRITE_BEHIND'] = '0'
+    sys.path.insert(0, APP_DIR)
+    os.chdir(APP_DIR)
+    import logging
+    logging.disable(logging.CRITICAL)
+    from sqlalchemy import event
+    from app import app, db, CommunityPost, feed_broker, like_buffer
+
+    app.config['FEED_KEEPALIVE'] = 0.5
+    feed_broker.max_subscribers = max(args.subscribers, feed_broker.max_subscribers)
+    with app.app_context():
+        hot_posts = [post.id for post in CommunityPost.query.order_by(CommunityPost.id).limit(3)]
+        engine = db.engine
+    statements = {'subscriber': 0, 'writer': 0}
+    lock = threading.Lock()
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def count_statement(*_):
+        role = threading.current_thread().name.split('-')[0]
+        if role in statements:
+            with lock:
+                statements[role] += 1
+
+    expected = {}
+    finished = threading.Event()
+    writes_done = [0.0]
+    lags, messages, failures = [], [], []
+    connected = threading.Barrier(args.subscribers + 1)
+
+    def subscriber():
+        client = app.test_client()
+        response = client.get('/api/posts/stream', buffered=False)
+        likes, posts, received, buffer = {}, set(), 0, ''
+        connected.wait()
+        deadline = time.monotonic() + args.timeout
+        try:
+            for chunk in response.response:
+                buffer += chunk.decode() if isinstance(chunk, bytes) else chunk
+                *complete, buffer = buffer.split('\n\n')
+                for message in complete:
+                    fields = dict(line.split(': ', 1) for line in message.splitlines() if ': ' in line
+                                  and not line.startswith(':'))
+                    if fields.get('event') == 'feed':
+                        received += 1
+                        batch = json.loads(fields['data'])
+                        likes.update(batch.get('likes', {}))
+                        posts.update(post['id'] for post in batch.get('posts', []))
+                if finished.is_set() and len(posts) == expected['posts'] and all(
+                        likes.get(str(post_id)) == count for post_id, count in expected['likes'].items()):
+                    with lock:
+                        lags.append(time.perf_counter() - writes_done[0])
+                        messages.append(received)
+                    return
+                if time.monotonic() > deadline:
+                    with lock:
+                        failures.append({'posts': len(posts), 'likes': likes})
+                    return
+        finally:
+            response.close()
+
+    def writer(index):
+        client = app.test_client()
+        rng = random.Random(index)
+        post_every = max(1, args.likes // max(1, args.posts))
+        for n in range(args.likes):
+            client.post(f'/api/posts/{rng.choice(hot_posts)}/like')
+            if n % post_every == 0 and n // post_every < args.posts:
+                client.post('/api/posts', json={'username': f'writer{index}', 'action': f'Soak post {n}'})
+
+    readers = [threading.Thread(target=subscriber, name=f'subscriber-{i}') for i in range(args.subscribers)]
+    for thread in readers:
+        thread.start()
+    connected.wait()
+    print(f'{args.subscribers} subscribers connected: {feed_broker.stats()}')
+
+    with app.app_context():
+        before = {post_id: db.session.get(CommunityPost, post_id).likes for post_id in hot_posts}
+        posts_before = CommunityPost.query.count()
+    started = time.perf_counter()
+    writers = [threading.Thread(target=writer, args=(i,), name=f'writer-{i}') for i in range(args.writers)]
+    for thread in writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    writes_done[0] = time.perf_counter()
+    if like_buffer:
+        like_buffer.flush()
+    with app.app_context():
+        expected['likes'] = {post_id: db.session.get(CommunityPost, post_id).likes for post_id in hot_posts}
+        expected['posts'] = CommunityPost.query.count() - posts_before
+    finished.set()
+    for thread in readers:
+        thread.join()
+
+    events = sum(expected['likes'][post_id] - before[post_id] for post_id in hot_posts) + expected['posts']
+    elapsed = writes_done[0] - started
+    stats = feed_broker.stats()
+    print(f'{events} events ({expected["posts"]} posts) written in {elapsed:.1f}s ({events / elapsed:.0f}/s), '
+          f'{stats["batches"]} batches published')
+    print(f'converged: {len(lags)}/{args.subscribers} subscribers, {len(failures)} timed out')
+    if lags:
+        print(f'lag after last write: p50 {percentile(lags, 50) * 1000:.0f} ms, '
+              f'p99 {percentile(lags, 99) * 1000:.0f} ms, max {max(lags) * 1000:.0f} ms')
+        print(f'messages per subscriber: {statistics.mean(messages):.1f} for {events} events')
+    print(f"SQL statements: writers {statements['writer']}, subscribers {statements['subscriber']}")
+    print(f'subscribers still connected: {feed_broker.stats()["subscribers"]}')
+
+    feed_broker.close()
+    with app.app_context():
+        db.engine.dispose()
+    shutil.rmtree(tmp, ignore_errors=True)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Test script to verify declarative badge rules are indexed by counter and stored as bitsets
+"""
+import sys
+import time
+
+from utils.badges import BadgeEngine, BadgeRule, badge_count, load_badge_rules
+
+
+def rule(badge_id, counter, threshold):
+    return BadgeRule(badge_id, badge_id.title(), '*', f'{counter} >= {threshold}', counter, threshold)
+
+
+def test_awards_reached_thresholds_of_changed_counters_only():
+    engine = BadgeEngine([rule('starter', 'topics_learned', 3), rule('expert', 'topics_learned', 10),
+                          rule('streak', 'quiz_streak', 3)])
+    progress = {'topics_learned': 4, 'quiz_streak': 5}
+    earned = engine.evaluate(progress, 0, ['topics_learned'])
+    assert engine.ids(earned) == ['starter']
+    # quiz_streak qualifies but did not change, so it is not evaluated
+    earned = engine.evaluate(progress, earned, ['quiz_streak', None])
+    assert engine.ids(earned) == ['starter', 'streak'] and badge_count(earned) == 2
+    # Badges are never taken back when a counter drops
+    assert engine.evaluate({'topics_learned': 4, 'quiz_streak': 0}, earned, ['quiz_streak']) == earned
+
+
+def test_bitset_round_trips_ids():
+    engine = BadgeEngine([rule(f'badge_{i}', 'total_score', i) for i in range(1, 301)])
+    bits = engine.to_bits(['badge_1', 'badge_200', 'badge_300', 'retired_badge'])
+    assert engine.ids(bits) == ['badge_1', 'badge_200', 'badge_300']
+    cards = engine.cards({'total_score': 150}, bits)
+    assert cards[0]['earned'] and cards[199]['earned'] and cards[199]['current'] == 200
+    assert not cards[150]['earned'] and cards[150]['current'] == 150
+
+
+def test_evaluation_cost_does_not_grow_with_badges():
+    counters = ['topics_learned', 'quizzes_completed', 'total_score', 'quiz_streak']
+    engine = BadgeEngine([rule(f'badge_{i}', counters[i % 4], i) for i in range(1000)])
+    progress = dict.fromkeys(counters, 500)
+    start = time.perf_counter()
+    for _ in range(10000):
+        engine.evaluate(progress, 0, ['topics_learned', 'total_score'])
+    assert time.perf_counter() - start < 1.0
+    assert badge_count(engine.evaluate(progress, 0, counters)) == 501
+
+
+def test_default_rules_and_duplicates():
+    engine = BadgeEngine(load_badge_rules())
+    assert {'eco_starter', 'water_warrior', 'climate_champion'} <= set(engine.bits)
+    assert 'quiz_streak' in engine.counters
+    try:
+        BadgeEngine([rule('same', 'topics_learned', 1), rule('same', 'topics_learned', 2)])
+        assert False, 'expected ValueError'
+    except ValueError:
+        pass
+
+
+if __name__ == "__main__":
+    tests = [test_awards_reached_thresholds_of_changed_counters_only, test_bitset_round_trips_ids,
+             test_evaluation_cost_does_not_grow_with_badges, test_default_rules_and_duplicates]
+    for test in tests:
+        test()
+        print(f"   ✓ {test.__name__}")
+    print("✓ All badge tests passed!")
+    sys.exit(0)
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the bounded TTL LRU cache used for learn page content
+"""
+import sys
+
+from utils.cache import TTLLRUCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction():
+    cache = TTLLRUCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1  # 'a' is now most recent
+    cache.set('c', 3)
+    assert 'b' not in cache
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_ttl_expiry():
+    clock = FakeClock()
+    cache = TTLLRUCache(maxsize=10, ttl=5, clock=clock)
+    cache.set('climate change', 'payload')
+    clock.now = 4.9
+    assert cache.get('climate change') == 'payload'
+    clock.now = 5.0
+    assert cache.get('climate change') is None
+    stats = cache.stats()
+    assert stats['expirations'] == 1 and stats['size'] == 0
+
+
+def test_get_or_set_counters():
+    cache = TTLLRUCache(maxsize=10)
+    calls = []
+    for _ in range(3):
+        cache.get_or_set('key', lambda: calls.append(1) or 'value')
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses']) == (2, 1)
+
+
+if __name__ == "__main__":
+    tests = [test_lru_eviction, test_ttl_expiry, test_get_or_set_counters]
+    for test in tests:
+        test()
+        print(f"   ✓ {test.__name__}")
+    print("✓ All cache tests passed!")
+    sys.exit(0)
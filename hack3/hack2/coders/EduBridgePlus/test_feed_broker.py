@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the live feed broker batches events and keeps subscribers in step
+"""
+import json
+import sys
+import threading
+
+from utils.feed_broker import FeedBroker, FeedFull, create_transport, InProcessTransport
+
+
+def batches(text):
+    """(event, data) pairs in an SSE chunk"""
+    events = []
+    for message in text.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in message.splitlines() if not line.startswith(':'))
+        events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+def test_burst_is_coalesced_into_one_batch():
+    broker = FeedBroker(window=0.05).start()
+    try:
+        with broker.subscribe() as subscription:
+            for likes in range(1, 101):
+                broker.publish('likes', likes, key=7)
+            broker.publish('posts', {'id': 1})
+            broker.publish('posts', {'id': 2})
+            assert batches(subscription.next(timeout=2)) == [
+                ('feed', {'likes': {'7': 100}, 'posts': [{'id': 1}, {'id': 2}]})
+            ]
+            assert subscription.next(timeout=0.1) is None
+        assert broker.stats() == {'subscribers': 0, 'published': 102, 'batches': 1}
+    finally:
+        broker.close()
+
+
+def test_every_subscriber_gets_each_batch():
+    broker = FeedBroker(window=0.01).start()
+    received = []
+    lock = threading.Lock()
+    subscriptions = [broker.subscribe() for _ in range(50)]
+
+    def read(subscription):
+        with subscription:
+            chunks = [chunk for chunk in subscription.messages(keepalive=0.05) if not chunk.startswith(':')]
+        with lock:
+            received.append([event for chunk in chunks for event in batches(chunk)])
+
+    threads = [threading.Thread(target=read, args=(subscription,)) for subscription in subscriptions]
+    for thread in threads:
+        thread.start()
+    broker.publish('likes', 3, key=1)
+    broker.close()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert received == [[('feed', {'likes': {'1': 3}})]] * 50
+
+
+def test_reconnect_resumes_or_resets():
+    broker = FeedBroker(window=0, history=2).start()
+    try:
+        subscription = broker.subscribe()
+        broker.publish('posts', {'id': 1})
+        first = subscription.next(timeout=2)
+        last_event_id = first.split('\n')[0][len('id: '):]
+        subscription.close()
+
+        broker.publish('posts', {'id': 2})
+        with broker.subscribe(last_event_id) as resumed:
+            assert batches(resumed.next(timeout=2)) == [('feed', {'posts': [{'id': 2}]})]
+        # An id from another worker or an earlier process cannot be resumed
+        with broker.subscribe('00000000-1') as foreign:
+            assert batches(foreign.next(timeout=0)) == [('reset', {})]
+        # Fell further behind than the history holds
+        with broker.subscribe(last_event_id) as stale, broker.subscribe() as current:
+            for post_id in (3, 4):
+                broker.publish('posts', {'id': post_id})
+                assert current.next(timeout=2)
+            assert batches(stale.next(timeout=0)) == [('reset', {})]
+    finally:
+        broker.close()
+
+
+def test_subscriber_limit():
+    broker = FeedBroker(max_subscribers=1)
+    with broker.subscribe():
+        try:
+            broker.subscribe()
+            assert False, 'expected FeedFull'
+        except FeedFull:
+            pass
+    broker.subscribe().close()
+
+
+def test_create_transport():
+    assert isinstance(create_transport(''), InProcessTransport)
+    try:
+        create_transport('amqp://localhost')
+        assert False, 'expected ValueError'
+    except ValueError:
+        pass
+
+
+if __name__ == "__main__":
+    tests = [test_burst_is_coalesced_into_one_batch, test_every_subscriber_gets_each_batch,
+             test_reconnect_resumes_or_resets, test_subscriber_limit, test_create_transport]
+    for test in tests:
+        test()
+        print(f"   ✓ {test.__name__}")
+    print("✓ All feed broker tests passed!")
+    sys.exit(0)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test script to verify {% cache %} template fragments are rendered once and shared
+"""
+import sys
+
+from jinja2 import DictLoader, Environment
+
+from utils.cache import TTLLRUCache
+from utils.fragment_cache import FragmentCacheExtension
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+TEMPLATES = {
+    'page.html': '{% cache ("stats", version), 60 %}<b>{{ load() }}</b>{% endcache %} hi {{ user }}',
+    'other.html': '{% cache ("stats", version) %}{{ load() }}!{% endcache %}',
+    'skip.html': '{% cache key %}{{ load() }}{% endcache %}',
+}
+
+
+def make_environment(clock=None):
+    environment = Environment(loader=DictLoader(TEMPLATES), extensions=[FragmentCacheExtension], autoescape=True)
+    environment.fragment_cache = TTLLRUCache(maxsize=16, clock=clock or FakeClock())
+    return environment
+
+
+class Loader:
+    """Counts how often a cached block's data is loaded"""
+
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+def test_renders_once_per_key():
+    page = make_environment().get_template('page.html')
+    load = Loader('<3')
+    assert page.render(version=1, load=load, user='ann') == '<b>&lt;3</b> hi ann'
+    assert page.render(version=1, load=load, user='bob') == '<b>&lt;3</b> hi bob'
+    assert load.calls == 1
+    load.value = 'new'
+    assert page.render(version=2, load=load, user='bob') == '<b>new</b> hi bob'
+    assert load.calls == 2
+
+
+def test_ttl_and_scope():
+    clock = FakeClock()
+    environment = make_environment(clock)
+    load = Loader('x')
+    environment.get_template('page.html').render(version=1, load=load)
+    # Same key in another template is a separate entry
+    assert environment.get_template('other.html').render(version=1, load=load) == 'x!'
+    assert load.calls == 2
+    clock.now = 61
+    environment.get_template('page.html').render(version=1, load=load)
+    assert load.calls == 3
+
+
+def test_none_key_or_no_store_disables_caching():
+    environment = make_environment()
+    load = Loader('x')
+    for _ in range(2):
+        environment.get_template('skip.html').render(key=None, load=load)
+    environment.fragment_cache = None
+    for _ in range(2):
+        environment.get_template('page.html').render(version=1, load=load)
+    assert load.calls == 4
+
+
+if __name__ == "__main__":
+    tests = [test_renders_once_per_key, test_ttl_and_scope, test_none_key_or_no_store_disables_caching]
+    for test in tests:
+        test()
+        print(f"   ✓ {test.__name__}")
+    print("✓ All fragment cache tests passed!")
+    sys.exit(0)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the explanation backends stream the same content they generate
+"""
+import json
+import sys
+import time
+
+from utils import llm_backend
+from utils.ai_helper import get_ai_response
+from utils.llm_backend import (FakeBackend, HTMLSanitizer, LLMBackend, OpenAICompatibleBackend, TemplateBackend,
+                               create_backend, sanitize_html)
+
+
+def test_template_backend_chunks_match_response():
+    backend = TemplateBackend()
+    chunks = list(backend.stream("Climate Change", "deep"))
+    assert len(chunks) > 1
+    assert "".join(chunks) == get_ai_response("Climate Change", "deep")
+    assert not backend.streaming
+
+
+def test_fake_backend_streams_with_latency():
+    backend = FakeBackend(first_token_delay=0.05, token_delay=0.0)
+    start = time.perf_counter()
+    stream = backend.stream("Water Pollution", "basic")
+    first = next(stream)
+    assert time.perf_counter() - start >= 0.05
+    assert first + "".join(stream) == get_ai_response("Water Pollution", "basic")
+    assert backend.streaming
+
+
+def test_create_backend():
+    assert isinstance(create_backend("fake", first_token_delay=0), FakeBackend)
+    try:
+        create_backend("missing")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("unknown backend should raise ValueError")
+
+    try:
+        LLMBackend()
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("a backend without stream() should not instantiate")
+
+
+def test_model_output_is_sanitized():
+    assert sanitize_html('<h3 onclick="x()">Tips</h3><script>alert(1)</script><img src=x onerror=y> R&D &amp;') == (
+        '<h3>Tips</h3>&lt;script&gt;alert(1)&lt;/script&gt;&lt;img src=x onerror=y&gt; R&amp;D &amp;')
+    # Tags and entities split across chunks are held back until complete
+    sanitizer = HTMLSanitizer()
+    chunks = [sanitizer.feed(chunk) for chunk in ['<p>Save wat', 'er &am', 'p; <scr', 'ipt>x</p', '>']]
+    assert chunks == ['<p>Save wat', 'er ', '&amp; ', '&lt;script&gt;x', '</p>'] and sanitizer.close() == ''
+
+
+class FakeResponse:
+    """Streaming /chat/completions reply carrying the given content deltas"""
+
+    def __init__(self, deltas):
+        self.lines = [f"data: {json.dumps({'choices': [{'delta': {'content': delta}}]})}" for delta in deltas]
+        self.lines.append('data: [DONE]')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def raise_for_status(self):
+        pass
+
+    def iter_lines(self, decode_unicode=False):
+        return iter(self.lines)
+
+
+def test_openai_backend_sanitizes_stream():
+    post = llm_backend.requests.post
+    llm_backend.requests.post = lambda *args, **kwargs: FakeResponse(['<p>Hello <a href="javascript:x()">', 'link</a>',
+                                                                      '</p><img src=x on', 'error=y>'])
+    try:
+        assert OpenAICompatibleBackend().generate('Climate Change', 'basic') == (
+            '<p>Hello &lt;a href=&quot;javascript:x()&quot;&gt;link&lt;/a&gt;</p>&lt;img src=x onerror=y&gt;')
+    finally:
+        llm_backend.requests.post = post
+
+
+if __name__ == "__main__":
+    tests = [test_template_backend_chunks_match_response, test_fake_backend_streams_with_latency, test_create_backend,
+             test_model_output_is_sanitized, test_openai_backend_sanitizes_stream]
+    for test in tests:
+        test()
+        print(f"   ✓ {test.__name__}")
+    print("✓ All LLM backend tests passed!")
+    sys.exit(0)
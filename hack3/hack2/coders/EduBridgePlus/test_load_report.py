@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Test script to verify load test results are summarized per endpoint and compared between runs
+"""
+import sys
+
+from utils.load_report import LoadRecorder, compare_reports, percentile
+
+
+def test_percentile():
+    values = [i / 1000 for i in range(1, 101)]
+    assert percentile(values, 50) == 0.051
+    assert percentile(values, 99) == 0.099
+    assert percentile([], 95) == 0.0
+
+
+def test_report_per_endpoint():
+    recorder = LoadRecorder()
+    for ms in (10, 20, 30, 40):
+        recorder.record('GET /learn', ms / 1000, 200, queries=3)
+    recorder.record('GET /learn', 5.0, 500, queries=9)  # errors count only as errors
+    recorder.record('POST /login', 0.1, 302)
+    recorder.enabled = False
+    recorder.record('POST /login', 9.0, 200)
+
+    report = recorder.report(2.0, mode='in-process')
+    assert report['meta'] == {'mode': 'in-process'} and report['seconds'] == 2.0
+    learn = report['endpoints']['GET /learn']
+    assert learn['requests'] == 5 and learn['errors'] == 1 and learn['rps'] == 2.0
+    assert round(learn['p50_ms']) == 30 and round(learn['p99_ms']) == 40 and round(learn['mean_ms']) == 25
+    assert learn['queries'] == 3 and learn['max_queries'] == 3
+    login = report['endpoints']['POST /login']
+    assert login['requests'] == 1 and login['queries'] is None
+    assert report['total']['requests'] == 6 and report['total']['rps'] == 2.5
+
+
+def report(p95, rps, queries, errors=0):
+    stats = {'p50_ms': p95 / 2, 'p95_ms': p95, 'p99_ms': p95, 'rps': rps, 'queries': queries, 'errors': errors}
+    return {'total': stats, 'endpoints': {'GET /learn': stats, 'GET /gone': stats}}
+
+
+def test_compare_reports():
+    baseline = report(p95=100.0, rps=50.0, queries=4.0)
+    current = report(p95=105.0, rps=40.0, queries=5.0, errors=2)
+    del current['endpoints']['GET /gone']
+    changes = {(c.endpoint, c.metric): c for c in compare_reports(baseline, current, threshold=0.1)}
+    assert not any(endpoint == 'GET /gone' for endpoint, _ in changes)
+    assert not changes['GET /learn', 'p95_ms'].regressed  # within the threshold
+    assert changes['GET /learn', 'rps'].regressed and round(changes['GET /learn', 'rps'].change, 2) == -0.2
+    assert changes['GET /learn', 'queries'].regressed  # statement counts regress on any increase
+    assert changes['total', 'errors'].regressed and changes['total', 'errors'].change is None
+
+    faster = report(p95=50.0, rps=90.0, queries=3.6)
+    assert not any(change.regressed for change in compare_reports(baseline, faster))
+
+
+if __name__ == "__main__":
+    tests = [test_percentile, test_report_per_endpoint, test_compare_reports]
+    for test in tests:
+        test()
+        print(f"   ✓ {test.__name__}")
+    print("✓ All load report tests passed!")
+    sys.exit(0)
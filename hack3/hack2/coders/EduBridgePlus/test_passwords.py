@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test script to verify password hashing: configurable methods, rehash detection and the bounded pool
+"""
+import sys
+import threading
+
+from utils.passwords import HasherBusy, PasswordHasher, canonical_method
+
+CHEAP = 'pbkdf2:sha256:1000'
+
+
+def test_canonical_method():
+    assert canonical_method('scrypt') == 'scrypt:32768:8:1'
+    assert canonical_method('scrypt:16384:8:2') == 'scrypt:16384:8:2'
+    assert canonical_method('pbkdf2:sha256:1000') == 'pbkdf2:sha256:1000'
+    assert canonical_method('pbkdf2').startswith('pbkdf2:sha256:')
+    for method in ('md5', 'scrypt:1:2', 'pbkdf2:sha256:many'):
+        try:
+            canonical_method(method)
+            assert False, f'expected ValueError for {method}'
+        except ValueError:
+            pass
+
+
+def test_hash_verify_and_rehash():
+    for workers in (0, 2):
+        hasher = PasswordHasher(CHEAP, workers=workers)
+        password_hash = hasher.hash('secret')
+        assert password_hash.startswith('pbkdf2:sha256:1000$')
+        assert hasher.verify(password_hash, 'secret')
+        assert not hasher.verify(password_hash, 'wrong')
+        assert not hasher.needs_rehash(password_hash)
+        assert hasher.stats() == {'method': CHEAP, 'workers': workers, 'hashed': 1, 'verified': 2, 'rejected': 0}
+        hasher.shutdown()
+
+    # Hashes made with another method or cost still verify, and are flagged for replacement
+    upgraded = PasswordHasher('pbkdf2:sha256:2000', workers=0)
+    assert upgraded.verify(password_hash, 'secret')
+    assert upgraded.needs_rehash(password_hash)
+
+
+def test_busy_when_pending_limit_reached():
+    hasher = PasswordHasher(CHEAP, workers=1, max_pending=1)
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow_hash(*args):
+        started.set()
+        release.wait()
+        return 'done'
+
+    results = []
+    holder = threading.Thread(target=lambda: results.append(hasher._run(slow_hash)))
+    holder.start()
+    started.wait()
+    try:
+        hasher.hash('secret')
+        assert False, 'expected HasherBusy'
+    except HasherBusy:
+        pass
+    release.set()
+    holder.join()
+    assert results == ['done']
+    assert hasher.stats()['rejected'] == 1
+    assert hasher.verify(hasher.hash('secret'), 'secret')  # the slot is free again
+    hasher.shutdown()
+
+
+if __name__ == "__main__":
+    tests = [test_canonical_method, test_hash_verify_and_rehash, test_busy_when_pending_limit_reached]
+    for test in tests:
+        test()
+        print(f"   ✓ {test.__name__}")
+    print("✓ All password tests passed!")
+    sys.exit(0)
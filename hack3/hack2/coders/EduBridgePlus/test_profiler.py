@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the sampling profiler aggregates stacks per route and merges workers' samples
+"""
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from utils.profiler import SamplingProfiler, collapsed, speedscope
+
+
+def busy_work(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(100))
+
+
+def profile_request(profiler, route, seconds=0.1):
+    """Run busy_work as a request on its own thread, as a server would"""
+    picked = []
+
+    def handle():
+        picked.append(profiler.begin(route))
+        try:
+            busy_work(seconds)
+        finally:
+            profiler.end()
+
+    thread = threading.Thread(target=handle)
+    thread.start()
+    thread.join()
+    time.sleep(0.02)  # let the sampler finish its last pass
+    return picked[0]
+
+
+def test_samples_stacks_per_route():
+    profiler = SamplingProfiler(interval=0.002, sample_rate=1.0, enabled=True)
+    assert profile_request(profiler, '/learn')
+    profiles = profiler.merged()
+    assert list(profiles) == ['/learn']
+    assert sum(profiles['/learn'].values()) >= 10
+    assert any(stack.endswith(')') and 'busy_work (test_profiler.py:' in stack for stack in profiles['/learn'])
+
+    profiler.configure(sample_rate=0.0)
+    assert not profile_request(profiler, '/analytics', 0.01)
+    profiler.configure(enabled=False, sample_rate=1.0)
+    assert not profile_request(profiler, '/analytics', 0.01)
+    assert list(profiler.merged()) == ['/learn']
+    try:
+        profiler.configure(sample_rate=1.5)
+        assert False, 'expected ValueError'
+    except ValueError:
+        pass
+
+
+def test_workers_share_settings_and_samples():
+    directory = tempfile.mkdtemp()
+    try:
+        first = SamplingProfiler(interval=0.002, directory=directory)
+        second = SamplingProfiler(interval=0.002, directory=directory)
+        first.configure(enabled=True, sample_rate=1.0)
+        assert not second.enabled
+        second.sync()
+        assert second.enabled and second.sample_rate == 1.0
+
+        profile_request(first, '/learn')
+        profile_request(second, '/learn')
+        profile_request(second, '/analytics')
+        second.sync()
+        merged = first.merged()
+        assert sorted(merged) == ['/analytics', '/learn']
+        own = [sum(worker._profiles()['/learn'].values()) for worker in (first, second)]
+        assert all(own) and sum(merged['/learn'].values()) == sum(own)
+
+        # A reset from one worker empties every worker's samples
+        first.configure(enabled=False, reset=True)
+        second.sync()
+        assert not second.enabled and second.generation == 1 and first.merged() == {}
+        assert len([name for name in os.listdir(directory) if name.startswith('profile-')]) <= 2
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_exports():
+    profiles = {'/learn': {'app;learn;render': 3, 'app;learn': 1}, '/analytics': {'app;analytics': 2}}
+    assert collapsed(profiles) == ('/analytics;app;analytics 2\n'
+                                   '/learn;app;learn 1\n'
+                                   '/learn;app;learn;render 3\n')
+    assert collapsed(profiles, route='/missing') == ''
+
+    document = speedscope(profiles, interval=0.01, route='/learn')
+    assert [frame['name'] for frame in document['shared']['frames']] == ['app', 'learn', 'render']
+    [profile] = document['profiles']
+    assert profile['name'] == '/learn' and profile['type'] == 'sampled' and profile['unit'] == 'seconds'
+    assert profile['samples'] == [[0, 1], [0, 1, 2]] and profile['weights'] == [0.01, 0.03]
+    assert round(profile['endValue'], 6) == 0.04
+
+
+if __name__ == "__main__":
+    tests = [test_samples_stacks_per_route, test_workers_share_settings_and_samples, test_exports]
+    for test in tests:
+        test()
+        print(f"   ✓ {test.__name__}")
+    print("✓ All profiler tests passed!")
+    sys.exit(0)
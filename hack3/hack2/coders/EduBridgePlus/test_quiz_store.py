@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Test script to verify quiz answer keys stay on the server and grade submissions
+"""
+import sys
+
+from utils.content_store import get_content_store
+from utils.quiz_store import QuizSessionStore, grade
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_register_packs_answer_key():
+    store = QuizSessionStore()
+    questions = get_content_store().quizzes['climate']
+    quiz_id = store.register(questions, 'Climate Change', 'user_1')
+    key = store.get(quiz_id)
+    assert key.topic == 'Climate Change' and key.owner == 'user_1'
+    assert list(key.answers) == [question.correct for question in questions]
+    assert len(quiz_id) == 12 and store.register(questions, 'Climate Change', 'user_1') != quiz_id
+
+
+def test_grade():
+    assert grade(b'\x01\x02\x00', [1, 2, 0]) == 3
+    assert grade(b'\x01\x02\x00', [1, 0, 0]) == 2
+    # Wrong types never match, even when they compare equal
+    assert grade(b'\x01\x02\x00', [True, '2', 0.0]) == 0
+    assert grade(b'\x01\x02\x00', [1]) == 1
+
+
+def test_keys_expire_and_are_bounded():
+    clock = FakeClock()
+    store = QuizSessionStore(maxsize=2, ttl=60, clock=clock)
+    questions = get_content_store().quizzes['default']
+    first = store.register(questions, 'a', 'user_1')
+    clock.now = 61
+    assert store.get(first) is None
+    ids = [store.register(questions, topic, 'user_1') for topic in 'bcd']
+    assert store.get(ids[0]) is None and store.get(ids[2]).topic == 'd'
+    assert store.stats()['size'] == 2
+
+
+def test_key_is_used_once():
+    store = QuizSessionStore()
+    quiz_id = store.register(get_content_store().quizzes['default'], 'a', 'user_1')
+    assert store.pop(quiz_id).topic == 'a'
+    assert store.pop(quiz_id) is None and store.get(quiz_id) is None
+
+
+if __name__ == "__main__":
+    tests = [test_register_packs_answer_key, test_grade, test_keys_expire_and_are_bounded, test_key_is_used_once]
+    for test in tests:
+        test()
+        print(f"   ✓ {test.__name__}")
+    print("✓ All quiz store tests passed!")
+    sys.exit(0)
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the app's routes end to end through the Flask test client
+"""
+import atexit
+import logging
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+# The app configures itself at import; point it at throwaway storage first
+DATA_DIR = tempfile.mkdtemp()
+atexit.register(shutil.rmtree, DATA_DIR, ignore_errors=True)
+os.environ.update(DATABASE_URL=f"sqlite:///{os.path.join(DATA_DIR, 'test.db')}",
+                  EDUBRIDGE_SESSION_PATH=os.path.join(DATA_DIR, 'sessions.db'),
+                  EDUBRIDGE_WRITE_BEHIND='0',
+                  EDUBRIDGE_PASSWORD_HASH='pbkdf2:sha256:1000')
+
+logging.disable(logging.CRITICAL)
+from app import (TOPIC_VIEWED, ActivityEvent, AppliedWriteBatch, CommunityPost, User, UserProgress, app,  # noqa: E402
+                 db, feed_broker, identity_cache, load_progress_snapshot, progress_cache, prune_applied_batches,
+                 quiz_store)
+
+_users = iter(range(1, 1_000_000))
+
+
+def signed_in_client(username=None):
+    """A test client logged in as username, or as a newly registered user"""
+    client = app.test_client()
+    if username is None:
+        username = f'student{next(_users)}'
+        client.post('/register', data={'username': username, 'email': f'{username}@example.com',
+                                       'password': 'secret', 'confirm_password': 'secret'})
+    assert client.post('/login', data={'username': username, 'password': 'secret'}).status_code == 302
+    client.username = username
+    return client
+
+
+def progress_key(client):
+    with app.app_context():
+        return f"user_{User.query.filter_by(username=client.username).one().id}"
+
+
+def progress_of(client):
+    """The client's user's progress as stored in the database (also refreshes the progress cache)"""
+    key = progress_key(client)
+    with app.app_context():
+        return load_progress_snapshot(key)
+
+
+def learn(client, topic):
+    assert client.get('/learn', query_string={'topic': topic}).status_code == 200
+
+
+def learn_quiz_id(client, topic):
+    page = client.get('/learn', query_string={'topic': topic}).get_data(as_text=True)
+    return re.search(r'quiz_id: "([^"]+)"', page).group(1)
+
+
+def test_quiz_is_graded_once():
+    client = signed_in_client()
+    quiz_id = learn_quiz_id(client, 'Climate Change')
+    answers = list(quiz_store.get(quiz_id).answers)
+
+    response = client.post('/submit_quiz', json={'quiz_id': quiz_id, 'answers': answers})
+    assert response.status_code == 200 and response.get_json()['score'] == len(answers)
+    replay = client.post('/submit_quiz', json={'quiz_id': quiz_id, 'answers': answers})
+    assert replay.status_code == 410
+    progress = progress_of(client)
+    assert progress['quizzes_completed'] == 1 and progress['total_score'] == len(answers)
+
+    # A malformed submission does not use the quiz up
+    quiz_id = learn_quiz_id(client, 'Climate Change')
+    assert client.post('/submit_quiz', json={'quiz_id': quiz_id, 'answers': [0]}).status_code == 400
+    assert client.post('/submit_quiz', json={'quiz_id': quiz_id, 'answers': answers}).status_code == 200
+
+    # Another user cannot submit someone else's quiz
+    quiz_id = learn_quiz_id(client, 'Climate Change')
+    assert signed_in_client().post('/submit_quiz', json={'quiz_id': quiz_id, 'answers': answers}).status_code == 410
+
+
+def test_feed_stream_frees_its_slot_unread():
+    client = app.test_client()
+    before = feed_broker.stats()['subscribers']
+    for _ in range(5):
+        response = client.head('/api/posts/stream')
+        assert response.status_code == 200
+        response.close()
+    response = client.get('/api/posts/stream')
+    assert feed_broker.stats()['subscribers'] == before + 1
+    response.close()  # disconnects before reading a single event
+    assert feed_broker.stats()['subscribers'] == before
+
+
+def test_applied_batch_ids_are_pruned():
+    old = datetime.utcnow() - timedelta(seconds=app.config['WRITE_BEHIND_APPLIED_RETENTION'] + 60)
+    with app.app_context():
+        db.session.add_all([AppliedWriteBatch(id='old-batch', applied_at=old), AppliedWriteBatch(id='new-batch')])
+        db.session.commit()
+    assert prune_applied_batches() >= 1
+    with app.app_context():
+        assert db.session.get(AppliedWriteBatch, 'old-batch') is None
+        assert db.session.get(AppliedWriteBatch, 'new-batch') is not None
+
+
+def statements_run(action):
+    """SQL statements executed while action() runs"""
+    with app.app_context():
+        engine = db.engine
+    statements = []
+
+    def capture(connection, cursor, statement, *args):
+        statements.append(statement)
+
+    db.event.listen(engine, 'before_cursor_execute', capture)
+    try:
+        action()
+    finally:
+        db.event.remove(engine, 'before_cursor_execute', capture)
+    return statements
+
+
+def test_progress_writes_increment_only_changed_fields():
+    client = signed_in_client()
+    learn(client, 'Water Pollution')
+    key = progress_key(client)
+    # Another worker writes meanwhile; this worker's cached snapshot does not see it
+    with app.app_context():
+        db.session.execute(db.update(UserProgress).filter_by(session_id=key).values(topics_learned=5, total_score=7))
+        db.session.commit()
+
+    statements = statements_run(lambda: learn(client, 'Climate Change'))
+    updates = [statement for statement in statements if statement.startswith('UPDATE user_progress')]
+    assert updates and 'topics_learned=(coalesce(user_progress.topics_learned' in updates[0]
+    assert all('total_score' not in statement for statement in updates)
+    progress = progress_of(client)
+    assert progress['topics_learned'] == 6 and progress['total_score'] == 7
+
+
+def test_progress_cache_is_refreshed_after_a_write():
+    client = signed_in_client()
+    learn(client, 'Renewable Energy')
+    key = progress_key(client)
+    assert progress_cache.get(key)['topics_learned'] == 1
+
+    quiz_id = learn_quiz_id(client, 'Renewable Energy')
+    answers = list(quiz_store.get(quiz_id).answers)
+    client.post('/submit_quiz', json={'quiz_id': quiz_id, 'answers': answers})
+    cached = progress_cache.get(key)
+    assert cached['quizzes_completed'] == 1 and cached['total_score'] == len(answers)
+    stored = progress_of(client)
+    assert (stored['quizzes_completed'], stored['total_score']) == (1, len(answers))
+
+
+def test_concurrent_progress_writes_add_up():
+    username = signed_in_client().username
+    clients = [signed_in_client(username) for _ in range(8)]
+    ready = threading.Barrier(len(clients))
+
+    def view(client, index):
+        ready.wait()
+        learn(client, f'Topic {index}')
+
+    threads = [threading.Thread(target=view, args=(client, index)) for index, client in enumerate(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert progress_of(clients[0])['topics_learned'] == 8
+
+
+def test_repeat_topic_views_count_once():
+    client = signed_in_client()
+    key = progress_key(client)
+    learn(client, 'Ocean Acidification')
+    repeats = statements_run(lambda: (
+        learn(client, 'ocean acidification '),
+        client.post('/learn', data={'topic': 'Ocean Acidification', 'mode': 'basic'}),
+    ))
+    assert not [statement for statement in repeats if statement.startswith(('INSERT', 'UPDATE', 'DELETE'))]
+    with app.app_context():
+        views = ActivityEvent.query.filter_by(actor=key, kind=TOPIC_VIEWED).count()
+    assert views == 1 and progress_of(client)['topics_learned'] == 1
+
+    learn(client, 'Water Conservation')
+    assert progress_of(client)['topics_learned'] == 2
+
+
+def test_identity_cache_is_invalidated():
+    client = signed_in_client()
+    username = client.username
+    assert client.get('/').status_code == 200
+    user_id = int(progress_key(client)[len('user_'):])
+    assert user_id in identity_cache
+    assert not [statement for statement in statements_run(lambda: client.get('/')) if 'FROM user ' in statement]
+
+    # Password change: dropped when the transaction commits, not when it flushes
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        user.set_password('changed')
+        db.session.flush()
+        assert user_id in identity_cache
+        db.session.commit()
+        new_hash = user.password_hash
+    assert user_id not in identity_cache
+    client.get('/')
+    assert identity_cache.get(user_id)['password_hash'] == new_hash
+
+    # A rolled back change leaves the cache alone
+    with app.app_context():
+        db.session.get(User, user_id).email = 'someone@example.com'
+        db.session.flush()
+        db.session.rollback()
+    assert user_id in identity_cache
+
+    client.get('/logout')
+    assert user_id not in identity_cache
+
+    # Deletion: the next request no longer finds the user
+    client = app.test_client()
+    assert client.post('/login', data={'username': username, 'password': 'changed'}).status_code == 302
+    assert client.get('/').status_code == 200 and user_id in identity_cache
+    with app.app_context():
+        db.session.delete(db.session.get(User, user_id))
+        db.session.commit()
+    assert user_id not in identity_cache
+    assert client.get('/').status_code == 302
+
+
+def test_community_page_revalidates_on_new_posts():
+    client = signed_in_client()
+    page = client.get('/community')
+    assert page.status_code == 200
+    assert {'private', 'no-cache'} <= set(page.headers['Cache-Control'].replace(' ', '').split(','))
+    etag = page.headers['ETag']
+    assert client.get('/community', headers={'If-None-Match': etag}).status_code == 304
+
+    # One post deleted and another added outside the counters: the totals are unchanged
+    with app.app_context():
+        db.session.delete(db.session.execute(db.select(CommunityPost).limit(1)).scalar_one())
+        db.session.add(CommunityPost(username='Composter', action='Started a worm bin'))
+        db.session.commit()
+    page = client.get('/community', headers={'If-None-Match': etag})
+    assert page.status_code == 200 and 'Started a worm bin' in page.get_data(as_text=True)
+
+
+if __name__ == "__main__":
+    tests = [test_quiz_is_graded_once, test_feed_stream_frees_its_slot_unread, test_applied_batch_ids_are_pruned,
+             test_progress_writes_increment_only_changed_fields, test_progress_cache_is_refreshed_after_a_write,
+             test_concurrent_progress_writes_add_up, test_repeat_topic_views_count_once,
+             test_identity_cache_is_invalidated, test_community_page_revalidates_on_new_posts]
+    for test in tests:
+        test()
+        print(f"   ✓ {test.__name__}")
+    print("✓ All route tests passed!")
+    sys.exit(0)
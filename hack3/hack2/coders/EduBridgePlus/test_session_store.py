@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Test script to verify server-side sessions store compact records and send only an id
+"""
+import sys
+import tempfile
+import time
+
+from flask import Flask, session
+
+from utils.session_store import (ServerSideSessionInterface, SessionBackend, create_session_backend,
+                                 decode_session, encode_session)
+
+
+class CountingBackend:
+    """Wraps a backend and counts loads"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.loads = 0
+
+    def load(self, key):
+        self.loads += 1
+        return self.backend.load(key)
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+
+def make_app(backend):
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    app.session_interface = ServerSideSessionInterface(backend)
+
+    @app.route('/set/<value>')
+    def set_value(value):
+        session['value'] = value
+        session['badges'] = ['eco_starter'] * 50
+        return 'ok'
+
+    @app.route('/get')
+    def get_value():
+        return session.get('value', 'missing')
+
+    @app.route('/static-page')
+    def static_page():
+        return 'no session used'
+
+    @app.route('/rotate')
+    def rotate():
+        session.regenerate()
+        return 'ok'
+
+    @app.route('/clear')
+    def clear():
+        session.clear()
+        return 'ok'
+
+    return app
+
+
+def test_compact_format_round_trips():
+    small = {'_user_id': '1', '_fresh': True}
+    assert encode_session(small)[:1] == b'j'
+    large = {'badges': ['climate_champion'] * 100, 'flashes': [('info', 'hi')]}
+    record = encode_session(large)
+    assert record[:1] == b'z' and len(record) < 200
+    assert decode_session(record) == large
+
+
+def test_backends_store_expire_and_purge():
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, path in (('sqlite', f'{tmp}/sessions.db'), ('filesystem', f'{tmp}/sessions')):
+            backend = create_session_backend(name, path=path)
+            backend.save('live', b'jdata', time.time() + 60)
+            backend.save('old', b'jdata', time.time() - 1)
+            record, expires_at = backend.load('live')
+            assert record == b'jdata' and expires_at > time.time()
+            assert backend.load('old') is None and backend.load('missing') is None
+            assert backend.purge() == 1
+            backend.delete('live')
+            assert backend.load('live') is None
+
+
+def test_cookie_holds_only_the_id_and_loads_lazily():
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = CountingBackend(create_session_backend('sqlite', path=f'{tmp}/sessions.db'))
+        client = make_app(backend).test_client()
+        response = client.get('/set/hello')
+        sid = client.get_cookie('session').value
+        assert len(sid) == 43 and 'hello' not in response.headers['Set-Cookie']
+        assert client.get('/get').get_data(as_text=True) == 'hello'
+        loads = backend.loads
+        # A request that never touches the session never reads the store, and is not re-saved
+        response = client.get('/static-page')
+        assert backend.loads == loads and 'Set-Cookie' not in response.headers
+
+
+def test_regenerate_and_clear():
+    with tempfile.TemporaryDirectory() as tmp:
+        client = make_app(create_session_backend('filesystem', path=f'{tmp}/sessions')).test_client()
+        client.get('/set/hello')
+        old = client.get_cookie('session').value
+        client.get('/rotate')
+        new = client.get_cookie('session').value
+        assert new != old and client.get('/get').get_data(as_text=True) == 'hello'
+        stale = make_app(create_session_backend('filesystem', path=f'{tmp}/sessions')).test_client()
+        stale.set_cookie('session', old)
+        assert stale.get('/get').get_data(as_text=True) == 'missing'
+        client.get('/clear')
+        assert client.get_cookie('session') is None
+
+
+def test_unknown_backend():
+    try:
+        create_session_backend('memcached', path='x')
+        assert False, 'expected ValueError'
+    except ValueError:
+        pass
+    try:
+        SessionBackend()
+        assert False, 'expected TypeError: backends must implement load, save, delete and purge'
+    except TypeError:
+        pass
+
+
+if __name__ == "__main__":
+    tests = [test_compact_format_round_trips, test_backends_store_expire_and_purge,
+             test_cookie_holds_only_the_id_and_loads_lazily, test_regenerate_and_clear, test_unknown_backend]
+    for test in tests:
+        test()
+        print(f"   ✓ {test.__name__}")
+    print("✓ All session store tests passed!")
+    sys.exit(0)
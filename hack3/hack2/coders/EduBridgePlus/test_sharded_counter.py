@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the sharded like buffer aggregates, flushes and never counts backwards
+"""
+import sys
+import threading
+
+from utils.sharded_counter import ShardedCounter
+
+
+class FakePosts:
+    def __init__(self, likes):
+        self.likes = dict(likes)
+        self.flushes = []
+        self.fail = False
+
+    def load(self, post_id):
+        return lambda: self.likes.get(post_id)
+
+    def flush(self, deltas):
+        if self.fail:
+            raise RuntimeError("database is locked")
+        self.flushes.append(dict(deltas))
+        for post_id, delta in deltas.items():
+            if post_id in self.likes:
+                self.likes[post_id] += delta
+        return {post_id: self.likes[post_id] for post_id in deltas if post_id in self.likes}
+
+
+def test_aggregates_concurrent_increments_into_one_write():
+    posts = FakePosts({1: 10})
+    counter = ShardedCounter(posts.flush, shards=4)
+    threads = [threading.Thread(target=lambda: [counter.add(1, posts.load(1)) for _ in range(100)])
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counter.value(1) == 810
+    assert counter.pending(1) == 800
+    assert counter.flush() == 800
+    assert posts.flushes == [{1: 800}]
+    assert posts.likes[1] == 810 and counter.pending(1) == 0
+
+
+def test_counts_include_other_writers_after_flush():
+    posts = FakePosts({1: 5})
+    counter = ShardedCounter(posts.flush)
+    assert counter.add(1, posts.load(1)) == 6
+    posts.likes[1] += 3  # likes written by another worker
+    counter.flush()
+    assert counter.add(1, posts.load(1)) == 10
+
+
+def test_failed_flush_is_retried_without_losing_likes():
+    posts = FakePosts({1: 0})
+    counter = ShardedCounter(posts.flush)
+    counter.add(1, posts.load(1))
+    posts.fail = True
+    assert counter.flush() == 0
+    assert counter.value(1) == 1
+    posts.fail = False
+    assert counter.flush() == 1
+    assert posts.likes[1] == 1
+
+
+def test_missing_post():
+    posts = FakePosts({})
+    counter = ShardedCounter(posts.flush)
+    assert counter.add(99, posts.load(99)) is None
+    assert counter.flush() == 0
+
+
+if __name__ == "__main__":
+    tests = [test_aggregates_concurrent_increments_into_one_write, test_counts_include_other_writers_after_flush,
+             test_failed_flush_is_retried_without_losing_likes, test_missing_post]
+    for test in tests:
+        test()
+        print(f"   ✓ {test.__name__}")
+    print("✓ All sharded counter tests passed!")
+    sys.exit(0)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test script to verify topic classification is shared by all generators
+"""
+import sys
+
+from utils.ai_helper import get_youtube_links, generate_quiz, get_action_plan, get_ai_response
+from utils.content_store import build_store, get_content_store
+from utils.topic_classifier import TopicClassifier, classify_topic, normalize_topic
+
+
+def test_normalize_topic():
+    assert normalize_topic("  Climate_Change ") == "climate change"
+    assert normalize_topic("WATER   pollution") == "water pollution"
+
+
+def test_categories_and_sdgs():
+    expected = {
+        "Climate Change": ("climate", 13),
+        "Water Pollution": ("water", 6),
+        "Ocean Conservation": ("ocean", 6),
+        "Solar Power": ("energy", 13),
+        "Education": ("education", 4),
+        "Recycling": ("recycling", None),
+        "Sustainability": ("sustainability", 13),
+        "Sustainability in schools": ("education", 4),
+        "Sea level rise": ("ocean", 6),
+        "North Sea fisheries": ("ocean", 6),
+        "Research methods": ("default", None),
+        "Green Technology": ("default", None),
+    }
+    for topic, (category, sdg) in expected.items():
+        result = classify_topic(topic)
+        assert (result.category, result.sdg) == (category, sdg), topic
+
+
+def test_priority_is_consistent():
+    # Used to pick water videos but the SDG 4 explanation
+    result = classify_topic("Learning about water")
+    assert result.category == "water"
+    assert "SDG 6" in get_ai_response("Learning about water", classification=result)
+    assert get_youtube_links("Learning about water", result) == get_youtube_links("Water")
+    assert generate_quiz("Learning about water", result) == generate_quiz("Water")
+
+
+def test_parent_fallback():
+    result = classify_topic("Marine life")
+    assert result.lineage == ("ocean", "water", "default")
+    assert get_youtube_links("Marine life", result) == get_youtube_links("Water")
+    assert "beach cleanup" in get_action_plan("Marine life", result)
+
+
+def test_sustainability_is_explained_as_climate_action():
+    result = classify_topic("Sustainability")
+    assert result.lineage == ("sustainability", "default") and result.sdg_field == "sdg_13_topics"
+    assert "SDG 13" in get_ai_response("Sustainability", classification=result)
+    assert generate_quiz("Sustainability", result) == generate_quiz("Green Technology")
+
+    # Categories added by a content pack still win over the general one
+    store = build_store({'categories': [{'name': 'forests', 'sdg': 15, 'keywords': ['forest']}]}, get_content_store())
+    assert [category.name for category in store.categories][-2:] == ['forests', 'sustainability']
+    assert TopicClassifier(store.categories).classify("Forest sustainability").category == "forests"
+
+
+if __name__ == "__main__":
+    tests = [test_normalize_topic, test_categories_and_sdgs, test_priority_is_consistent, test_parent_fallback,
+             test_sustainability_is_explained_as_climate_action]
+    for test in tests:
+        test()
+        print(f"   ✓ {test.__name__}")
+    print("✓ All topic classifier tests passed!")
+    sys.exit(0)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test script to verify write-behind batching, coalescing and journal replay
+"""
+import os
+import sys
+import tempfile
+
+from utils.write_behind import WriteBehindQueue
+
+
+class FakeDatabase:
+    """Records applied batches and skips ones it has seen, like flush_write_batch"""
+
+    def __init__(self):
+        self.applied = set()
+        self.progress = {}
+        self.attempts = []
+        self.commits = 0
+
+    def flush(self, batch):
+        if batch.id in self.applied:
+            return
+        self.applied.add(batch.id)
+        for key, deltas in batch.deltas.items():
+            row = self.progress.setdefault(key, {})
+            for field, delta in deltas.items():
+                row[field] = row.get(field, 0) + delta
+        self.attempts.extend(batch.rows.get('quiz_attempt', []))
+        self.commits += 1
+
+
+def test_coalesces_into_one_transaction():
+    database = FakeDatabase()
+    queue = WriteBehindQueue(database.flush, interval=60)
+    for _ in range(10):
+        queue.add_progress('user_1', deltas={'quizzes_completed': 1, 'total_score': 2})
+        queue.add_row('quiz_attempt', {'session_id': 'user_1', 'score': 2})
+    queue.add_row('quiz_attempt', {'session_id': 'user_2', 'score': 3})
+    assert queue.pending_for('user_1')[0] == {'quizzes_completed': 10, 'total_score': 20}
+    assert len(queue.pending_rows('quiz_attempt', session_id='user_1')) == 10
+    assert queue.read_through('user_2', lambda: None, lambda key: queue.pending_rows('quiz_attempt', session_id=key)) \
+        == (None, [{'session_id': 'user_2', 'score': 3}])
+    queue.flush()
+    assert database.commits == 1
+    assert queue.pending_rows('quiz_attempt') == []
+    assert database.progress['user_1'] == {'quizzes_completed': 10, 'total_score': 20}
+    assert len(database.attempts) == 11
+    queue.close()
+
+
+def test_size_threshold_triggers_flush():
+    database = FakeDatabase()
+    queue = WriteBehindQueue(database.flush, interval=60, max_pending=5)
+    for _ in range(5):
+        queue.add_progress('user_1', deltas={'topics_learned': 1})
+    # Flushing happens on the background thread
+    for _ in range(50):
+        if database.commits:
+            break
+        queue._stopped.wait(0.02)
+    assert database.progress['user_1'] == {'topics_learned': 5}
+    queue.close()
+
+
+def test_synchronous_mode_writes_through():
+    database = FakeDatabase()
+    queue = WriteBehindQueue(database.flush, synchronous=True)
+    queue.add_progress('user_1', deltas={'topics_learned': 1})
+    queue.add_row('quiz_attempt', {'session_id': 'user_1', 'score': 1})
+    assert database.commits == 2
+    assert queue.pending_for('user_1') == ({}, {})
+    assert queue.read_through('user_1', lambda: database.progress['user_1']) == ({'topics_learned': 1}, ({}, {}))
+    queue.close()
+
+
+def test_journal_replay_after_crash():
+    database = FakeDatabase()
+    with tempfile.TemporaryDirectory() as journal_dir:
+        crashed = WriteBehindQueue(database.flush, interval=60, journal_dir=journal_dir)
+        crashed.add_progress('user_1', deltas={'topics_learned': 3})
+        crashed.add_row('quiz_attempt', {'session_id': 'user_1', 'score': 3})
+        crashed._stopped.set()
+        crashed._journal.close()  # the process dies without flushing
+
+        restarted = WriteBehindQueue(database.flush, interval=60, journal_dir=journal_dir)
+        assert restarted.replay_journal() == 1
+        assert database.progress['user_1'] == {'topics_learned': 3}
+        assert len(database.attempts) == 1
+        assert restarted.replay_journal() == 0
+        restarted.close()
+        assert os.listdir(journal_dir) == []
+
+
+def test_oldest_batch_time_tracks_unflushed_batches():
+    database = FakeDatabase()
+    failing = [True]
+
+    def flush(batch):
+        if failing[0]:
+            raise RuntimeError('database down')
+        database.flush(batch)
+
+    with tempfile.TemporaryDirectory() as journal_dir:
+        queue = WriteBehindQueue(flush, interval=60, journal_dir=journal_dir)
+        assert queue.oldest_batch_time() is None
+        queue.add_progress('user_1', deltas={'topics_learned': 1})
+        queue.flush()  # fails: the batch file stays for a retry
+        assert queue.oldest_batch_time() is not None
+        failing[0] = False
+        queue.flush()
+        assert queue.oldest_batch_time() is None and database.commits == 1
+        queue.close()
+    assert WriteBehindQueue(database.flush, synchronous=True).oldest_batch_time() is None
+
+
+if __name__ == "__main__":
+    tests = [test_coalesces_into_one_transaction, test_size_threshold_triggers_flush,
+             test_synchronous_mode_writes_through, test_journal_replay_after_crash,
+             test_oldest_batch_time_tracks_unflushed_batches]
+    for test in tests:
+        test()
+        print(f"   ✓ {test.__name__}")
+    print("✓ All write-behind tests passed!")
+    sys.exit(0)
@@ -0,0 +1,189 @@
+"""
+Activity event log for EduBridge+
+Learning activity is recorded as an append-only stream of events (a topic
+viewed, a quiz submitted, a post created or liked). Progress counters, quiz
+attempts, analytics and leaderboards are projections of that stream: each
+folds a batch of new events into its own tables in the transaction that
+appends them, and any of them can be reset and rebuilt by replaying the log
+from the start. A new report is a new projection, not a new column on a
+table every request writes to.
+"""
+
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+TOPIC_VIEWED = 'topic_viewed'            # actor viewed subject (a topic); data: sdg (progress field or absent)
+QUIZ_SUBMITTED = 'quiz_submitted'        # actor's quiz on subject; data: score, total, percentage, passed
+POST_CREATED = 'post_created'            # actor (a username) posted subject (a post id)
+POST_LIKED = 'post_liked'                # subject (a post id) by data author got data count likes
+PROGRESS_IMPORTED = 'progress_imported'  # actor's counters from before the log; data: counter -> value
+
+ActivityEvent = Dict[str, Any]  # kind, actor, subject, data, created_at (ISO string); id once stored
+
+
+def activity_event(kind: str, actor: Optional[str], subject: Any = None, when: Optional[datetime] = None,
+                   **data) -> ActivityEvent:
+    """A JSON-serializable event, ready to queue for the log"""
+    return {'kind': kind, 'actor': actor, 'subject': None if subject is None else str(subject),
+            'data': data, 'created_at': (when or datetime.utcnow()).isoformat()}
+
+
+class ProgressChange:
+    """Net effect of events on one progress row: increments, and counters set outright"""
+    __slots__ = ('deltas', 'values')
+
+    def __init__(self):
+        self.deltas: Dict[str, int] = defaultdict(int)
+        self.values: Dict[str, int] = {}
+
+    def add(self, field: str, amount: int) -> None:
+        if field in self.values:
+            self.values[field] += amount
+        else:
+            self.deltas[field] += amount
+
+    def set(self, field: str, value: int) -> None:
+        self.deltas.pop(field, None)
+        self.values[field] = value
+
+    def apply_to(self, progress: Dict[str, Any]) -> None:
+        for field, value in self.values.items():
+            progress[field] = value
+        for field, delta in self.deltas.items():
+            progress[field] = (progress.get(field) or 0) + delta
+
+
+def fold_progress(events: Iterable[ActivityEvent]) -> Dict[str, ProgressChange]:
+    """Progress changes per actor, for events in log order"""
+    changes = defaultdict(ProgressChange)
+    for event in events:
+        kind, data = event['kind'], event['data']
+        if kind == TOPIC_VIEWED:
+            change = changes[event['actor']]
+            change.add('topics_learned', 1)
+            if data.get('sdg'):
+                change.add(data['sdg'], 1)
+        elif kind == QUIZ_SUBMITTED:
+            change = changes[event['actor']]
+            change.add('quizzes_completed', 1)
+            change.add('total_score', data['score'])
+            if data['passed']:
+                change.add('quiz_streak', 1)
+            else:
+                change.set('quiz_streak', 0)
+        elif kind == PROGRESS_IMPORTED:
+            change = changes[event['actor']]
+            for field, value in data.items():
+                change.set(field, value)
+    return dict(changes)
+
+
+def fold_totals(events: Iterable[ActivityEvent], imported: Iterable[str] = ()) -> Dict[str, int]:
+    """Platform-wide counts: posts, likes, quiz attempts and topic views per SDG progress field.
+    The imported progress counters are added too (the SDG fields, whose views were not logged)."""
+    totals = defaultdict(int)
+    imported = tuple(imported)
+    for event in events:
+        kind, data = event['kind'], event['data']
+        if kind == TOPIC_VIEWED and data.get('sdg'):
+            totals[data['sdg']] += 1
+        elif kind == PROGRESS_IMPORTED:
+            for field in imported:
+                totals[field] += data.get(field, 0)
+        elif kind == QUIZ_SUBMITTED:
+            totals['quiz_attempts'] += 1
+        elif kind == POST_CREATED:
+            totals['posts'] += 1
+        elif kind == POST_LIKED:
+            totals['likes'] += data['count']
+    return dict(totals)
+
+
+def fold_topic_attempts(events: Iterable[ActivityEvent]) -> Dict[str, Tuple[int, float]]:
+    """Quiz attempt count and percentage sum per topic"""
+    topics = defaultdict(lambda: [0, 0.0])
+    for event in events:
+        if event['kind'] == QUIZ_SUBMITTED:
+            topics[event['subject']][0] += 1
+            topics[event['subject']][1] += event['data']['percentage']
+    return {topic: (count, percentage_sum) for topic, (count, percentage_sum) in topics.items()}
+
+
+def fold_rankings(events: Iterable[ActivityEvent]) -> List[Tuple[str, str, int, int, datetime]]:
+    """(board, member, score, events, when) leaderboard changes, one per member per board per day"""
+    rankings = {}
+    for event in events:
+        kind, data = event['kind'], event['data']
+        if kind == QUIZ_SUBMITTED:
+            board, member, score, count = 'learners', event['actor'], data['score'], 1
+        elif kind == POST_CREATED:
+            board, member, score, count = 'contributors', event['actor'], 0, 1
+        elif kind == POST_LIKED:
+            board, member, score, count = 'contributors', data['author'], data['count'], 0
+        else:
+            continue
+        when = datetime.fromisoformat(event['created_at'])
+        # Leaderboard periods are weeks and months, so a day's changes can be summed
+        entry = rankings.setdefault((board, member, when.date()), [0, 0, when])
+        entry[0] += score
+        entry[1] += count
+        entry[2] = max(entry[2], when)
+    return [(board, member, score, count, when)
+            for (board, member, _), (score, count, when) in rankings.items()]
+
+
+class Projection(NamedTuple):
+    """A view kept up to date from the log.
+    apply(events) folds new events in the current transaction and may return callables to run after
+    it commits; reset() empties the view before a replay."""
+    name: str
+    apply: Callable[[Sequence[ActivityEvent]], Optional[Iterable[Callable[[], Any]]]]
+    reset: Callable[[], None]
+
+
+class ActivityLog:
+    """Feeds appended or replayed events to a set of projections"""
+
+    def __init__(self, projections: Iterable[Projection]):
+        self.projections: Dict[str, Projection] = {}
+        for projection in projections:
+            if projection.name in self.projections:
+                raise ValueError(f"Duplicate projection '{projection.name}'")
+            self.projections[projection.name] = projection
+
+    def _select(self, names: Optional[Iterable[str]]) -> List[Projection]:
+        if not names:
+            return list(self.projections.values())
+        unknown = set(names) - set(self.projections)
+        if unknown:
+            raise ValueError(f"Unknown projection(s) {', '.join(sorted(unknown))}. "
+                             f"Choose from: {', '.join(self.projections)}")
+        return [self.projections[name] for name in names]
+
+    def project(self, events: Sequence[ActivityEvent], names: Optional[Iterable[str]] = None
+                ) -> List[Callable[[], Any]]:
+        """Fold events into the projections; returns the callables to run once the transaction commits"""
+        after_commit = []
+        if events:
+            for projection in self._select(names):
+                after_commit.extend(projection.apply(events) or ())
+        return after_commit
+
+    def replay(self, read_page: Callable[[int, int], Sequence[ActivityEvent]],
+               names: Optional[Iterable[str]] = None, page_size: int = 1000) -> int:
+        """Reset projections and fold the whole log into them again, page by page in id order.
+        read_page(after_id, limit) returns stored events with an id. Returns the number replayed."""
+        projections = self._select(names)
+        for projection in projections:
+            projection.reset()
+        names = [projection.name for projection in projections]
+        replayed, after_id = 0, 0
+        while True:
+            page = read_page(after_id, page_size)
+            if not page:
+                return replayed
+            # Post-commit work targets live state that is reloaded after a replay
+            self.project(page, names)
+            replayed += len(page)
+            after_id = page[-1]['id']
@@ -4,185 +4,33 @@ This module contains AI-powered functions to assist with educational tasks focus
 """
 
 import random
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 
-def get_youtube_links(topic: str) -> List[Dict[str, str]]:
+from utils.content_store import QuizQuestion, VideoLink, get_content_store
+from utils.topic_classifier import TopicClassification, classify_topic
+
+def get_youtube_links(topic: str, classification: Optional[TopicClassification] = None) -> Tuple[VideoLink, ...]:
     """
     Get relevant YouTube video links for a given sustainability topic
-    Returns a list of dictionaries with title and url
+    Returns a shared, read-only tuple of videos with title and url
     """
-    topic_lower = topic.lower()
-    
-    # Predefined video collections for different topics
-    video_collections = {
-        'climate': [
-            {'title': 'Climate Change Explained in 5 Minutes', 'url': 'https://www.youtube.com/watch?v=G4H1N_yXBiA'},
-            {'title': 'The Science of Climate Change', 'url': 'https://www.youtube.com/watch?v=EtW2rrLHs08'},
-            {'title': 'How to Fight Climate Change', 'url': 'https://www.youtube.com/watch?v=0kL2hJ3n7sk'}
-        ],
-        'water': [
-            {'title': 'Water Pollution: Causes and Solutions', 'url': 'https://www.youtube.com/watch?v=Om42Lppkd9w'},
-            {'title': 'Ocean Plastic Pollution Explained', 'url': 'https://www.youtube.com/watch?v=HQTUWK7CM-Y'},
-            {'title': 'How to Save Water at Home', 'url': 'https://www.youtube.com/watch?v=U6WqJ2Qj4cQ'}
-        ],
-        'energy': [
-            {'title': 'Renewable Energy Explained', 'url': 'https://www.youtube.com/watch?v=1kUE0BZtTRc'},
-            {'title': 'Solar Power: How It Works', 'url': 'https://www.youtube.com/watch?v=xKxrkht7CpY'},
-            {'title': 'Wind Energy: The Future of Power', 'url': 'https://www.youtube.com/watch?v=QpViwKIwskE'}
-        ],
-        'education': [
-            {'title': 'The Future of Education', 'url': 'https://www.youtube.com/watch?v=GEmuEWjHr5c'},
-            {'title': 'Sustainable Development Goals Explained', 'url': 'https://www.youtube.com/watch?v=0XTBYMfZyrM'},
-            {'title': 'Environmental Education for Kids', 'url': 'https://www.youtube.com/watch?v=WfGMYdalClU'}
-        ],
-        'default': [
-            {'title': 'Sustainability: What It Means', 'url': 'https://www.youtube.com/watch?v=zx04Kl8y4dE'},
-            {'title': 'How to Live More Sustainably', 'url': 'https://www.youtube.com/watch?v=V0lQ3ljjl40'},
-            {'title': 'Environmental Protection Tips', 'url': 'https://www.youtube.com/watch?v=WmVLcj-XKnM'}
-        ]
-    }
-    
-    # Determine which collection to use based on topic
-    if any(word in topic_lower for word in ['climate', 'carbon', 'warming', 'emission']):
-        collection = 'climate'
-    elif any(word in topic_lower for word in ['water', 'ocean', 'river', 'pollution']):
-        collection = 'water'
-    elif any(word in topic_lower for word in ['energy', 'solar', 'wind', 'renewable']):
-        collection = 'energy'
-    elif any(word in topic_lower for word in ['education', 'learning', 'school']):
-        collection = 'education'
-    else:
-        collection = 'default'
-    
-    return video_collections[collection]
+    classification = classification or classify_topic(topic)
+    return classification.pick(get_content_store().videos)
 
 def get_daily_tip() -> str:
     """
     Get a random daily eco-friendly tip
     """
-    eco_tips = [
-        "💡 Turn off lights when leaving a room - it saves energy and reduces your carbon footprint!",
-        "🌱 Use a reusable water bottle instead of plastic bottles - help reduce ocean pollution!",
-        "🚶 Walk or bike for short trips - reduce emissions and stay healthy!",
-        "♻️ Separate your recyclables - make sure paper, plastic, and glass go in the right bins!",
-        "🌿 Plant a tree or start a small garden - every plant helps clean the air!",
-        "💧 Take shorter showers - save water and energy used for heating!",
-        "🛍️ Bring your own shopping bags - reduce plastic waste at stores!",
-        "🌞 Use natural light during the day - open curtains instead of turning on lights!",
-        "📱 Unplug electronics when not in use - they still consume energy when plugged in!",
-        "🍎 Eat more plant-based meals - reduce your environmental impact through diet!",
-        "🚗 Carpool or use public transport - reduce traffic and emissions!",
-        "🌍 Support local businesses - reduce transportation emissions from shipping!",
-        "📚 Borrow books from libraries - reduce paper consumption and save money!",
-        "🔋 Use rechargeable batteries - reduce waste from disposable batteries!",
-        "🌊 Participate in beach cleanups - help protect marine life!"
-    ]
-    
-    return random.choice(eco_tips)
+    return random.choice(get_content_store().eco_tips)
 
-def generate_quiz(topic: str) -> List[Dict[str, Any]]:
+def generate_quiz(topic: str, classification: Optional[TopicClassification] = None) -> Tuple[QuizQuestion, ...]:
     """
     Generate a 3-question multiple choice quiz for the given topic
     """
-    topic_lower = topic.lower()
-    
-    # Predefined quiz questions for different topics
-    quiz_templates = {
-        'climate': [
-            {
-                'question': 'What is the primary cause of climate change?',
-                'options': ['Solar radiation', 'Greenhouse gas emissions', 'Ocean currents', 'Volcanic activity'],
-                'correct': 1,
-                'explanation': 'Greenhouse gas emissions from human activities are the primary cause of climate change.'
-            },
-            {
-                'question': 'Which gas is most responsible for global warming?',
-                'options': ['Oxygen', 'Nitrogen', 'Carbon Dioxide', 'Argon'],
-                'correct': 2,
-                'explanation': 'Carbon dioxide (CO2) is the most significant greenhouse gas contributing to global warming.'
-            },
-            {
-                'question': 'What is the Paris Agreement target for global temperature rise?',
-                'options': ['1.5°C', '2°C', '3°C', '4°C'],
-                'correct': 1,
-                'explanation': 'The Paris Agreement aims to limit global temperature rise to well below 2°C, preferably 1.5°C.'
-            }
-        ],
-        'water': [
-            {
-                'question': 'What percentage of Earth\'s water is freshwater?',
-                'options': ['1%', '3%', '10%', '25%'],
-                'correct': 1,
-                'explanation': 'Only about 3% of Earth\'s water is freshwater, and most of it is frozen in glaciers.'
-            },
-            {
-                'question': 'What is the main cause of ocean plastic pollution?',
-                'options': ['Natural processes', 'Single-use plastics', 'Fish waste', 'Seaweed'],
-                'correct': 1,
-                'explanation': 'Single-use plastics are the main cause of ocean plastic pollution.'
-            },
-            {
-                'question': 'How many people worldwide lack access to clean water?',
-                'options': ['100 million', '500 million', '1 billion', '2 billion'],
-                'correct': 3,
-                'explanation': 'Approximately 2 billion people worldwide lack access to clean water.'
-            }
-        ],
-        'energy': [
-            {
-                'question': 'What is the most abundant renewable energy source?',
-                'options': ['Wind', 'Solar', 'Hydroelectric', 'Geothermal'],
-                'correct': 1,
-                'explanation': 'Solar energy is the most abundant renewable energy source on Earth.'
-            },
-            {
-                'question': 'What percentage of global energy comes from renewables?',
-                'options': ['10%', '20%', '30%', '50%'],
-                'correct': 1,
-                'explanation': 'About 20% of global energy comes from renewable sources.'
-            },
-            {
-                'question': 'Which renewable energy source is most efficient?',
-                'options': ['Solar panels', 'Wind turbines', 'Hydroelectric dams', 'Geothermal plants'],
-                'correct': 2,
-                'explanation': 'Hydroelectric dams are typically the most efficient renewable energy source.'
-            }
-        ],
-        'default': [
-            {
-                'question': 'What does SDG stand for?',
-                'options': ['Sustainable Development Goals', 'Social Development Group', 'Science Data Group', 'System Design Goals'],
-                'correct': 0,
-                'explanation': 'SDG stands for Sustainable Development Goals, set by the United Nations.'
-            },
-            {
-                'question': 'How many Sustainable Development Goals are there?',
-                'options': ['15', '17', '20', '25'],
-                'correct': 1,
-                'explanation': 'There are 17 Sustainable Development Goals.'
-            },
-            {
-                'question': 'What is sustainability?',
-                'options': ['Using all resources', 'Meeting present needs without compromising future', 'Growing economy only', 'Protecting environment only'],
-                'correct': 1,
-                'explanation': 'Sustainability means meeting present needs without compromising future generations\' ability to meet their needs.'
-            }
-        ]
-    }
-    
-    # Determine which quiz template to use
-    if any(word in topic_lower for word in ['climate', 'carbon', 'warming', 'emission']):
-        quiz_type = 'climate'
-    elif any(word in topic_lower for word in ['water', 'ocean', 'river', 'pollution']):
-        quiz_type = 'water'
-    elif any(word in topic_lower for word in ['energy', 'solar', 'wind', 'renewable']):
-        quiz_type = 'energy'
-    else:
-        quiz_type = 'default'
-    
-    return quiz_templates[quiz_type]
+    classification = classification or classify_topic(topic)
+    return classification.pick(get_content_store().quizzes)
 
-def get_ai_response(topic: str, mode: str = 'basic') -> str:
+def get_ai_response(topic: str, mode: str = 'basic', classification: Optional[TopicClassification] = None) -> str:
     """
     Generate AI-powered educational explanation for sustainability topics
     aligned with SDG 4 (Quality Education), SDG 6 (Clean Water), and SDG 13 (Climate Action)
@@ -192,7 +40,7 @@ def get_ai_response(topic: str, mode: str = 'basic') -> str:
     - deep: In-depth technical content
     - action: Focus on practical steps
     """
-    topic_lower = topic.lower()
+    classification = classification or classify_topic(topic)
     
     # Mode-specific content adjustments
     mode_prefixes = {
@@ -208,7 +56,7 @@ def get_ai_response(topic: str, mode: str = 'basic') -> str:
     }
     
     # SDG 4: Quality Education responses
-    if any(word in topic_lower for word in ['education', 'learning', 'school', 'student', 'teacher']):
+    if classification.sdg == 4:
         if mode == 'deep':
             return f"""
             <h3>{mode_prefixes[mode]} SDG 4: Quality Education - {topic.title()} ({mode_descriptions[mode]})</h3>
@@ -272,7 +120,7 @@ def get_ai_response(topic: str, mode: str = 'basic') -> str:
             """
     
     # SDG 6: Clean Water responses
-    elif any(word in topic_lower for word in ['water', 'pollution', 'sanitation', 'hygiene', 'ocean', 'river', 'lake']):
+    elif classification.sdg == 6:
         if mode == 'deep':
             return f"""
             <h3>{mode_prefixes[mode]} SDG 6: Clean Water and Sanitation - {topic.title()} ({mode_descriptions[mode]})</h3>
@@ -338,7 +186,7 @@ def get_ai_response(topic: str, mode: str = 'basic') -> str:
             """
     
     # SDG 13: Climate Action responses
-    elif any(word in topic_lower for word in ['climate', 'carbon', 'emission', 'global warming', 'greenhouse', 'renewable', 'energy', 'sustainability']):
+    elif classification.sdg == 13:
         if mode == 'deep':
             return f"""
             <h3>{mode_prefixes[mode]} SDG 13: Climate Action - {topic.title()} ({mode_descriptions[mode]})</h3>
@@ -473,68 +321,13 @@ def get_ai_response(topic: str, mode: str = 'basic') -> str:
             </ul>
             """
 
-def get_action_plan(topic: str) -> str:
+def get_action_plan(topic: str, classification: Optional[TopicClassification] = None) -> str:
     """
     Generate a practical action plan for the given topic
     """
-    topic_lower = topic.lower()
-    
-    # Action plans for different topics
-    action_plans = {
-        'climate': [
-            "Calculate and reduce your carbon footprint using online calculators",
-            "Switch to renewable energy sources for your home",
-            "Participate in local climate action groups and tree planting events"
-        ],
-        'water': [
-            "Install water-saving devices like low-flow showerheads",
-            "Avoid dumping oils and chemicals down drains",
-            "Support organizations working on water conservation projects"
-        ],
-        'energy': [
-            "Audit your home's energy usage and identify savings opportunities",
-            "Invest in energy-efficient appliances and LED lighting",
-            "Consider installing solar panels or supporting renewable energy programs"
-        ],
-        'education': [
-            "Volunteer to teach sustainability topics in your community",
-            "Create educational content about environmental issues",
-            "Support organizations providing education in underserved areas"
-        ],
-        'ocean': [
-            "Participate in beach cleanup events",
-            "Reduce single-use plastics in your daily life",
-            "Support marine conservation organizations"
-        ],
-        'recycling': [
-            "Set up a proper recycling system at home and workplace",
-            "Learn about local recycling programs and guidelines",
-            "Reduce waste by choosing products with minimal packaging"
-        ],
-        'default': [
-            "Research local sustainability initiatives in your area",
-            "Share your knowledge about this topic with friends and family",
-            "Look for volunteer opportunities related to environmental protection"
-        ]
-    }
-    
-    # Determine which action plan to use
-    if any(word in topic_lower for word in ['climate', 'carbon', 'warming', 'emission']):
-        plan_type = 'climate'
-    elif any(word in topic_lower for word in ['water', 'ocean', 'river', 'pollution']):
-        plan_type = 'water'
-    elif any(word in topic_lower for word in ['energy', 'solar', 'wind', 'renewable']):
-        plan_type = 'energy'
-    elif any(word in topic_lower for word in ['education', 'learning', 'school']):
-        plan_type = 'education'
-    elif any(word in topic_lower for word in ['ocean', 'marine', 'sea']):
-        plan_type = 'ocean'
-    elif any(word in topic_lower for word in ['recycling', 'waste', 'plastic']):
-        plan_type = 'recycling'
-    else:
-        plan_type = 'default'
+    classification = classification or classify_topic(topic)
     
-    actions = action_plans[plan_type]
+    actions = classification.pick(get_content_store().action_plans)
     
     return f"""
     <div class="action-plan">
@@ -0,0 +1,102 @@
+"""
+Badge rules engine for EduBridge+
+Badges are declared as data: each one is a threshold on a progress counter
+(topics learned, an SDG's topic count, the current quiz streak, ...). Rules
+are indexed by the counter they watch and sorted by threshold, so awarding
+after an increment is a binary search per changed counter, whatever the
+number of badges. Earned badges are a bitset (an int, one bit per rule in
+declaration order); they are stored by id, so rules can be added or removed.
+"""
+
+import json
+import os
+from bisect import bisect_right
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Tuple
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  'content', 'badges.json')
+
+
+class BadgeRule(NamedTuple):
+    """A badge earned once counter reaches threshold"""
+    id: str
+    name: str
+    icon: str
+    description: str
+    counter: str
+    threshold: int
+
+
+class BadgeEngine:
+    """Evaluates badge rules against progress counters"""
+
+    def __init__(self, rules: Iterable[BadgeRule]):
+        self.rules: Tuple[BadgeRule, ...] = tuple(rules)
+        self.bits: Dict[str, int] = {}
+        for index, rule in enumerate(self.rules):
+            if rule.id in self.bits:
+                raise ValueError(f"Duplicate badge id '{rule.id}'")
+            self.bits[rule.id] = 1 << index
+        # counter -> (ascending thresholds, mask of the rules up to and including each threshold)
+        self._index: Dict[str, Tuple[List[int], List[int]]] = {}
+        by_counter = defaultdict(list)
+        for rule in self.rules:
+            by_counter[rule.counter].append(rule)
+        for counter, rules in by_counter.items():
+            rules.sort(key=lambda rule: rule.threshold)
+            masks, mask = [0], 0
+            for rule in rules:
+                mask |= self.bits[rule.id]
+                masks.append(mask)
+            self._index[counter] = ([rule.threshold for rule in rules], masks)
+
+    @property
+    def counters(self) -> Tuple[str, ...]:
+        """Progress counters that at least one rule watches"""
+        return tuple(self._index)
+
+    def evaluate(self, progress: Mapping[str, int], earned: int, changed: Iterable[str]) -> int:
+        """earned plus every badge reached by the current value of the changed counters"""
+        for counter in changed:
+            entry = self._index.get(counter)
+            if entry:
+                thresholds, masks = entry
+                earned |= masks[bisect_right(thresholds, progress.get(counter, 0))]
+        return earned
+
+    def to_bits(self, badge_ids: Iterable[str]) -> int:
+        """Bitset of badge ids; ids of badges that no longer exist are ignored"""
+        bits = 0
+        for badge_id in badge_ids:
+            bits |= self.bits.get(badge_id, 0)
+        return bits
+
+    def ids(self, bits: int) -> List[str]:
+        """Badge ids set in a bitset, in declaration order"""
+        ids = []
+        while bits:
+            lowest = bits & -bits
+            ids.append(self.rules[lowest.bit_length() - 1].id)
+            bits ^= lowest
+        return ids
+
+    def cards(self, progress: Mapping[str, Any], bits: int) -> List[Dict[str, Any]]:
+        """Every badge with the user's progress towards it, for display"""
+        cards = []
+        for rule in self.rules:
+            earned = bool(bits & self.bits[rule.id])
+            # Earned badges stay full even if their counter dropped again (a broken streak)
+            current = rule.threshold if earned else min(progress.get(rule.counter, 0), rule.threshold)
+            cards.append(dict(rule._asdict(), earned=earned, current=current))
+        return cards
+
+
+def load_badge_rules(path: str = DEFAULT_RULES_PATH) -> List[BadgeRule]:
+    """Badge rules from a JSON list of {id, name, icon, description, counter, threshold}"""
+    with open(path, encoding='utf-8') as handle:
+        return [BadgeRule(**rule) for rule in json.load(handle)]
+
+
+def badge_count(bits: int) -> int:
+    return bin(bits).count('1')
@@ -0,0 +1,125 @@
+"""
+Content store for EduBridge+
+Loads videos, quiz banks, action plans and eco tips once from a content pack
+into immutable structures that the AI helper generators hand out directly.
+"""
+
+import json
+import os
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from utils.topic_classifier import DEFAULT_CATEGORIES, GENERAL_CATEGORY, TopicCategory, set_categories
+
+try:
+    import yaml
+except ImportError:  # YAML packs are optional
+    yaml = None
+
+DEFAULT_PACK_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                 'content', 'default_pack.json')
+
+
+@dataclass(frozen=True)
+class VideoLink:
+    """A recommended video"""
+    __slots__ = ('title', 'url')
+    title: str
+    url: str
+
+
+@dataclass(frozen=True)
+class QuizQuestion:
+    """A multiple choice question with the index of its correct option"""
+    __slots__ = ('question', 'options', 'correct', 'explanation')
+    question: str
+    options: Tuple[str, ...]
+    correct: int
+    explanation: str
+
+
+class ContentStore:
+    """Read-only content tables keyed by topic category"""
+    __slots__ = ('categories', 'videos', 'quizzes', 'action_plans', 'eco_tips')
+
+    def __init__(self, categories: Tuple[TopicCategory, ...],
+                 videos: Mapping[str, Tuple[VideoLink, ...]],
+                 quizzes: Mapping[str, Tuple[QuizQuestion, ...]],
+                 action_plans: Mapping[str, Tuple[str, ...]],
+                 eco_tips: Tuple[str, ...]):
+        self.categories = categories
+        self.videos = MappingProxyType(dict(videos))
+        self.quizzes = MappingProxyType(dict(quizzes))
+        self.action_plans = MappingProxyType(dict(action_plans))
+        self.eco_tips = eco_tips
+
+
+def _read_pack(path: str) -> Dict[str, Any]:
+    """Parse a JSON or YAML content pack file"""
+    with open(path, encoding='utf-8') as f:
+        if path.endswith(('.yaml', '.yml')):
+            if yaml is None:
+                raise RuntimeError(f'PyYAML is required to load {path}')
+            return yaml.safe_load(f) or {}
+        return json.load(f)
+
+
+def build_store(data: Dict[str, Any], base: Optional[ContentStore] = None) -> ContentStore:
+    """Freeze raw pack data, layering it over an existing store if given"""
+    categories = list(base.categories if base else DEFAULT_CATEGORIES)
+    for raw in data.get('categories', []):
+        category = TopicCategory(raw['name'], raw.get('sdg'), tuple(raw['keywords']), raw.get('parent'))
+        names = [existing.name for existing in categories]
+        if category.name in names:
+            categories[names.index(category.name)] = category
+        elif GENERAL_CATEGORY in names:
+            categories.insert(names.index(GENERAL_CATEGORY), category)
+        else:
+            categories.append(category)
+
+    videos = dict(base.videos) if base else {}
+    for name, links in data.get('videos', {}).items():
+        videos[name] = tuple(VideoLink(link['title'], link['url']) for link in links)
+
+    quizzes = dict(base.quizzes) if base else {}
+    for name, questions in data.get('quizzes', {}).items():
+        quizzes[name] = tuple(
+            QuizQuestion(q['question'], tuple(q['options']), q['correct'], q.get('explanation', ''))
+            for q in questions
+        )
+
+    action_plans = dict(base.action_plans) if base else {}
+    for name, actions in data.get('action_plans', {}).items():
+        action_plans[name] = tuple(actions)
+
+    eco_tips = tuple(data['eco_tips']) if 'eco_tips' in data else (base.eco_tips if base else ())
+
+    for table_name, table in (('videos', videos), ('quizzes', quizzes), ('action_plans', action_plans)):
+        if 'default' not in table:
+            raise ValueError(f"content pack is missing a 'default' entry for {table_name}")
+    if not eco_tips:
+        raise ValueError('content pack has no eco_tips')
+
+    return ContentStore(tuple(categories), videos, quizzes, action_plans, eco_tips)
+
+
+def load_content_pack(path: str, base: Optional[ContentStore] = None) -> ContentStore:
+    """Load a JSON/YAML content pack into a frozen store"""
+    return build_store(_read_pack(path), base)
+
+
+_store = load_content_pack(DEFAULT_PACK_PATH)
+
+
+def get_content_store() -> ContentStore:
+    """Return the active content store"""
+    return _store
+
+
+def use_content_pack(path: str) -> ContentStore:
+    """Layer an extra content pack over the default one and make it active"""
+    global _store
+    _store = load_content_pack(path, base=load_content_pack(DEFAULT_PACK_PATH))
+    set_categories(_store.categories)
+    return _store
@@ -0,0 +1,102 @@
+"""
+Concurrent generator fan-out for EduBridge+
+Runs the independent learn page generators in parallel on a shared thread pool,
+with a deadline per generator and a static fallback when one fails or is late.
+A late call is cancelled if it has not started; one already running cannot be
+stopped, so each generator may hold at most max_in_flight workers and falls
+back straight away beyond that, leaving the pool to the others.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+
+class GeneratorTask(NamedTuple):
+    """A generator call, the static content to use instead, and its time budget in seconds"""
+    fn: Callable[[], Any]
+    fallback: Callable[[], Any]
+    timeout: float = 2.0
+
+
+class FanOutResult(NamedTuple):
+    """Generator outputs plus per-generator wall time (ms) and the names that fell back"""
+    values: Dict[str, Any]
+    timings: Dict[str, float]
+    fallbacks: frozenset
+
+
+class GeneratorFanOut:
+    """Shared executor for running a request's generators side by side"""
+
+    def __init__(self, max_workers: int = 16, max_in_flight: int = 4, logger: logging.Logger = logger):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='learn-generator')
+        self.max_in_flight = max_in_flight
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, int] = {}  # generator name -> calls queued or running
+
+    def _acquire(self, name: str) -> bool:
+        with self._lock:
+            if self._in_flight.get(name, 0) >= self.max_in_flight:
+                return False
+            self._in_flight[name] = self._in_flight.get(name, 0) + 1
+            return True
+
+    def _release(self, name: str) -> None:
+        with self._lock:
+            self._in_flight[name] -= 1
+
+    def run(self, tasks: Dict[str, GeneratorTask], label: str = '') -> FanOutResult:
+        """Run all tasks concurrently; total wall time is bounded by the slowest deadline"""
+        started = time.perf_counter()
+        futures = {}
+        for name, task in tasks.items():
+            if self._acquire(name):
+                futures[name] = self._executor.submit(_timed, task.fn)
+                futures[name].add_done_callback(lambda _, name=name: self._release(name))
+
+        values, timings, fallbacks = {}, {}, set()
+        for name, task in tasks.items():
+            future = futures.get(name)
+            if future is None:
+                self.logger.warning('Generator %s already has %d calls running, using fallback for %s',
+                                    name, self.max_in_flight, label)
+            else:
+                remaining = max(0.0, started + task.timeout - time.perf_counter())
+                try:
+                    values[name], elapsed = future.result(timeout=remaining)
+                    timings[name] = round(elapsed * 1000, 2)
+                    continue
+                except FutureTimeoutError:
+                    # Dropped if still queued; a running call finishes in the background, its result discarded
+                    future.cancel()
+                    self.logger.warning('Generator %s exceeded %.2fs for %s, using fallback',
+                                        name, task.timeout, label)
+                except Exception:
+                    self.logger.exception('Generator %s failed for %s, using fallback', name, label)
+            values[name] = task.fallback()
+            timings[name] = round((time.perf_counter() - started) * 1000, 2)
+            fallbacks.add(name)
+
+        total = round((time.perf_counter() - started) * 1000, 2)
+        self.logger.info('Generators for %s finished in %.2fms: %s', label, total,
+                         ', '.join(f'{name}={ms}ms' for name, ms in timings.items()))
+        return FanOutResult(values, timings, frozenset(fallbacks))
+
+    def stats(self) -> Dict[str, int]:
+        """Calls queued or running per generator"""
+        with self._lock:
+            return {name: count for name, count in self._in_flight.items() if count}
+
+    def shutdown(self, wait: bool = False) -> None:
+        self._executor.shutdown(wait=wait)
+
+
+def _timed(fn: Callable[[], Any]):
+    start = time.perf_counter()
+    return fn(), time.perf_counter() - start
@@ -0,0 +1,230 @@
+"""
+Live community feed broker for EduBridge+
+Fans new posts and like counts out to server-sent-event subscribers. Events
+published within a short window are coalesced into one batch (repeated
+updates to the same key keep only the latest value), the batch is formatted
+once and shared by every subscriber, so a burst of likes costs each open tab
+one message and no subscriber ever queries the database.
+"""
+
+import json
+import logging
+import threading
+import uuid
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, Optional
+
+try:
+    import redis
+except ImportError:  # only needed for the Redis transport
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class FeedFull(Exception):
+    """Raised when the broker already has its maximum number of subscribers"""
+
+
+class InProcessTransport:
+    """Delivers published events to this process's subscribers only"""
+
+    def start(self, deliver: Callable[[Dict[str, Any]], None]) -> None:
+        self._deliver = deliver
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        self._deliver(event)
+
+    def close(self) -> None:
+        pass
+
+
+class RedisTransport:
+    """Relays events through a Redis-compatible pub/sub channel so subscribers on every worker see them"""
+
+    def __init__(self, url: str, channel: str = 'edubridge:feed'):
+        if redis is None:
+            raise RuntimeError("The Redis feed transport needs the 'redis' package (pip install redis)")
+        self.client = redis.Redis.from_url(url)
+        self.channel = channel
+        self._pubsub = None
+        self._thread = None
+
+    def start(self, deliver: Callable[[Dict[str, Any]], None]) -> None:
+        self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(**{self.channel: lambda message: deliver(json.loads(message['data']))})
+        self._thread = self._pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        self.client.publish(self.channel, json.dumps(event))
+
+    def close(self) -> None:
+        if self._thread:
+            self._thread.stop()
+            self._pubsub.close()
+
+
+def create_transport(url: str = ''):
+    """In-process transport, or a Redis one for redis://, rediss:// and unix:// URLs"""
+    if not url:
+        return InProcessTransport()
+    if url.split('://', 1)[0] in ('redis', 'rediss', 'unix'):
+        return RedisTransport(url)
+    raise ValueError(f"Unsupported feed broker URL '{url}'. Use a redis:// URL or leave it empty")
+
+
+class FeedBroker:
+    """Coalescing publish/subscribe hub behind the live feed endpoint"""
+
+    def __init__(self, transport=None, window: float = 0.25, history: int = 256,
+                 max_subscribers: int = 10000, logger: logging.Logger = logger):
+        self.transport = transport or InProcessTransport()
+        self.window = window
+        self.max_subscribers = max_subscribers
+        self.logger = logger
+        self.instance = uuid.uuid4().hex[:8]
+        self.published = 0
+        self.batches = 0
+        self._pending: Dict[str, Any] = {}
+        self._pending_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        # Recent batches as (seq, SSE message), shared by all subscribers
+        self._history = deque(maxlen=history)
+        self._seq = 0
+        self._subscribers = 0
+        self._changed = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='feed-broker', daemon=True)
+
+    def start(self) -> 'FeedBroker':
+        self.transport.start(self._collect)
+        self._thread.start()
+        return self
+
+    @property
+    def closed(self) -> bool:
+        return self._stopped.is_set()
+
+    def publish(self, kind: str, value: Any, key: Any = None) -> None:
+        """Queue an event for the next batch. Keyed events replace earlier ones with the same
+        kind and key in that batch; unkeyed events are all kept, in order."""
+        try:
+            self.transport.publish({'kind': kind, 'key': key, 'value': value})
+        except Exception:
+            # A live update is not worth failing the write that caused it
+            self.logger.exception('Could not publish %s event to the feed', kind)
+
+    def _collect(self, event: Dict[str, Any]) -> None:
+        kind, key = event['kind'], event['key']
+        with self._pending_lock:
+            if key is None:
+                self._pending.setdefault(kind, []).append(event['value'])
+            else:
+                self._pending.setdefault(kind, {})[str(key)] = event['value']
+            self.published += 1
+        self._wakeup.set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait()
+            # Let the rest of the burst arrive before cutting the batch
+            self._stopped.wait(self.window)
+            self._wakeup.clear()
+            self._emit()
+
+    def _emit(self) -> None:
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        data = json.dumps(pending)
+        with self._changed:
+            self._seq += 1
+            self._history.append((self._seq, f'id: {self.instance}-{self._seq}\nevent: feed\ndata: {data}\n\n'))
+            self.batches += 1
+            self._changed.notify_all()
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> 'Subscription':
+        """New subscription starting after last_event_id (an SSE reconnect) or from now.
+        Raises FeedFull when max_subscribers are already connected."""
+        with self._changed:
+            if self._subscribers >= self.max_subscribers:
+                raise FeedFull(f'{self._subscribers} feed subscribers already connected')
+            self._subscribers += 1
+            subscription = Subscription(self, self._seq)
+            if last_event_id:
+                instance, _, seq = last_event_id.partition('-')
+                if instance == self.instance and seq.isdigit() and int(seq) <= self._seq:
+                    subscription.last = int(seq)
+                else:
+                    # Id from another worker or before a restart: the client must refetch
+                    subscription.last = -1
+            return subscription
+
+    def _unsubscribe(self) -> None:
+        with self._changed:
+            self._subscribers -= 1
+
+    def _next(self, subscription: 'Subscription', timeout: float) -> Optional[str]:
+        with self._changed:
+            if subscription.last == self._seq and not self.closed:
+                self._changed.wait(timeout)
+            missed = self._seq - subscription.last
+            if missed == 0:
+                return None
+            if subscription.last < 0 or missed > len(self._history):
+                # Batches were dropped from the history before this subscriber read them
+                subscription.last = self._seq
+                return f'id: {self.instance}-{self._seq}\nevent: reset\ndata: {{}}\n\n'
+            size = len(self._history)
+            messages = [self._history[i][1] for i in range(size - missed, size)]
+            subscription.last = self._seq
+        return ''.join(messages)
+
+    def stats(self) -> Dict[str, int]:
+        with self._changed:
+            return {'subscribers': self._subscribers, 'published': self.published, 'batches': self.batches}
+
+    def close(self) -> None:
+        """Send what is pending, end every subscription and stop the transport"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=5)
+        self._emit()
+        with self._changed:
+            self._changed.notify_all()
+        self.transport.close()
+
+
+class Subscription:
+    """One client's position in the broker's batch history"""
+
+    def __init__(self, broker: FeedBroker, last: int):
+        self.broker = broker
+        self.last = last
+        self._closed = False
+
+    def next(self, timeout: float) -> Optional[str]:
+        """SSE text for every batch since the last call, or None if nothing arrived within timeout"""
+        return self.broker._next(self, timeout)
+
+    def messages(self, keepalive: float = 15.0) -> Iterator[str]:
+        """Batches as they are published, with a comment line every keepalive seconds of quiet
+        so proxies keep the connection open; ends when the broker closes"""
+        while not self.broker.closed:
+            yield self.next(keepalive) or ': keep-alive\n\n'
+        remaining = self.next(0)
+        if remaining:
+            yield remaining
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self.broker._unsubscribe()
+
+    def __enter__(self) -> 'Subscription':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
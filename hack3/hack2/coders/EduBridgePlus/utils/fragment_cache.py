@@ -0,0 +1,47 @@
+"""
+Template fragment caching for EduBridge+
+A Jinja extension adding {% cache key[, ttl] %}...{% endcache %}: the body is
+rendered once and its markup served from a bounded in-memory cache until it
+expires, so pages that mix shared and per-user parts render only the
+per-user parts on each request. key is any hashable value (a string or a
+tuple of strings and numbers) naming everything the body depends on; a key
+of None renders the body without caching it. Entries are scoped to the
+template and line of the tag, so blocks never share entries by accident.
+Data the body reads can be passed as a callable and called inside the
+block, so the query behind it only runs on a miss.
+"""
+
+from typing import Any, Callable, Hashable, Optional
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+from utils.cache import TTLLRUCache
+
+
+class FragmentCacheExtension(Extension):
+    """Adds the {% cache %} tag; rendering uses environment.fragment_cache, or never caches if it is None"""
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        scope = nodes.Const(f'{parser.name}:{lineno}')
+        key = parser.parse_expression()
+        ttl = parser.parse_expression() if parser.stream.skip_if('comma') else nodes.Const(None)
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render', [scope, key, ttl]), [], [], body).set_lineno(lineno)
+
+    def _render(self, scope: str, key: Optional[Hashable], ttl: Optional[float], caller: Callable[[], Any]) -> Any:
+        store: Optional[TTLLRUCache] = self.environment.fragment_cache
+        if store is None or key is None:
+            return caller()
+        cache_key = (scope, key)
+        markup = store.get(cache_key)
+        if markup is None:
+            markup = caller()
+            store.set(cache_key, markup, ttl=ttl)
+        return markup
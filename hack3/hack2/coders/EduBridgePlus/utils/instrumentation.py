@@ -0,0 +1,296 @@
+"""
+Request instrumentation for EduBridge+
+Wraps the WSGI app to time every request by route, counts and times the SQL
+statements each request runs (SQLAlchemy engine events), and collects named
+spans within it: template renders, plus anything the app times with
+record_span(), such as the learn generators. The results feed Prometheus
+counters and histograms, which MetricsRegistry.render() serves in the text
+exposition format. A request over the latency budget, or one that runs the
+same statement over and over (an N+1 pattern), is logged; in debug mode the
+response also carries Server-Timing, X-Query-Count and X-Request-Warnings
+headers. Durations are measured until the response headers are sent, so a
+streamed body is not included. Metrics are kept per process.
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from flask import before_render_template, has_request_context, request, template_rendered
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)  # statements per request
+
+_current_trace: ContextVar[Optional['RequestTrace']] = ContextVar('request_trace', default=None)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in values)
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(names, escaped)) + '}'
+
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+class Counter:
+    """A monotonically increasing count per label set"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = defaultdict(float)
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] += amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(tuple(str(labels[name]) for name in self.labelnames), 0)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter'] + [
+            f'{self.name}{_format_labels(self.labelnames, key)} {_format_number(value)}' for key, value in values]
+
+
+class Histogram:
+    """Observations per label set, counted into fixed upper-bound buckets"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], list] = {}  # key -> [count per bucket (+Inf last), sum]
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self._lock:
+            counts = self._values.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0])
+            counts[0][index] += 1
+            counts[1] += value
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            counts = self._values.get(tuple(str(labels[name]) for name in self.labelnames))
+            return sum(counts[0]) if counts else 0
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(buckets), total)) for key, (buckets, total) in self._values.items())
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        bounds = [_format_number(bound) for bound in self.buckets] + ['+Inf']
+        for key, (buckets, total) in values:
+            cumulative = 0
+            for bound, count in zip(bounds, buckets):
+                cumulative += count
+                labels = _format_labels(self.labelnames + ('le',), key + (bound,))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_number(total)}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics, rendered together in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric '{metric.name}' is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        return '\n'.join(line for metric in self._metrics.values() for line in metric.collect()) + '\n'
+
+
+class RequestTrace:
+    """What one request spent its time on: SQL statements and named spans"""
+    __slots__ = ('started', 'queries', 'query_seconds', 'statements', 'spans', 'renders', 'finished')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.statements: Dict[str, int] = defaultdict(int)  # statement text -> executions
+        self.spans: Dict[str, List[float]] = {}              # name -> [count, seconds]
+        self.renders: List[Tuple[str, float]] = []           # templates being rendered, with start times
+        self.finished = False
+
+    def add_query(self, statement: str, seconds: float) -> None:
+        self.queries += 1
+        self.query_seconds += seconds
+        self.statements[statement] += 1
+
+    def add_span(self, name: str, seconds: float) -> None:
+        span = self.spans.setdefault(name, [0, 0.0])
+        span[0] += 1
+        span[1] += seconds
+
+    def repeated_statements(self, threshold: int) -> List[Tuple[str, int]]:
+        """Statements run at least threshold times, most repeated first"""
+        return sorted(((statement, count) for statement, count in self.statements.items() if count >= threshold),
+                      key=lambda item: -item[1])
+
+    def server_timing(self, seconds: float) -> str:
+        """Server-Timing header value: total, SQL and each span, in milliseconds"""
+        entries = [f'total;dur={seconds * 1000:.1f}',
+                   f'db;dur={self.query_seconds * 1000:.1f};desc="{self.queries} queries"']
+        for name, (count, span_seconds) in self.spans.items():
+            token = re.sub(r'[^A-Za-z0-9_.-]', '-', name)
+            entries.append(f'{token};dur={span_seconds * 1000:.1f};desc="{count}x {name}"')
+        return ', '.join(entries)
+
+
+def record_span(name: str, seconds: float) -> None:
+    """Add a timed span to the current request's trace; does nothing outside one"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_span(name, seconds)
+
+
+def _header_text(text: str, limit: int = 120) -> str:
+    """One line of ASCII, short enough for a response header"""
+    text = ' '.join(text.split())
+    text = text if len(text) <= limit else text[:limit - 3] + '...'
+    return text.encode('ascii', 'replace').decode('ascii')
+
+
+class Instrumentation:
+    """WSGI middleware tracing each request of a Flask app into a metrics registry.
+    latency_budget is in seconds (0 disables); a request running one statement n_plus_one times
+    or more is flagged; headers adds the debug headers outside debug mode too."""
+
+    def __init__(self, app, engines: Iterable = (), registry: Optional[MetricsRegistry] = None,
+                 latency_budget: float = 0.5, n_plus_one: int = 5, headers: bool = False,
+                 logger: logging.Logger = logger):
+        self.app = app
+        self.latency_budget = latency_budget
+        self.n_plus_one = n_plus_one
+        self.headers = headers
+        self.logger = logger
+        self.registry = registry or MetricsRegistry()
+        self.requests = self.registry.counter(
+            'edubridge_requests_total', 'Requests by route, method and status', ('route', 'method', 'status'))
+        self.duration = self.registry.histogram(
+            'edubridge_request_duration_seconds', 'Time until the response headers were sent', ('route', 'method'))
+        self.queries = self.registry.histogram(
+            'edubridge_request_queries', 'SQL statements per request', ('route',), QUERY_BUCKETS)
+        self.query_time = self.registry.histogram(
+            'edubridge_request_query_seconds', 'Time spent in SQL statements per request', ('route',))
+        self.spans = self.registry.histogram(
+            'edubridge_span_duration_seconds', 'Template renders and generators per request', ('route', 'span'))
+        self.slow = self.registry.counter(
+            'edubridge_slow_requests_total', 'Requests over the latency budget', ('route',))
+        self.repeated = self.registry.counter(
+            'edubridge_n_plus_one_requests_total', 'Requests running one SQL statement repeatedly', ('route',))
+
+        self.wsgi_app = app.wsgi_app
+        app.wsgi_app = self
+        before_render_template.connect(self._render_started, app, weak=False)
+        template_rendered.connect(self._render_finished, app, weak=False)
+        for engine in engines:
+            self.watch_engine(engine)
+
+    def watch_engine(self, engine) -> None:
+        """Count and time the statements run on engine by instrumented requests"""
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+    def __call__(self, environ, start_response):
+        trace = RequestTrace()
+        token = _current_trace.set(trace)
+
+        def traced_start_response(status, headers, exc_info=None):
+            if not trace.finished:
+                trace.finished = True
+                self._finish(trace, environ['REQUEST_METHOD'], status.split(' ', 1)[0], headers)
+            return start_response(status, headers, exc_info)
+
+        try:
+            return self.wsgi_app(environ, traced_start_response)
+        finally:
+            _current_trace.reset(token)
+
+    def _finish(self, trace: RequestTrace, method: str, status: str, headers: list) -> None:
+        seconds = time.perf_counter() - trace.started
+        # Flask calls start_response with the request context still pushed
+        rule = request.url_rule if has_request_context() else None
+        route = rule.rule if rule is not None else 'unmatched'
+        self.requests.inc(route=route, method=method, status=status)
+        self.duration.observe(seconds, route=route, method=method)
+        self.queries.observe(trace.queries, route=route)
+        self.query_time.observe(trace.query_seconds, route=route)
+        for name, (_, span_seconds) in trace.spans.items():
+            self.spans.observe(span_seconds, route=route, span=name)
+
+        warnings = []
+        if self.latency_budget and seconds > self.latency_budget:
+            self.slow.inc(route=route)
+            warnings.append(f'over budget ({seconds * 1000:.0f}ms > {self.latency_budget * 1000:.0f}ms)')
+        repeated = trace.repeated_statements(self.n_plus_one)
+        if repeated:
+            self.repeated.inc(route=route)
+            statement, count = repeated[0]
+            warnings.append(f'possible N+1 ({count}x {_header_text(statement, 80)})')
+        if warnings:
+            self.logger.warning('%s %s: %s; %d queries in %.1fms', method, route, '; '.join(warnings),
+                                trace.queries, trace.query_seconds * 1000)
+        if self.headers or self.app.debug:
+            headers.append(('Server-Timing', _header_text(trace.server_timing(seconds), 1000)))
+            headers.append(('X-Query-Count', str(trace.queries)))
+            if warnings:
+                headers.append(('X-Request-Warnings', _header_text('; '.join(warnings), 200)))
+
+    def _render_started(self, sender, template, **extra):
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.renders.append((template.name or 'string', time.perf_counter()))
+
+    def _render_finished(self, sender, template, **extra):
+        trace = _current_trace.get()
+        if trace is not None and trace.renders:
+            name, started = trace.renders.pop()
+            trace.add_span(f'render:{name}', time.perf_counter() - started)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _current_trace.get() is not None:
+        context._instrumentation_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    trace = _current_trace.get()
+    started = getattr(context, '_instrumentation_started', None)
+    if trace is not None and started is not None:
+        trace.add_query(statement, time.perf_counter() - started)
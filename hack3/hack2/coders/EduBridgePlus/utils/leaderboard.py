@@ -0,0 +1,316 @@
+"""
+Leaderboards for EduBridge+
+Ranked boards kept in memory as order-statistic skip lists, so top-N and a
+member's rank are O(log n) instead of a sort or COUNT over every row. Each
+board belongs to a period ('all', an ISO week or a month); the database
+ranking table is the source of truth and boards are loaded from it on first
+use, updated as writes commit, and periodically reloaded so workers that
+did not see a write converge.
+"""
+
+import random
+import threading
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+WINDOWS = ('all', 'week', 'month')
+
+_MAX_LEVEL = 32
+_P = 0.25
+
+
+def period_key(window: str, when: datetime) -> str:
+    """Ranking table period for a window at a point in time"""
+    if window == 'all':
+        return 'all'
+    if window == 'week':
+        year, week, _ = when.isocalendar()
+        return f'{year}-W{week:02d}'
+    if window == 'month':
+        return when.strftime('%Y-%m')
+    raise ValueError(f"Unknown leaderboard window '{window}'. Choose from: {', '.join(WINDOWS)}")
+
+
+def period_start(window: str, when: datetime) -> Optional[datetime]:
+    """First instant of the window containing when; None for all-time"""
+    day = when.replace(hour=0, minute=0, second=0, microsecond=0)
+    if window == 'week':
+        return day - timedelta(days=day.weekday())
+    if window == 'month':
+        return day.replace(day=1)
+    if window == 'all':
+        return None
+    raise ValueError(f"Unknown leaderboard window '{window}'. Choose from: {', '.join(WINDOWS)}")
+
+
+class _Node:
+    __slots__ = ('key', 'forward', 'span')
+
+    def __init__(self, key, level):
+        self.key = key
+        self.forward = [None] * level
+        self.span = [0] * level
+
+
+class RankedBoard:
+    """Members ordered by score (highest first, ties by member); not thread-safe"""
+
+    def __init__(self):
+        self._scores: Dict[str, int] = {}
+        self._head = _Node(None, _MAX_LEVEL)
+        self._level = 1
+
+    @classmethod
+    def from_scores(cls, scores: Dict[str, int]) -> 'RankedBoard':
+        """Build in O(n log n) for the sort plus O(n) linking"""
+        board = cls()
+        board._scores = dict(scores)
+        last = [board._head] * _MAX_LEVEL
+        last_position = [0] * _MAX_LEVEL
+        keys = sorted((-score, member) for member, score in board._scores.items())
+        for position, key in enumerate(keys, 1):
+            node = _Node(key, _random_level())
+            for i in range(len(node.forward)):
+                last[i].forward[i] = node
+                last[i].span[i] = position - last_position[i]
+                last[i], last_position[i] = node, position
+            board._level = max(board._level, len(node.forward))
+        for i in range(board._level):
+            last[i].span[i] = len(keys) - last_position[i]
+        return board
+
+    def __len__(self):
+        return len(self._scores)
+
+    def __contains__(self, member):
+        return member in self._scores
+
+    def score(self, member: str) -> Optional[int]:
+        return self._scores.get(member)
+
+    def increment(self, member: str, delta: int) -> int:
+        """Add delta to a member's score (starting from 0) and return the new score"""
+        score = self._scores.get(member, 0) + delta
+        self.set(member, score)
+        return score
+
+    def set(self, member: str, score: int) -> None:
+        old = self._scores.get(member)
+        if old == score:
+            return
+        if old is not None:
+            self._delete((-old, member))
+            del self._scores[member]
+        self._insert((-score, member))
+        self._scores[member] = score
+
+    def remove(self, member: str) -> None:
+        score = self._scores.pop(member, None)
+        if score is not None:
+            self._delete((-score, member))
+
+    def rank(self, member: str) -> Optional[int]:
+        """1-based position of a member, or None if absent"""
+        score = self._scores.get(member)
+        if score is None:
+            return None
+        key = (-score, member)
+        rank, node = 0, self._head
+        for i in range(self._level - 1, -1, -1):
+            while node.forward[i] is not None and node.forward[i].key <= key:
+                rank += node.span[i]
+                node = node.forward[i]
+            if node.key == key:
+                return rank
+        return None
+
+    def top(self, n: int, offset: int = 0) -> List[Tuple[str, int]]:
+        """Members at ranks offset+1 .. offset+n with their scores"""
+        node, traversed = self._head, 0
+        # Skip to the node just before offset+1, using the spans
+        for i in range(self._level - 1, -1, -1):
+            while node.forward[i] is not None and traversed + node.span[i] <= offset:
+                traversed += node.span[i]
+                node = node.forward[i]
+        result = []
+        node = node.forward[0]
+        while node is not None and len(result) < n:
+            result.append((node.key[1], -node.key[0]))
+            node = node.forward[0]
+        return result
+
+    def _insert(self, key):
+        update = [None] * _MAX_LEVEL
+        rank = [0] * _MAX_LEVEL
+        node = self._head
+        for i in range(self._level - 1, -1, -1):
+            rank[i] = 0 if i == self._level - 1 else rank[i + 1]
+            while node.forward[i] is not None and node.forward[i].key < key:
+                rank[i] += node.span[i]
+                node = node.forward[i]
+            update[i] = node
+        level = _random_level()
+        if level > self._level:
+            for i in range(self._level, level):
+                rank[i] = 0
+                update[i] = self._head
+                update[i].span[i] = len(self._scores)
+            self._level = level
+        new = _Node(key, level)
+        for i in range(level):
+            new.forward[i] = update[i].forward[i]
+            update[i].forward[i] = new
+            new.span[i] = update[i].span[i] - (rank[0] - rank[i])
+            update[i].span[i] = rank[0] - rank[i] + 1
+        for i in range(level, self._level):
+            update[i].span[i] += 1
+
+    def _delete(self, key):
+        update = [None] * _MAX_LEVEL
+        node = self._head
+        for i in range(self._level - 1, -1, -1):
+            while node.forward[i] is not None and node.forward[i].key < key:
+                node = node.forward[i]
+            update[i] = node
+        target = node.forward[0]
+        for i in range(self._level):
+            if update[i].forward[i] is target:
+                update[i].span[i] += target.span[i] - 1
+                update[i].forward[i] = target.forward[i]
+            else:
+                update[i].span[i] -= 1
+        while self._level > 1 and self._head.forward[self._level - 1] is None:
+            self._level -= 1
+
+
+def _random_level():
+    level = 1
+    while level < _MAX_LEVEL and random.random() < _P:
+        level += 1
+    return level
+
+
+class _LoadedBoard:
+    __slots__ = ('ranking', 'events')
+
+    def __init__(self, rows: Iterable[Tuple[str, int, int]]):
+        scores, self.events = {}, defaultdict(int)
+        for member, score, events in rows:
+            scores[member] = score
+            self.events[member] = events
+        self.ranking = RankedBoard.from_scores(scores)
+
+    def apply(self, member: str, score: int, events: int) -> None:
+        self.ranking.increment(member, score)
+        self.events[member] += events
+
+
+class LeaderboardService:
+    """Ranked boards per (board, period), loaded from the ranking table on first use"""
+
+    def __init__(self, load: Callable[[str, str], Iterable[Tuple[str, int, int]]], max_boards: int = 32,
+                 clock: Callable[[], datetime] = datetime.utcnow):
+        self._load = load
+        self.max_boards = max_boards
+        self.clock = clock
+        self._boards: 'OrderedDict[Tuple[str, str], _LoadedBoard]' = OrderedDict()
+        self._lock = threading.Lock()
+        # Changes recorded while a board is being read, one list per read in progress
+        self._loading: Dict[Tuple[str, str], List[List[Tuple[str, int, int]]]] = defaultdict(list)
+        self.loads = 0
+
+    def _fetch(self, key: Tuple[str, str], install: Callable[[_LoadedBoard], _LoadedBoard]) -> _LoadedBoard:
+        """Read a board outside the lock (it may be a large read), then under the lock replay the
+        changes recorded meanwhile and install it. A change committed just before the read began
+        can be counted twice until the next refresh; without the replay it would be lost until then."""
+        changes = []
+        with self._lock:
+            self._loading[key].append(changes)
+        try:
+            loaded = _LoadedBoard(self._load(*key))
+        except BaseException:
+            with self._lock:
+                self._finish_loading(key, changes)
+            raise
+        with self._lock:
+            self._finish_loading(key, changes)
+            for change in changes:
+                loaded.apply(*change)
+            return install(loaded)
+
+    def _finish_loading(self, key, changes) -> None:
+        remaining = [log for log in self._loading[key] if log is not changes]
+        if remaining:
+            self._loading[key] = remaining
+        else:
+            del self._loading[key]
+
+    def _board(self, board: str, window: str, now: Optional[datetime]) -> _LoadedBoard:
+        key = (board, period_key(window, now or self.clock()))
+        with self._lock:
+            loaded = self._boards.get(key)
+            if loaded is not None:
+                self._boards.move_to_end(key)
+                return loaded
+
+        def install(loaded):
+            self.loads += 1
+            loaded = self._boards.setdefault(key, loaded)
+            # Least recently used first: past weeks and months age out
+            while len(self._boards) > self.max_boards:
+                self._boards.popitem(last=False)
+            return loaded
+
+        return self._fetch(key, install)
+
+    def record(self, board: str, member: str, score: int = 0, events: int = 0,
+               when: Optional[datetime] = None) -> None:
+        """Apply a committed change to every loaded period board it falls in"""
+        when = when or self.clock()
+        with self._lock:
+            for window in WINDOWS:
+                key = (board, period_key(window, when))
+                for changes in self._loading.get(key, ()):
+                    changes.append((member, score, events))
+                loaded = self._boards.get(key)
+                if loaded is not None:
+                    loaded.apply(member, score, events)
+                # Otherwise it loads from the ranking table, which already has it
+
+    def top(self, board: str, window: str = 'all', n: int = 10, offset: int = 0,
+            now: Optional[datetime] = None) -> List[Tuple[str, int, int]]:
+        """(member, score, events) for ranks offset+1 .. offset+n"""
+        loaded = self._board(board, window, now)
+        with self._lock:
+            return [(member, score, loaded.events[member]) for member, score in loaded.ranking.top(n, offset)]
+
+    def rank(self, board: str, member: str, window: str = 'all',
+             now: Optional[datetime] = None) -> Optional[Tuple[int, int]]:
+        """(rank, score) of a member, or None if they have no entry in the window"""
+        loaded = self._board(board, window, now)
+        with self._lock:
+            rank = loaded.ranking.rank(member)
+            return None if rank is None else (rank, loaded.ranking.score(member))
+
+    def size(self, board: str, window: str = 'all', now: Optional[datetime] = None) -> int:
+        loaded = self._board(board, window, now)
+        with self._lock:
+            return len(loaded.ranking)
+
+    def refresh(self) -> int:
+        """Reload every loaded board from the ranking table; returns the number reloaded"""
+        with self._lock:
+            keys = list(self._boards)
+        for key in keys:
+            self._fetch(key, lambda loaded, key=key: self._replace(key, loaded))
+        return len(keys)
+
+    def _replace(self, key, loaded: _LoadedBoard) -> _LoadedBoard:
+        if key in self._boards:
+            self._boards[key] = loaded
+        return loaded
+
+    def clear(self) -> None:
+        with self._lock:
+            self._boards.clear()
@@ -0,0 +1,187 @@
+"""
+Explanation backends for EduBridge+
+get_ai_response renders static templates; a backend wraps it (or a real model
+server) behind one interface that can stream the explanation chunk by chunk.
+Model output is untrusted: it is reduced to an allowlist of bare tags before
+it is cached or sent to the page.
+"""
+
+import html
+import json
+import re
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, Optional, Type
+
+import requests
+
+from utils.ai_helper import get_ai_response
+from utils.topic_classifier import TopicClassification, classify_topic
+
+_BLOCK_SPLIT = re.compile(r'(?<=</p>)|(?<=</ul>)|(?<=</h3>)')
+_TOKEN_SPLIT = re.compile(r'\S+\s*|\s+')
+
+# Tags model output may keep, without attributes; everything else is shown as text
+ALLOWED_TAGS = frozenset({'h3', 'p', 'strong', 'em', 'ul', 'ol', 'li', 'br'})
+_TAG = re.compile(r'<(/?)([a-zA-Z][a-zA-Z0-9]*)[^<>]*>')
+_BARE_AMPERSAND = re.compile(r'&(?!(?:[a-zA-Z]+|#[0-9]+|#[xX][0-9a-fA-F]+);)')
+_UNFINISHED = re.compile(r'(?:<[^<>]*|&[#a-zA-Z0-9]*)$')  # a tag or entity the next chunk may complete
+
+
+class HTMLSanitizer:
+    """Reduces streamed HTML to ALLOWED_TAGS and escaped text, chunk by chunk.
+    A tag or entity split across chunks is held back until it is complete (up to max_held characters)."""
+
+    def __init__(self, max_held: int = 256):
+        self.max_held = max_held
+        self._held = ''
+
+    def feed(self, chunk: str) -> str:
+        text, self._held = self._held + chunk, ''
+        unfinished = _UNFINISHED.search(text)
+        if unfinished and len(unfinished.group()) <= self.max_held:
+            text, self._held = text[:unfinished.start()], unfinished.group()
+        return _clean(text)
+
+    def close(self) -> str:
+        text, self._held = self._held, ''
+        return _clean(text)
+
+
+def sanitize_html(text: str) -> str:
+    """text with only ALLOWED_TAGS kept as markup"""
+    sanitizer = HTMLSanitizer(max_held=0)
+    return sanitizer.feed(text) + sanitizer.close()
+
+
+def _clean(text: str) -> str:
+    parts, position = [], 0
+    for tag in _TAG.finditer(text):
+        parts.append(_escape_text(text[position:tag.start()]))
+        closing, name = tag.group(1), tag.group(2).lower()
+        parts.append(f'<{closing}{name}>' if name in ALLOWED_TAGS else html.escape(tag.group()))
+        position = tag.end()
+    parts.append(_escape_text(text[position:]))
+    return ''.join(parts)
+
+
+def _escape_text(text: str) -> str:
+    """Escape markup characters, keeping well-formed entities such as &amp; or &#8217;"""
+    return _BARE_AMPERSAND.sub('&amp;', text).replace('<', '&lt;').replace('>', '&gt;')
+
+
+class LLMBackend(ABC):
+    """Base class for explanation generators"""
+    name = 'base'
+    # True when generation is slow enough that /learn should stream it
+    streaming = False
+
+    @abstractmethod
+    def stream(self, topic: str, mode: str, classification: Optional[TopicClassification] = None) -> Iterator[str]:
+        """Yield the explanation HTML in chunks"""
+
+    def generate(self, topic: str, mode: str, classification: Optional[TopicClassification] = None) -> str:
+        """Return the complete explanation HTML"""
+        return ''.join(self.stream(topic, mode, classification))
+
+
+class TemplateBackend(LLMBackend):
+    """Static template lookup; instant, so it is rendered inline"""
+    name = 'template'
+
+    def generate(self, topic, mode, classification=None):
+        return get_ai_response(topic, mode, classification)
+
+    def stream(self, topic, mode, classification=None):
+        for block in _BLOCK_SPLIT.split(self.generate(topic, mode, classification)):
+            if block:
+                yield block
+
+
+class FakeBackend(LLMBackend):
+    """Stub model server: replays the template text token by token with simulated latency"""
+    name = 'fake'
+    streaming = True
+
+    def __init__(self, first_token_delay: float = 0.5, token_delay: float = 0.02, tokens_per_chunk: int = 4):
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.tokens_per_chunk = tokens_per_chunk
+
+    def stream(self, topic, mode, classification=None):
+        tokens = _TOKEN_SPLIT.findall(get_ai_response(topic, mode, classification))
+        time.sleep(self.first_token_delay)
+        for start in range(0, len(tokens), self.tokens_per_chunk):
+            chunk = tokens[start:start + self.tokens_per_chunk]
+            time.sleep(self.token_delay * len(chunk))
+            yield ''.join(chunk)
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    """Model server exposing an OpenAI-compatible streaming /chat/completions endpoint"""
+    name = 'openai'
+    streaming = True
+
+    def __init__(self, base_url: str = 'http://localhost:8000/v1', model: str = 'default',
+                 api_key: Optional[str] = None, timeout: float = 30.0, max_tokens: int = 700):
+        self.base_url = base_url.rstrip('/')
+        self.model = model
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_tokens = max_tokens
+
+    def build_messages(self, topic, mode, classification):
+        """Prompt asking for the same HTML fragment shape the templates produce"""
+        focus = f'SDG {classification.sdg}' if classification.sdg else 'general sustainability'
+        style = {
+            'deep': 'an in-depth, technical explanation',
+            'action': 'concrete action steps for this week, this month and the long term',
+        }.get(mode, 'a simple explanation with why it matters and how to take action')
+        return [
+            {'role': 'system', 'content': 'You are an educator for EduBridge+, a sustainability learning platform. '
+                                          'Answer with an HTML fragment using only <h3>, <p>, <strong>, <ul> and <li>.'},
+            {'role': 'user', 'content': f'Topic: {topic}\nFocus: {focus}\nWrite {style}.'},
+        ]
+
+    def stream(self, topic, mode, classification=None):
+        """Yield the model's answer, sanitized to ALLOWED_TAGS"""
+        classification = classification or classify_topic(topic)
+        sanitizer = HTMLSanitizer()
+        headers = {'Authorization': f'Bearer {self.api_key}'} if self.api_key else {}
+        payload = {
+            'model': self.model,
+            'messages': self.build_messages(topic, mode, classification),
+            'max_tokens': self.max_tokens,
+            'stream': True,
+        }
+        with requests.post(f'{self.base_url}/chat/completions', json=payload, headers=headers,
+                           stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                data = line[len('data:'):].strip()
+                if data == '[DONE]':
+                    break
+                delta = json.loads(data)['choices'][0].get('delta', {}).get('content')
+                if delta:
+                    safe = sanitizer.feed(delta)
+                    if safe:
+                        yield safe
+        rest = sanitizer.close()
+        if rest:
+            yield rest
+
+
+BACKENDS: Dict[str, Type[LLMBackend]] = {
+    backend.name: backend for backend in (TemplateBackend, FakeBackend, OpenAICompatibleBackend)
+}
+
+
+def create_backend(name: str = 'template', **options) -> LLMBackend:
+    """Instantiate a registered backend by name"""
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown LLM backend '{name}'. Choose from: {', '.join(BACKENDS)}") from None
+    return backend_class(**options)
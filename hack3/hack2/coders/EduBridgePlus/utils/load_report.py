@@ -0,0 +1,106 @@
+"""
+Load test results for EduBridge+
+Collects the latency, status and SQL statement count of every request a load
+test makes, summarizes them per endpoint (p50/p95/p99 latency, requests per
+second, errors, statements per request) and compares two saved summaries so
+a change can be checked against the previous commit's numbers.
+"""
+
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+# Metric -> direction in which a change is a regression (+1: higher is worse, -1: lower is worse)
+COMPARED_METRICS = {'p50_ms': 1, 'p95_ms': 1, 'p99_ms': 1, 'rps': -1, 'queries': 1, 'errors': 1}
+# Counts that should not move between runs of the same journeys; any increase of at least this much regresses
+EXACT_METRICS = {'queries': 0.5, 'errors': 1}
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of values (0.0 when empty)"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize(samples: Sequence[tuple], seconds: float) -> Dict[str, Any]:
+    """Stats for (seconds, status, queries) samples taken over a run of the given length.
+    Statuses of 400 and above are errors and count towards neither latency nor throughput;
+    queries is None when the server did not report statement counts."""
+    latencies = [elapsed for elapsed, status, _ in samples if status < 400]
+    queries = [count for _, status, count in samples if status < 400 and count is not None]
+    return {
+        'requests': len(samples),
+        'errors': len(samples) - len(latencies),
+        'rps': len(latencies) / seconds if seconds else 0.0,
+        'mean_ms': sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'queries': sum(queries) / len(queries) if queries else None,
+        'max_queries': max(queries) if queries else None,
+    }
+
+
+class LoadRecorder:
+    """Thread-safe collector of request samples by endpoint label"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(list)  # endpoint -> [(seconds, status, queries)]
+        self.enabled = True
+
+    def record(self, endpoint: str, seconds: float, status: int, queries: Optional[int] = None) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._samples[endpoint].append((seconds, status, queries))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._samples.clear()
+
+    def report(self, seconds: float, **meta) -> Dict[str, Any]:
+        """JSON-serializable summary: meta, run length, totals and per-endpoint stats"""
+        with self._lock:
+            samples = {endpoint: list(values) for endpoint, values in self._samples.items()}
+        return {
+            'meta': meta,
+            'seconds': seconds,
+            'total': summarize([sample for values in samples.values() for sample in values], seconds),
+            'endpoints': {endpoint: summarize(samples[endpoint], seconds) for endpoint in sorted(samples)},
+        }
+
+
+class Change(NamedTuple):
+    endpoint: str
+    metric: str
+    before: float
+    after: float
+    change: Optional[float]  # relative; None when before is 0
+    regressed: bool
+
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.1) -> List[Change]:
+    """Changes in the compared metrics for the total and each endpoint present in both reports.
+    Latency and throughput regress when they get worse by more than threshold (a fraction);
+    statement and error counts regress on any increase."""
+    rows = [('total', baseline['total'], current['total'])]
+    rows += [(endpoint, stats, current['endpoints'][endpoint])
+             for endpoint, stats in baseline['endpoints'].items() if endpoint in current['endpoints']]
+    changes = []
+    for endpoint, before_stats, after_stats in rows:
+        for metric, direction in COMPARED_METRICS.items():
+            before, after = before_stats.get(metric), after_stats.get(metric)
+            if before is None or after is None:
+                continue
+            change = (after - before) / before if before else None
+            if metric in EXACT_METRICS:
+                regressed = (after - before) >= EXACT_METRICS[metric]
+            elif change is None:
+                regressed = False
+            else:
+                regressed = change * direction > threshold
+            changes.append(Change(endpoint, metric, before, after, change, regressed))
+    return changes
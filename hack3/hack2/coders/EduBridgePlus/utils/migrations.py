@@ -0,0 +1,99 @@
+"""
+Schema migrations for EduBridge+
+db.create_all() only creates missing tables, so changes to existing tables
+(new indexes, columns) are applied here. Each migration runs once, in
+version order, inside its own transaction, and is recorded in the
+schema_migrations table.
+"""
+
+import logging
+from datetime import datetime
+from typing import Callable, List, NamedTuple, Set
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, insert, inspect, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.schema import CreateColumn
+
+logger = logging.getLogger(__name__)
+
+_metadata = MetaData()
+schema_migrations = Table(
+    'schema_migrations', _metadata,
+    Column('version', Integer, primary_key=True),
+    Column('description', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+def applied_versions(engine: Engine) -> Set[int]:
+    """Versions already recorded in schema_migrations"""
+    schema_migrations.create(engine, checkfirst=True)
+    with engine.connect() as connection:
+        return set(connection.execute(select(schema_migrations.c.version)).scalars())
+
+
+def run_migrations(engine: Engine, migrations: List[Migration]) -> List[int]:
+    """Apply pending migrations in order; returns the versions applied by this call"""
+    applied = applied_versions(engine)
+    done = []
+    for migration in sorted(migrations, key=lambda m: m.version):
+        if migration.version in applied:
+            continue
+        try:
+            with engine.begin() as connection:
+                # Claim the version first so a worker starting at the same time backs off
+                connection.execute(insert(schema_migrations).values(
+                    version=migration.version,
+                    description=migration.description,
+                    applied_at=datetime.utcnow(),
+                ))
+                migration.upgrade(connection)
+        except IntegrityError:
+            logger.info('Migration %d was applied by another process', migration.version)
+            continue
+        logger.info('Applied migration %d: %s', migration.version, migration.description)
+        done.append(migration.version)
+    return done
+
+
+def create_indexes(*tables: Table) -> Callable[[Connection], None]:
+    """Migration step creating the indexes declared on tables that the database lacks"""
+    def upgrade(connection: Connection) -> None:
+        for table in tables:
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+    return upgrade
+
+
+def add_columns(table: Table, *names: str) -> Callable[[Connection], None]:
+    """Migration step adding columns declared on table that the database lacks"""
+    def upgrade(connection: Connection) -> None:
+        existing = {column['name'] for column in inspect(connection).get_columns(table.name)}
+        for name in names:
+            if name not in existing:
+                column = CreateColumn(table.c[name]).compile(dialect=connection.dialect)
+                connection.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN {column}')
+    return upgrade
+
+
+def drop_indexes(*names: str) -> Callable[[Connection], None]:
+    """Migration step dropping indexes that are no longer declared"""
+    def upgrade(connection: Connection) -> None:
+        for name in names:
+            connection.exec_driver_sql(f'DROP INDEX IF EXISTS {name}')
+    return upgrade
+
+
+def steps(*upgrades: Callable[[Connection], None]) -> Callable[[Connection], None]:
+    """Run several migration steps as one migration"""
+    def upgrade(connection: Connection) -> None:
+        for step in upgrades:
+            step(connection)
+    return upgrade
@@ -0,0 +1,93 @@
+"""
+Password hashing for EduBridge+
+Hashes and checks passwords in werkzeug's format (method$salt$hash) with a
+configurable method and cost, such as 'scrypt:32768:8:1' or
+'pbkdf2:sha256:600000'. Hashes stored with other parameters still verify,
+and needs_rehash() tells the caller to replace them. The work runs on a
+small thread pool: hashlib releases the GIL while hashing, so the pool caps
+the cores (and, for scrypt, the memory) that a burst of logins can take,
+leaving room for other requests. Callers beyond max_pending get HasherBusy
+rather than queueing without bound.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+
+class HasherBusy(Exception):
+    """Raised when max_pending hashes are already waiting or running"""
+
+
+def canonical_method(method: str) -> str:
+    """The method string werkzeug stores in hashes made with method, defaults filled in"""
+    name, *args = method.split(':')
+    try:
+        if name == 'scrypt' and len(args) in (0, 3):
+            n, r, p = map(int, args) if args else (2 ** 15, 8, 1)
+            return f'scrypt:{n}:{r}:{p}'
+        if name == 'pbkdf2' and len(args) <= 2:
+            iterations = int(args[1]) if len(args) == 2 else DEFAULT_PBKDF2_ITERATIONS
+            return f"pbkdf2:{args[0] if args else 'sha256'}:{iterations}"
+    except ValueError:
+        pass
+    raise ValueError(f"Unsupported password hash method '{method}': use scrypt[:n:r:p] or pbkdf2[:hash[:iterations]]")
+
+
+class PasswordHasher:
+    """Hashes and verifies passwords on a bounded pool of worker threads (workers=0: in the calling thread)"""
+
+    def __init__(self, method: str = 'scrypt', workers: int = 2, max_pending: int = 64):
+        self.method = canonical_method(method)
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash') \
+            if workers else None
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self.hashed = 0
+        self.verified = 0
+        self.rejected = 0
+
+    def hash(self, password: str) -> str:
+        """A new hash of password with the configured method"""
+        password_hash = self._run(generate_password_hash, password, self.method)
+        with self._lock:
+            self.hashed += 1
+        return password_hash
+
+    def verify(self, password_hash: str, password: str) -> bool:
+        valid = self._run(check_password_hash, password_hash, password)
+        with self._lock:
+            self.verified += 1
+        return valid
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """True if password_hash was made with a different method or cost than the configured one"""
+        return password_hash.split('$', 1)[0] != self.method
+
+    def _run(self, fn: Callable[..., Any], *args):
+        if self._executor is None:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HasherBusy()
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'method': self.method, 'workers': self.workers, 'hashed': self.hashed,
+                    'verified': self.verified, 'rejected': self.rejected}
+
+    def shutdown(self) -> None:
+        if self._executor:
+            self._executor.shutdown(wait=False)
@@ -0,0 +1,273 @@
+"""
+Sampling profiler for EduBridge+
+Profiles a random fraction of requests by sampling their threads' stacks
+from a background thread (sys._current_frames) every interval seconds while
+any of them is running, so unsampled requests cost one random draw and
+nothing runs at all while it is off. Samples are wall clock: a request
+waiting on the database or a backend shows where it waits. Stacks are
+aggregated per route and exported as collapsed stacks (flamegraph.pl,
+inferno) or a speedscope file.
+
+With a shared directory, workers cooperate through files in it:
+  profiler.json              enabled, sample_rate and generation, written by configure()
+  profile-<pid>-<id>.json    each worker's samples for the current generation
+sync() (run periodically) applies the control file and publishes this
+worker's samples; merged() sums every worker's. A reset bumps the
+generation, which makes every worker drop its samples.
+"""
+
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CONTROL_FILE = 'profiler.json'
+OTHER_STACKS = '[other stacks]'  # where samples go once max_stacks distinct stacks are held
+
+Profiles = Dict[str, Dict[str, int]]  # route -> collapsed stack ('outer;...;inner') -> samples
+
+
+class SamplingProfiler:
+    """Samples the stacks of selected request threads and aggregates them per route"""
+
+    def __init__(self, interval: float = 0.01, sample_rate: float = 0.05, enabled: bool = False,
+                 directory: Optional[str] = None, max_stacks: int = 20000, logger: logging.Logger = logger):
+        self.interval = interval
+        self.sample_rate = sample_rate
+        self.enabled = enabled
+        self.directory = directory
+        self.max_stacks = max_stacks
+        self.logger = logger
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._active: Dict[int, str] = {}               # thread id -> route being profiled
+        self._stacks: Dict[tuple, int] = defaultdict(int)  # (route, collapsed stack) -> samples
+        self._labels: Dict[Any, str] = {}               # code object -> frame label
+        self._dirty = False
+        self._control_mtime = None
+        self._path = os.path.join(directory, f'profile-{os.getpid()}-{uuid.uuid4().hex}.json') if directory else None
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    # Sampling
+
+    def begin(self, route: str) -> bool:
+        """Called as a request starts on this thread; returns True if it was picked for profiling"""
+        if not self.enabled or random.random() >= self.sample_rate:
+            return False
+        with self._lock:
+            self._active[threading.get_ident()] = route
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+        return True
+
+    def end(self) -> None:
+        """Called as the request on this thread finishes"""
+        if self._active:
+            with self._lock:
+                self._active.pop(threading.get_ident(), None)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                active = dict(self._active)
+                if not active:
+                    self._wakeup.clear()
+            if not active:
+                self._wakeup.wait()
+                continue
+            frames = sys._current_frames()
+            samples = [(route, self._collapse(frames[ident])) for ident, route in active.items() if ident in frames]
+            del frames
+            with self._lock:
+                for route, stack in samples:
+                    key = (route, stack)
+                    if key not in self._stacks and len(self._stacks) >= self.max_stacks:
+                        key = (route, OTHER_STACKS)
+                    self._stacks[key] += 1
+                self._dirty = True
+            time.sleep(self.interval)
+
+    def _collapse(self, frame) -> str:
+        labels = []
+        while frame is not None:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                label = self._labels[code] = (f'{getattr(code, "co_qualname", code.co_name)} '
+                                              f'({_short_path(code.co_filename)}:{code.co_firstlineno})')
+            labels.append(label)
+            frame = frame.f_back
+        return ';'.join(reversed(labels))
+
+    # Control and sharing between workers
+
+    def configure(self, enabled: Optional[bool] = None, sample_rate: Optional[float] = None,
+                  reset: bool = False) -> None:
+        """Change settings for this worker, and for every worker sharing the directory"""
+        if sample_rate is not None and not 0 <= sample_rate <= 1:
+            raise ValueError('sample_rate must be between 0 and 1')
+        self.sync()
+        with self._lock:
+            if enabled is not None:
+                self.enabled = enabled
+            if sample_rate is not None:
+                self.sample_rate = sample_rate
+            if reset:
+                self._start_generation(self.generation + 1)
+            settings = {'enabled': self.enabled, 'sample_rate': self.sample_rate, 'generation': self.generation}
+        if self.directory:
+            control = os.path.join(self.directory, CONTROL_FILE)
+            _write_json(control, settings)
+            self._control_mtime = os.stat(control).st_mtime_ns
+
+    def sync(self) -> None:
+        """Apply settings changed by another worker and publish this worker's samples; for a periodic job"""
+        if not self.directory:
+            return
+        control = os.path.join(self.directory, CONTROL_FILE)
+        try:
+            mtime = os.stat(control).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime is not None and mtime != self._control_mtime:
+            try:
+                with open(control, encoding='utf-8') as f:
+                    settings = json.load(f)
+            except (OSError, ValueError):
+                self.logger.warning('Could not read profiler settings from %s', control)
+            else:
+                self._control_mtime = mtime
+                with self._lock:
+                    self.enabled = settings['enabled']
+                    self.sample_rate = settings['sample_rate']
+                    if settings['generation'] != self.generation:
+                        self._start_generation(settings['generation'])
+
+        with self._lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            data = {'generation': self.generation, 'interval': self.interval, 'profiles': self._profiles()}
+        _write_json(self._path, data)
+
+    def _start_generation(self, generation: int) -> None:
+        self.generation = generation
+        self._stacks.clear()
+        self._dirty = True
+
+    def _profiles(self) -> Profiles:
+        profiles = defaultdict(dict)
+        for (route, stack), count in self._stacks.items():
+            profiles[route][stack] = count
+        return dict(profiles)
+
+    def merged(self) -> Profiles:
+        """Samples of the current generation from every worker, this one included.
+        Files left by earlier generations are deleted."""
+        self.sync()
+        if not self.directory:
+            with self._lock:
+                return self._profiles()
+        merged = defaultdict(lambda: defaultdict(int))
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            names = []
+        for name in names:
+            if not (name.startswith('profile-') and name.endswith('.json')):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path, encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):  # being replaced, or removed by another worker
+                continue
+            if data['generation'] != self.generation:
+                if data['generation'] < self.generation:
+                    _remove(path)
+                continue
+            for route, stacks in data['profiles'].items():
+                for stack, count in stacks.items():
+                    merged[route][stack] += count
+        return {route: dict(stacks) for route, stacks in merged.items()}
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'enabled': self.enabled,
+            'sample_rate': self.sample_rate,
+            'interval': self.interval,
+            'generation': self.generation,
+            'routes': {route: sum(stacks.values()) for route, stacks in sorted(self.merged().items())},
+        }
+
+
+def collapsed(profiles: Profiles, route: Optional[str] = None) -> str:
+    """Collapsed stack lines ('route;outer;...;inner samples'), the input format of flamegraph tools"""
+    lines = [f'{name};{stack} {count}' for name, stacks in sorted(profiles.items()) if route in (None, name)
+             for stack, count in sorted(stacks.items())]
+    return '\n'.join(lines) + '\n' if lines else ''
+
+
+def speedscope(profiles: Profiles, interval: float, route: Optional[str] = None) -> Dict[str, Any]:
+    """A speedscope file with one sampled profile per route, weighted in seconds"""
+    frames, index = [], {}
+    documents = []
+    for name, stacks in sorted(profiles.items()):
+        if route not in (None, name):
+            continue
+        samples, weights = [], []
+        for stack, count in sorted(stacks.items()):
+            sample = []
+            for label in stack.split(';'):
+                if label not in index:
+                    index[label] = len(frames)
+                    frames.append({'name': label})
+                sample.append(index[label])
+            samples.append(sample)
+            weights.append(count * interval)
+        documents.append({'type': 'sampled', 'name': name, 'unit': 'seconds', 'startValue': 0,
+                          'endValue': sum(weights), 'samples': samples, 'weights': weights})
+    return {'$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'shared': {'frames': frames}, 'profiles': documents,
+            'name': 'EduBridge+ request profiles', 'exporter': 'edubridge-profiler'}
+
+
+_path_prefixes: List[str] = []
+
+
+def _short_path(filename: str) -> str:
+    """filename relative to the longest sys.path entry containing it"""
+    if not _path_prefixes:
+        _path_prefixes.extend(sorted((os.path.abspath(entry or '.') + os.sep for entry in sys.path),
+                                     key=len, reverse=True))
+    for prefix in _path_prefixes:
+        if filename.startswith(prefix):
+            return filename[len(prefix):]
+    return filename
+
+
+def _write_json(path: str, data: Dict[str, Any]) -> None:
+    """Replace path atomically, so readers in other workers never see a partial file"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.{uuid.uuid4().hex}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(tmp, path)
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
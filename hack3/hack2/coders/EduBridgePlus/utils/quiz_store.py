@@ -0,0 +1,51 @@
+"""
+Quiz session store for EduBridge+
+Keeps the answer key of every quiz handed out by /learn on the server, under
+a short random id, so a submission carries only that id and the chosen option
+indexes. Keys are packed one byte per question and held in a bounded,
+TTL-evicted cache; grading a quiz takes its key out, so an id is good for one
+submission.
+"""
+
+import secrets
+import time
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional, Sequence
+
+from utils.cache import TTLLRUCache
+
+
+class QuizKey(NamedTuple):
+    """What the server remembers about a quiz it handed out"""
+    topic: str
+    owner: str
+    answers: bytes  # index of the correct option, per question
+
+
+class QuizSessionStore:
+    """Answer keys by quiz id, bounded by count and age"""
+
+    def __init__(self, maxsize: int = 50000, ttl: Optional[float] = 3600,
+                 clock: Callable[[], float] = time.monotonic):
+        self._keys = TTLLRUCache(maxsize=maxsize, ttl=ttl, clock=clock)
+
+    def register(self, questions: Iterable[Any], topic: str, owner: str) -> str:
+        """Store the answer key of questions (objects with a .correct index); returns the quiz id"""
+        quiz_id = secrets.token_urlsafe(9)
+        self._keys.set(quiz_id, QuizKey(topic, owner, bytes(question.correct for question in questions)))
+        return quiz_id
+
+    def get(self, quiz_id: str) -> Optional[QuizKey]:
+        """Answer key for quiz_id, or None if it is unknown or expired"""
+        return self._keys.get(quiz_id)
+
+    def pop(self, quiz_id: str) -> Optional[QuizKey]:
+        """Remove and return the answer key for quiz_id, so each quiz is graded at most once"""
+        return self._keys.pop(quiz_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return self._keys.stats()
+
+
+def grade(answer_key: bytes, answers: Sequence[Any]) -> int:
+    """Number of answers matching the key; anything but the right int counts as wrong"""
+    return sum(1 for correct, given in zip(answer_key, answers) if type(given) is int and given == correct)
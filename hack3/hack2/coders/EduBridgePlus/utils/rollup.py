@@ -0,0 +1,90 @@
+"""
+Rollup helpers for EduBridge+
+Counter rows that are bumped in the same transaction as the raw writes they
+summarize, and a periodic job to rebuild them from the raw tables so any
+drift (manual edits, a failed deploy) is corrected.
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import Table, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects import postgresql, sqlite
+
+logger = logging.getLogger(__name__)
+
+_UPSERT_DIALECTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+
+def upsert_increment(session, table: Table, key: Dict[str, Any], deltas: Dict[str, Any],
+                     values: Optional[Dict[str, Any]] = None) -> None:
+    """Add deltas to the counter row identified by key, creating the row if it is missing.
+    values are stored as given (e.g. an updated_at timestamp)."""
+    values = values or {}
+    dialect = session.get_bind().dialect.name
+    if dialect in _UPSERT_DIALECTS:
+        statement = _UPSERT_DIALECTS[dialect](table).values(**key, **deltas, **values)
+        changes = {column: table.c[column] + statement.excluded[column] for column in deltas}
+        changes.update({column: statement.excluded[column] for column in values})
+        session.execute(statement.on_conflict_do_update(index_elements=list(key), set_=changes))
+        return
+    # No single-statement upsert: update, then insert when no row matched
+    changes = {column: table.c[column] + delta for column, delta in deltas.items()}
+    changes.update(values)
+    result = session.execute(
+        update(table)
+        .where(*(table.c[column] == value for column, value in key.items()))
+        .values(changes)
+    )
+    if result.rowcount == 0:
+        session.execute(insert(table).values(**key, **deltas, **values))
+
+
+def insert_ignore(session, table: Table, rows: List[Dict[str, Any]]) -> None:
+    """Insert rows, skipping those whose primary key is already present"""
+    if not rows:
+        return
+    dialect = session.get_bind().dialect.name
+    if dialect in _UPSERT_DIALECTS:
+        session.execute(_UPSERT_DIALECTS[dialect](table).on_conflict_do_nothing(), rows)
+        return
+    for row in rows:
+        try:
+            with session.begin_nested():
+                session.execute(insert(table).values(**row))
+        except IntegrityError:
+            pass
+
+
+class PeriodicJob:
+    """Runs fn every interval seconds on a daemon thread until stopped"""
+
+    def __init__(self, fn: Callable[[], Any], interval: float, name: str = 'periodic-job',
+                 logger: Optional[logging.Logger] = logger):
+        self.fn = fn
+        self.interval = interval
+        self.logger = logger
+        self.runs = 0
+        self.failures = 0
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self) -> 'PeriodicJob':
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.fn()
+                self.runs += 1
+            except Exception:
+                self.failures += 1
+                self.logger.exception('Periodic job %s failed', self._thread.name)
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=5)
@@ -0,0 +1,277 @@
+"""
+Server-side sessions for EduBridge+
+Session data is kept in a local store (SQLite by default, or one file per
+session) and the cookie carries only a random session id. Records are
+Flask's tagged JSON, zlib-compressed when that makes them smaller, and are
+read on first access, so requests without a session cookie never touch the
+store. Ids are hashed before they are used as keys, so a copy of the store
+cannot be replayed as cookies.
+"""
+
+import hashlib
+import os
+import secrets
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, Optional, Tuple, Type
+
+from flask.sessions import SessionInterface, SessionMixin, session_json_serializer
+
+_RAW, _COMPRESSED = b'j', b'z'
+_COMPRESS_OVER = 256  # bytes of JSON before compression is tried
+
+
+def encode_session(data: Dict[str, Any]) -> bytes:
+    """Compact record for a session dict: a format byte, then JSON or zlib'd JSON"""
+    raw = session_json_serializer.dumps(data).encode()
+    if len(raw) > _COMPRESS_OVER:
+        packed = zlib.compress(raw, 6)
+        if len(packed) < len(raw):
+            return _COMPRESSED + packed
+    return _RAW + raw
+
+
+def decode_session(record: bytes) -> Dict[str, Any]:
+    body = record[1:]
+    if record[:1] == _COMPRESSED:
+        body = zlib.decompress(body)
+    return session_json_serializer.loads(body.decode())
+
+
+class SessionBackend(ABC):
+    """Storage for encoded session records keyed by hashed session id"""
+
+    @abstractmethod
+    def load(self, key: str) -> Optional[Tuple[bytes, float]]:
+        """(record, expiry time) for key, or None if it is missing or expired"""
+
+    @abstractmethod
+    def save(self, key: str, record: bytes, expires_at: float) -> None:
+        """Store record under key until expires_at"""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove key's record, if any"""
+
+    @abstractmethod
+    def purge(self) -> int:
+        """Drop expired records; returns how many were removed"""
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """Sessions in their own SQLite file, one connection per thread"""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS sessions '
+                               '(id TEXT PRIMARY KEY, data BLOB NOT NULL, expires_at REAL NOT NULL) WITHOUT ROWID')
+            connection.execute('CREATE INDEX IF NOT EXISTS ix_sessions_expires_at ON sessions (expires_at)')
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=15)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def load(self, key: str) -> Optional[Tuple[bytes, float]]:
+        return self._connection().execute('SELECT data, expires_at FROM sessions WHERE id = ? AND expires_at > ?',
+                                          (key, time.time())).fetchone()
+
+    def save(self, key: str, record: bytes, expires_at: float) -> None:
+        with self._connection() as connection:
+            connection.execute('INSERT INTO sessions (id, data, expires_at) VALUES (?, ?, ?) '
+                               'ON CONFLICT (id) DO UPDATE SET data = excluded.data, expires_at = excluded.expires_at',
+                               (key, record, expires_at))
+
+    def delete(self, key: str) -> None:
+        with self._connection() as connection:
+            connection.execute('DELETE FROM sessions WHERE id = ?', (key,))
+
+    def purge(self) -> int:
+        with self._connection() as connection:
+            return connection.execute('DELETE FROM sessions WHERE expires_at <= ?', (time.time(),)).rowcount
+
+
+class FilesystemSessionBackend(SessionBackend):
+    """One file per session: the expiry time followed by the record"""
+
+    _HEADER = struct.Struct('>d')
+
+    def __init__(self, path: str):
+        self.directory = path
+        os.makedirs(path, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def load(self, key: str) -> Optional[Tuple[bytes, float]]:
+        try:
+            with open(self._path(key), 'rb') as handle:
+                content = handle.read()
+        except FileNotFoundError:
+            return None
+        (expires_at,) = self._HEADER.unpack_from(content)
+        return (content[self._HEADER.size:], expires_at) if expires_at > time.time() else None
+
+    def save(self, key: str, record: bytes, expires_at: float) -> None:
+        # Write then rename, so readers never see half a record
+        temporary = f'{self._path(key)}.{threading.get_ident()}.tmp'
+        with open(temporary, 'wb') as handle:
+            handle.write(self._HEADER.pack(expires_at) + record)
+        os.replace(temporary, self._path(key))
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def purge(self) -> int:
+        removed, now = 0, time.time()
+        for name in os.listdir(self.directory):
+            if name.endswith('.tmp'):
+                continue
+            try:
+                with open(self._path(name), 'rb') as handle:
+                    (expires_at,) = self._HEADER.unpack(handle.read(self._HEADER.size))
+                if expires_at <= now:
+                    os.remove(self._path(name))
+                    removed += 1
+            except (FileNotFoundError, struct.error):
+                continue
+        return removed
+
+
+SESSION_BACKENDS: Dict[str, Type[SessionBackend]] = {
+    'sqlite': SQLiteSessionBackend,
+    'filesystem': FilesystemSessionBackend,
+}
+
+
+def create_session_backend(name: str = 'sqlite', **options) -> SessionBackend:
+    """Instantiate a registered session backend by name"""
+    try:
+        backend_class = SESSION_BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown session backend '{name}'. Choose from: {', '.join(SESSION_BACKENDS)}") from None
+    return backend_class(**options)
+
+
+class ServerSideSession(SessionMixin):
+    """Session whose data is fetched from the backend the first time it is used"""
+
+    def __init__(self, sid: Optional[str] = None, loader=None):
+        self.sid = sid
+        self._loader = loader
+        self._data: Optional[Dict[str, Any]] = None if loader else {}
+        self.new = sid is None
+        self.modified = False
+        self.accessed = False
+        self.expires_at: Optional[float] = None
+        self.rotated_from: Optional[str] = None
+
+    @property
+    def data(self) -> Dict[str, Any]:
+        self.accessed = True
+        if self._data is None:
+            self._data, self.expires_at = self._loader()
+            if self._data is None:
+                # Unknown or expired id: start over under a fresh one
+                self._data, self.sid, self.new = {}, None, True
+        return self._data
+
+    def regenerate(self) -> None:
+        """Move the data to a new session id, e.g. after login, so an id seen before is useless"""
+        self.data  # read it now: the old record is deleted when the response is saved
+        if not self.new:
+            self.rotated_from = self.sid
+        self.sid, self.new, self.modified = None, True, True
+
+    def __getitem__(self, key: str) -> Any:
+        return self.data[key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.data[key] = value
+        self.modified = True
+
+    def __delitem__(self, key: str) -> None:
+        del self.data[key]
+        self.modified = True
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Flask session interface storing session data in a SessionBackend"""
+
+    def __init__(self, backend: SessionBackend):
+        self.backend = backend
+
+    @staticmethod
+    def _key(sid: str) -> str:
+        return hashlib.sha256(sid.encode()).hexdigest()
+
+    def open_session(self, app, request) -> ServerSideSession:
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if not sid or len(sid) > 64:
+            return ServerSideSession()
+
+        def load():
+            stored = self.backend.load(self._key(sid))
+            if stored is None:
+                return None, None
+            try:
+                return decode_session(stored[0]), stored[1]
+            except Exception:
+                app.logger.warning('Discarding unreadable session record')
+                return None, None
+        return ServerSideSession(sid, load)
+
+    def _lifetime(self, app) -> float:
+        return app.permanent_session_lifetime.total_seconds()
+
+    def save_session(self, app, session: ServerSideSession, response) -> None:
+        name = self.get_cookie_name(app)
+        cookie = dict(domain=self.get_cookie_domain(app), path=self.get_cookie_path(app),
+                      secure=self.get_cookie_secure(app), samesite=self.get_cookie_samesite(app),
+                      httponly=self.get_cookie_httponly(app))
+        if session.accessed:
+            response.vary.add('Cookie')
+        if session.rotated_from:
+            self.backend.delete(self._key(session.rotated_from))
+        lifetime = self._lifetime(app)
+        if not session.modified:
+            # Sliding expiry, rewritten at most once per half lifetime rather than on every request
+            if not session.expires_at or session.expires_at - time.time() > lifetime / 2:
+                return
+
+        if not session:
+            # Emptied (e.g. logout): forget it on both sides
+            if session.sid:
+                self.backend.delete(self._key(session.sid))
+                response.delete_cookie(name, **cookie)
+            return
+
+        if session.sid is None:
+            session.sid = secrets.token_urlsafe(32)
+        # Browser-lifetime sessions are still dropped server-side after the permanent lifetime
+        expires_at = time.time() + lifetime
+        self.backend.save(self._key(session.sid), encode_session(dict(session)), expires_at)
+        expires = datetime.fromtimestamp(expires_at, timezone.utc) if session.permanent else None
+        response.set_cookie(name, session.sid, expires=expires, **cookie)
+        response.vary.add('Cookie')
@@ -0,0 +1,125 @@
+"""
+Sharded write-behind counters for EduBridge+
+Hot counters (likes on a viral post) are incremented in memory, spread
+over independently locked shards, and the aggregated deltas are written
+in one transaction per flush instead of one per click. Every read returns
+the last committed total plus the increments not yet committed, so the
+count a client sees never goes backwards. Unflushed increments are lost if
+the process dies; use it only for counters where that is acceptable.
+"""
+
+import logging
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _Shard:
+    __slots__ = ('lock', 'base', 'pending', 'inflight')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.base: Dict[Hashable, int] = {}                 # last committed total
+        self.pending: Dict[Hashable, int] = defaultdict(int)   # not yet handed to a flush
+        self.inflight: Dict[Hashable, int] = {}             # being written by the current flush
+
+
+class ShardedCounter:
+    """Buffers increments per key and writes the sums through flush_fn"""
+
+    def __init__(self, flush_fn: Callable[[Dict[Hashable, int]], Dict[Hashable, int]], shards: int = 16,
+                 max_known: int = 10000):
+        # flush_fn commits the deltas and returns each key's new total (keys that no longer exist omitted)
+        self._flush_fn = flush_fn
+        self._shards = [_Shard() for _ in range(shards)]
+        self._flush_lock = threading.Lock()
+        self.max_known = max_known
+        self.flushed = 0
+        self.failed_flushes = 0
+
+    def _shard(self, key) -> _Shard:
+        return self._shards[hash(key) % len(self._shards)]
+
+    def add(self, key: Hashable, load: Callable[[], Optional[int]], delta: int = 1) -> Optional[int]:
+        """Count an increment and return the total including it; None if load finds no such key"""
+        shard = self._shard(key)
+        with shard.lock:
+            known = key in shard.base
+        if not known:
+            base = load()  # outside the lock: a database read
+            if base is None:
+                return None
+            with shard.lock:
+                shard.base.setdefault(key, base)
+                self._forget_idle(shard)
+        with shard.lock:
+            shard.pending[key] += delta
+            return self._total(shard, key)
+
+    def value(self, key: Hashable) -> Optional[int]:
+        """Buffered total for a key, or None if it has not been loaded"""
+        shard = self._shard(key)
+        with shard.lock:
+            return self._total(shard, key) if key in shard.base else None
+
+    def pending(self, key: Hashable) -> int:
+        """Increments not yet committed, to overlay on a database read"""
+        shard = self._shard(key)
+        with shard.lock:
+            return shard.pending.get(key, 0) + shard.inflight.get(key, 0)
+
+    @staticmethod
+    def _total(shard, key):
+        return shard.base[key] + shard.inflight.get(key, 0) + shard.pending.get(key, 0)
+
+    def _forget_idle(self, shard):
+        """Bound memory: drop committed totals for keys with nothing buffered"""
+        limit = self.max_known // len(self._shards) or 1
+        for key in list(shard.base):
+            if len(shard.base) <= limit:
+                break
+            if key not in shard.pending and key not in shard.inflight:
+                del shard.base[key]
+
+    def flush(self) -> int:
+        """Write all buffered increments; returns the number of increments committed"""
+        with self._flush_lock:
+            deltas = {}
+            for shard in self._shards:
+                with shard.lock:
+                    shard.inflight, shard.pending = dict(shard.pending), defaultdict(int)
+                    deltas.update(shard.inflight)
+            if not deltas:
+                return 0
+            try:
+                totals = self._flush_fn(deltas)
+            except Exception:
+                self.failed_flushes += 1
+                logger.exception('Counter flush failed; %d keys will be retried', len(deltas))
+                for shard in self._shards:
+                    with shard.lock:
+                        for key, delta in shard.inflight.items():
+                            shard.pending[key] += delta
+                        shard.inflight = {}
+                return 0
+            for shard in self._shards:
+                with shard.lock:
+                    for key in shard.inflight:
+                        if key in totals:
+                            shard.base[key] = totals[key]
+                        else:
+                            shard.base.pop(key, None)
+                            shard.pending.pop(key, None)
+                    shard.inflight = {}
+            committed = sum(deltas.values())
+            self.flushed += committed
+            return committed
+
+    def stats(self) -> Dict[str, int]:
+        pending = 0
+        for shard in self._shards:
+            with shard.lock:
+                pending += sum(shard.pending.values()) + sum(shard.inflight.values())
+        return {'pending': pending, 'flushed': self.flushed, 'failed_flushes': self.failed_flushes}
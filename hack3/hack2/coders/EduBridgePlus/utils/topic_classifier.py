@@ -0,0 +1,115 @@
+"""
+Topic classification for EduBridge+
+Maps a free-text sustainability topic to a content category and SDG in a single pass,
+so every generator and the progress counters agree on what a topic is about.
+"""
+
+import re
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Tuple
+
+
+class TopicCategory(NamedTuple):
+    """A content category and the keywords that select it"""
+    name: str
+    sdg: Optional[int]
+    keywords: Tuple[str, ...]
+    parent: Optional[str] = None
+
+
+# Ordered by priority: when a topic matches several categories the first one wins.
+# A category without its own content falls back to its parent, then to 'default'.
+# Keywords match anywhere in the topic, except short ones (SHORT_KEYWORD letters or
+# fewer), which match whole words only: 'sea' but not 'research'.
+DEFAULT_CATEGORIES = (
+    TopicCategory('climate', 13, ('climate', 'carbon', 'warming', 'emission', 'greenhouse')),
+    TopicCategory('ocean', 6, ('ocean', 'marine', 'sea'), parent='water'),
+    TopicCategory('water', 6, ('water', 'river', 'lake', 'pollution', 'sanitation', 'hygiene')),
+    TopicCategory('energy', 13, ('energy', 'solar', 'wind', 'renewable')),
+    TopicCategory('education', 4, ('education', 'learning', 'school', 'student', 'teacher')),
+    TopicCategory('recycling', None, ('recycling', 'waste', 'plastic')),
+    # Last, so any more specific keyword wins; explained as climate action, with the general content
+    TopicCategory('sustainability', 13, ('sustainability',)),
+)
+GENERAL_CATEGORY = 'sustainability'  # content packs add their categories ahead of this one
+SHORT_KEYWORD = 3
+
+
+class TopicClassification(NamedTuple):
+    """Result of classifying a topic once per request"""
+    topic: str
+    category: str
+    sdg: Optional[int]
+    lineage: Tuple[str, ...]
+
+    @property
+    def sdg_field(self) -> Optional[str]:
+        """Name of the progress counter this topic contributes to, if any"""
+        return f'sdg_{self.sdg}_topics' if self.sdg else None
+
+    def pick(self, table: Dict[str, Any]) -> Any:
+        """Return the most specific entry of a category-keyed content table"""
+        for name in self.lineage:
+            if name in table:
+                return table[name]
+        raise KeyError(self.category)
+
+
+def normalize_topic(topic: str) -> str:
+    """Normalize case, whitespace and URL underscores so equivalent topics compare equal"""
+    return ' '.join(topic.replace('_', ' ').split()).casefold()
+
+
+class TopicClassifier:
+    """Keyword classifier backed by a single regular expression compiled once"""
+
+    def __init__(self, categories: Iterable[TopicCategory]):
+        self.categories = tuple(categories)
+        self._by_name = {category.name: category for category in self.categories}
+        self._keyword_rank = {}
+        for rank, category in enumerate(self.categories):
+            for keyword in category.keywords:
+                self._keyword_rank.setdefault(keyword.casefold(), rank)
+
+        # The lookahead makes matches overlap, so a keyword hidden inside
+        # another one (e.g. 'water' in 'wastewater') is still seen.
+        keywords = sorted(self._keyword_rank, key=len, reverse=True)
+        self._pattern = re.compile('(?=(%s))' % '|'.join(
+            rf'\b{re.escape(keyword)}\b' if len(keyword) <= SHORT_KEYWORD else re.escape(keyword)
+            for keyword in keywords))
+
+    def classify(self, topic: str) -> TopicClassification:
+        """Classify a topic with one scan over its normalized text"""
+        text = normalize_topic(topic)
+        best = None
+        for match in self._pattern.finditer(text):
+            rank = self._keyword_rank[match.group(1)]
+            if best is None or rank < best:
+                best = rank
+                if rank == 0:
+                    break
+
+        if best is None:
+            return TopicClassification(text, 'default', None, ('default',))
+
+        category = self.categories[best]
+        lineage = [category.name]
+        parent = category.parent
+        while parent and parent not in lineage:
+            lineage.append(parent)
+            parent = self._by_name[parent].parent if parent in self._by_name else None
+        lineage.append('default')
+        return TopicClassification(text, category.name, category.sdg, tuple(lineage))
+
+
+_default_classifier = TopicClassifier(DEFAULT_CATEGORIES)
+
+
+def set_categories(categories: Iterable[TopicCategory]) -> None:
+    """Replace the category set used by classify_topic (e.g. from a content pack)"""
+    global _default_classifier
+    _default_classifier = TopicClassifier(categories)
+
+
+def classify_topic(topic: str) -> TopicClassification:
+    """Classify a topic with the active category set"""
+    return _default_classifier.classify(topic)
@@ -0,0 +1,311 @@
+"""
+Write-behind persistence for EduBridge+
+Coalesces progress increments per user and appended rows (activity events,
+badges) in memory and hands them to the database in batched transactions, on
+a timer or when enough writes are pending. Every write is journaled to an append-only file first so
+a crash before the flush does not lose it.
+
+Journal layout (one directory per deployment, shared by workers):
+  pending-<pid>-<id>.jsonl   writes not yet handed to a flush
+  batch-<id>.jsonl           writes of one batch; deleted once committed
+The flush callback must record the batch id in the same transaction and
+skip batches it has already applied, which makes journal replay exactly-once.
+Recorded ids older than oldest_batch_time() can be forgotten.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: pending journals of live workers cannot be detected
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBatch:
+    """Coalesced writes: per-key counter deltas, per-key replaced values and appended rows"""
+    __slots__ = ('id', 'deltas', 'values', 'rows')
+
+    def __init__(self, batch_id: Optional[str] = None):
+        self.id = batch_id or uuid.uuid4().hex
+        self.deltas = defaultdict(lambda: defaultdict(int))  # key -> field -> increment
+        self.values = defaultdict(dict)                      # key -> field -> new value
+        self.rows = defaultdict(list)                        # table -> [row dict]
+
+    def apply(self, entry: Dict[str, Any]) -> None:
+        """Merge one journal entry into the batch"""
+        if entry['op'] == 'progress':
+            for field, delta in entry.get('deltas', {}).items():
+                self.deltas[entry['key']][field] += delta
+            self.values[entry['key']].update(entry.get('values', {}))
+        elif entry['op'] == 'row':
+            self.rows[entry['table']].append(entry['row'])
+
+    def __len__(self):
+        return len(set(self.deltas) | set(self.values)) + sum(len(rows) for rows in self.rows.values())
+
+
+class WriteBehindQueue:
+    """Buffers writes and flushes them in batches from a background thread"""
+
+    def __init__(self, flush_fn: Callable[[WriteBatch], None], interval: float = 1.0,
+                 max_pending: int = 500, journal_dir: Optional[str] = None, fsync: bool = False,
+                 synchronous: bool = False):
+        self._flush_fn = flush_fn
+        self.interval = interval
+        self.max_pending = max_pending
+        self.journal_dir = journal_dir
+        self.fsync = fsync
+        self.synchronous = synchronous
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._batch = WriteBatch()
+        self._pending = 0
+        self._retry: List[WriteBatch] = []
+        self._flush_seq = 0  # odd while a flush is committing
+        self._journal = None
+        self._journal_path = None
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.flushed_batches = 0
+        self.flushed_writes = 0
+        self.failed_flushes = 0
+
+        if journal_dir:
+            os.makedirs(journal_dir, exist_ok=True)
+            self._open_journal()
+        if not synchronous:
+            self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+            self._thread.start()
+
+    # Enqueueing
+
+    def add_progress(self, key: str, deltas: Optional[Dict[str, int]] = None,
+                     values: Optional[Dict[str, Any]] = None) -> None:
+        """Queue counter increments and replaced values for one progress row"""
+        entry = {'op': 'progress', 'key': key}
+        if deltas:
+            entry['deltas'] = deltas
+        if values:
+            entry['values'] = values
+        self._append(entry)
+
+    def add_row(self, table: str, row: Dict[str, Any]) -> None:
+        """Queue an insert; values must be JSON-serializable"""
+        self._append({'op': 'row', 'table': table, 'row': row})
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        if self.synchronous:
+            # Write straight through on the caller's thread; no shared lock to wait on
+            batch = WriteBatch()
+            batch.apply(entry)
+            self._flush_fn(batch)
+            with self._lock:
+                self.flushed_batches += 1
+                self.flushed_writes += 1
+            return
+        with self._lock:
+            if self._journal:
+                self._journal.write(json.dumps(entry, separators=(',', ':')) + '\n')
+                self._journal.flush()
+                if self.fsync:
+                    os.fsync(self._journal.fileno())
+            self._batch.apply(entry)
+            self._pending += 1
+            full = self._pending >= self.max_pending
+        if full:
+            self._wakeup.set()
+
+    def read_through(self, key: str, load: Callable[[], Any], pending: Optional[Callable[[str], Any]] = None):
+        """Run a database read and collect the unflushed writes for key, with no flush in between.
+        pending(key) collects them; pending_for by default."""
+        pending = pending or self.pending_for
+        # Seqlock rather than the flush lock: the caller may hold a pooled connection
+        # that the flush needs, so waiting on the lock could exhaust the pool.
+        while True:
+            seq = self._flush_seq
+            if seq % 2 == 0:
+                result = load()
+                unflushed = pending(key)
+                if self._flush_seq == seq:
+                    return result, unflushed
+            time.sleep(0.001)
+
+    def pending_for(self, key: str):
+        """Unflushed (deltas, values) for a progress key, to overlay on a fresh database read"""
+        deltas, values = defaultdict(int), {}
+        with self._lock:
+            for batch in self._retry + [self._batch]:
+                for field, delta in batch.deltas.get(key, {}).items():
+                    deltas[field] += delta
+                values.update(batch.values.get(key, {}))
+        return dict(deltas), values
+
+    def pending_rows(self, table: str, **match) -> List[Dict[str, Any]]:
+        """Unflushed rows queued for table whose fields equal match, oldest first"""
+        with self._lock:
+            return [row for batch in self._retry + [self._batch] for row in batch.rows.get(table, ())
+                    if all(row.get(field) == value for field, value in match.items())]
+
+    # Flushing
+
+    def flush(self) -> int:
+        """Write every pending batch now; returns the number of writes committed"""
+        with self._flush_lock:
+            with self._lock:
+                if self._pending:
+                    batch, self._batch, self._pending = self._batch, WriteBatch(), 0
+                    self._rotate_journal(batch.id)
+                    self._retry.append(batch)
+                batches = list(self._retry)
+
+            written = 0
+            for batch in batches:
+                self._flush_seq += 1
+                try:
+                    self._flush_fn(batch)
+                except Exception:
+                    self.failed_flushes += 1
+                    logger.exception('Write-behind flush of batch %s failed; will retry', batch.id)
+                    break
+                else:
+                    with self._lock:
+                        self._retry.remove(batch)
+                finally:
+                    self._flush_seq += 1
+                self._discard_batch_file(batch.id)
+                self.flushed_batches += 1
+                self.flushed_writes += len(batch)
+                written += len(batch)
+            return written
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def close(self) -> None:
+        """Stop the background thread after a final flush"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        self.flush()
+        with self._lock:
+            if self._journal:
+                self._journal.close()
+                # Keep the journal if writes arrived after the final flush; the next start replays it
+                if not self._pending:
+                    os.remove(self._journal_path)
+                self._journal = None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'pending': self._pending,
+                'retrying_batches': len(self._retry),
+                'flushed_batches': self.flushed_batches,
+                'flushed_writes': self.flushed_writes,
+                'failed_flushes': self.failed_flushes,
+            }
+
+    # Journal
+
+    def _open_journal(self):
+        self._journal_path = os.path.join(self.journal_dir, f'pending-{os.getpid()}-{uuid.uuid4().hex}.jsonl')
+        self._journal = open(self._journal_path, 'a', encoding='utf-8')
+        if fcntl:
+            # Held for the life of the file, so replay can tell live journals from orphans
+            fcntl.flock(self._journal.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def _rotate_journal(self, batch_id):
+        """The current journal holds exactly this batch's writes; give it the batch's name"""
+        if not self._journal:
+            return
+        self._journal.close()
+        os.replace(self._journal_path, self._batch_path(batch_id))
+        self._open_journal()
+
+    def _batch_path(self, batch_id):
+        return os.path.join(self.journal_dir, f'batch-{batch_id}.jsonl')
+
+    def _discard_batch_file(self, batch_id):
+        if self.journal_dir:
+            try:
+                os.remove(self._batch_path(batch_id))
+            except FileNotFoundError:
+                pass
+
+    def oldest_batch_time(self) -> Optional[float]:
+        """Modification time of the oldest batch file in the journal, or None if there is none.
+        A batch file is written before its batch commits, so batches applied earlier can no longer be replayed."""
+        if not self.journal_dir:
+            return None
+        times = []
+        for name in os.listdir(self.journal_dir):
+            if name.startswith('batch-'):
+                try:
+                    times.append(os.stat(os.path.join(self.journal_dir, name)).st_mtime)
+                except FileNotFoundError:  # committed and removed meanwhile
+                    pass
+        return min(times, default=None)
+
+    def replay_journal(self) -> int:
+        """Re-apply writes journaled by crashed processes; returns the number of batches found"""
+        if not self.journal_dir:
+            return 0
+        found = 0
+        for name in sorted(os.listdir(self.journal_dir)):
+            path = os.path.join(self.journal_dir, name)
+            if name.startswith('pending-') and path != self._journal_path:
+                if not _is_orphaned(path):
+                    continue
+                batch_id = uuid.uuid4().hex
+                os.replace(path, self._batch_path(batch_id))
+            elif name.startswith('batch-'):
+                batch_id = name[len('batch-'):-len('.jsonl')]
+                if any(batch.id == batch_id for batch in self._retry):
+                    continue
+            else:
+                continue
+
+            batch = WriteBatch(batch_id)
+            with open(self._batch_path(batch_id), encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        try:
+                            batch.apply(json.loads(line))
+                        except ValueError:
+                            # A torn final line from a crash mid-write
+                            logger.warning('Skipping corrupt journal line in %s', name)
+            with self._lock:
+                self._retry.append(batch)
+            found += 1
+        if found:
+            logger.info('Replaying %d journaled write-behind batches', found)
+            self.flush()
+        return found
+
+
+def _is_orphaned(path):
+    """True if no live process holds the journal's lock"""
+    if not fcntl:
+        return True
+    with open(path, 'a') as f:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return False
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        return True